@@ -1,28 +1,31 @@
 from fastapi import Request, Depends, HTTPException, status
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from app.db import get_db
-from app.models import User
-
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core import usuarios
+from app.core.claves import pwd
+from app.core.usuarios import UsuarioSesion
 
+# Versiones síncronas (scripts y seed). Las rutas usan app.core.claves, que corre en un pool aparte.
 def hash_password(password: str) -> str:
     return pwd.hash(password)
 
 def verify_password(password: str, hashed: str) -> bool:
     return pwd.verify(password, hashed)
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User | None:
+def get_current_user(request: Request) -> UsuarioSesion | None:
+    """El usuario ya resuelto por el middleware; sin consulta a la BD."""
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
     user_id = request.session.get("user_id")
     if not user_id:
         return None
-    return db.get(User, user_id)
+    user = usuarios.resolver(user_id)
+    return user if user and user.active else None
 
-def is_admin(user: User | None) -> bool:
+def is_admin(user: UsuarioSesion | None) -> bool:
     return bool(user and user.role == "Admin")
 
 # 🔒 NUEVO: dependencia global para proteger rutas de Admin
-def require_admin(user: User = Depends(get_current_user)):
+def require_admin(user: UsuarioSesion = Depends(get_current_user)):
     if not user or not is_admin(user):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
     return user
\ No newline at end of file
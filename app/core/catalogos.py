@@ -0,0 +1,170 @@
+# app/core/catalogos.py
+"""
+Caché en memoria de catálogos pequeños y de lectura frecuente:
+Categoria, Comuna, Enfermedad, InvCategoria y UnidadMedida.
+
+- Cada catálogo se guarda como una instantánea inmutable (tuplas de NamedTuple).
+- Las rutas que escriben un catálogo llaman a `invalidar(db, ...)` antes del commit;
+  eso incrementa su fila en `versiones` dentro de la misma transacción.
+- Cada proceso consulta `versiones` como mucho cada CATALOGOS_POLL_SEG segundos
+  (una sola consulta por PK) y recarga solo los catálogos que cambiaron.
+"""
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Callable, Mapping, NamedTuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.core import versiones
+from app.models import Categoria
+from app.models.pacientes import Comuna, Enfermedad
+from app.models.inv_basic import InvCategoria, UnidadMedida
+
+POLL_SEG = float(os.getenv("CATALOGOS_POLL_SEG", "5"))
+
+# ---------- filas inmutables ----------
+class CategoriaItem(NamedTuple):
+    id: int
+    nombre: str
+    tipo: str
+
+class ComunaItem(NamedTuple):
+    id: int
+    nombre: str
+
+class EnfermedadItem(NamedTuple):
+    id: int
+    nombre: str
+
+class InvCategoriaItem(NamedTuple):
+    id: int
+    nombre: str
+
+class UnidadItem(NamedTuple):
+    id: int
+    codigo: str
+    nombre: str
+
+class Instantanea(NamedTuple):
+    version: int
+    filas: tuple
+    por_nombre: Mapping[str, tuple]   # nombre en minúsculas -> fila
+
+# ---------- cargadores ----------
+def _cargar(consulta, fila) -> Callable[[Session], tuple]:
+    return lambda db: tuple(fila(*r) for r in db.execute(consulta).all())
+
+CARGADORES: dict[str, Callable[[Session], tuple]] = {
+    "categorias": _cargar(
+        select(Categoria.id, Categoria.nombre, Categoria.tipo).order_by(Categoria.nombre), CategoriaItem),
+    "comunas": _cargar(
+        select(Comuna.id, Comuna.nombre).order_by(Comuna.nombre), ComunaItem),
+    "enfermedades": _cargar(
+        select(Enfermedad.id, Enfermedad.nombre).order_by(Enfermedad.nombre), EnfermedadItem),
+    "inv_categorias": _cargar(
+        select(InvCategoria.id, InvCategoria.nombre).order_by(InvCategoria.nombre), InvCategoriaItem),
+    "unidades": _cargar(
+        select(UnidadMedida.id, UnidadMedida.codigo, UnidadMedida.nombre).order_by(UnidadMedida.nombre), UnidadItem),
+}
+NOMBRES = tuple(CARGADORES)
+
+def _version_key(nombre: str) -> str:
+    return f"catalogo:{nombre}"
+
+class CacheCatalogos:
+    def __init__(self, poll_seg: float = POLL_SEG):
+        self.poll_seg = poll_seg
+        self._lock = threading.Lock()
+        self._snap: dict[str, Instantanea] = {}
+        self._ultimo_poll = 0.0
+        self.stats = {"aciertos": 0, "fallos": 0}
+
+    # El lock nunca se mantiene durante una consulta: con la sesión asíncrona
+    # (app.db_async) la consulta cede el event loop a otras corrutinas del mismo
+    # hilo, y si una de ellas esperara el lock se bloquearía el loop entero.
+    def _sincronizar(self, db: Session) -> None:
+        if time.monotonic() - self._ultimo_poll < self.poll_seg:
+            return
+        self._ultimo_poll = time.monotonic()   # otro request que llegue ahora usa las instantáneas actuales
+        remotas = versiones.leer(db, tuple(_version_key(n) for n in NOMBRES))
+        with self._lock:
+            for nombre in NOMBRES:
+                snap = self._snap.get(nombre)
+                if snap is not None and snap.version != remotas[_version_key(nombre)]:
+                    del self._snap[nombre]
+
+    def obtener(self, db: Session, nombre: str) -> Instantanea:
+        self._sincronizar(db)
+        snap = self._snap.get(nombre)
+        if snap is not None:
+            self.stats["aciertos"] += 1
+            return snap
+        self.stats["fallos"] += 1
+        # la versión se lee antes que los datos: si hay una escritura entre
+        # ambas lecturas, la próxima sincronización fuerza otra recarga.
+        # Dos requests pueden cargar el mismo catálogo a la vez; queda el primero.
+        version = versiones.leer(db, (_version_key(nombre),))[_version_key(nombre)]
+        filas = CARGADORES[nombre](db)
+        nueva = Instantanea(
+            version=version,
+            filas=filas,
+            por_nombre=MappingProxyType({f.nombre.lower(): f for f in filas}),
+        )
+        with self._lock:
+            return self._snap.setdefault(nombre, nueva)
+
+    def descartar(self, *nombres: str) -> None:
+        """Olvida las instantáneas locales y obliga a consultar versiones en la próxima lectura."""
+        with self._lock:
+            for n in nombres:
+                self._snap.pop(n, None)
+            self._ultimo_poll = 0.0
+
+cache = CacheCatalogos()
+
+# Las instantáneas locales se descartan recién cuando la escritura queda confirmada,
+# para no recargar datos que aún no son visibles.
+@event.listens_for(Session, "after_commit")
+def _descartar_tras_commit(session: Session):
+    pendientes = session.info.pop("catalogos_invalidados", None)
+    if pendientes:
+        cache.descartar(*pendientes)
+
+@event.listens_for(Session, "after_rollback")
+def _limpiar_tras_rollback(session: Session):
+    session.info.pop("catalogos_invalidados", None)
+
+# ---------- API pública ----------
+def invalidar(db: Session, *nombres: str) -> None:
+    """Llamar antes de `db.commit()` en las rutas que crean/editan/eliminan catálogos."""
+    versiones.incrementar(db, *(_version_key(n) for n in nombres))
+    db.info.setdefault("catalogos_invalidados", set()).update(nombres)
+
+def categorias(db: Session, tipo: str | None = None) -> tuple[CategoriaItem, ...]:
+    """Todas las categorías, o las de `tipo` más las mixtas."""
+    filas = cache.obtener(db, "categorias").filas
+    if tipo is None:
+        return filas
+    return tuple(c for c in filas if c.tipo in (tipo, "mixta"))
+
+def comunas(db: Session) -> tuple[ComunaItem, ...]:
+    return cache.obtener(db, "comunas").filas
+
+def enfermedades(db: Session) -> tuple[EnfermedadItem, ...]:
+    return cache.obtener(db, "enfermedades").filas
+
+def inv_categorias(db: Session) -> tuple[InvCategoriaItem, ...]:
+    return cache.obtener(db, "inv_categorias").filas
+
+def unidades(db: Session) -> tuple[UnidadItem, ...]:
+    return cache.obtener(db, "unidades").filas
+
+def estadisticas() -> dict:
+    return {**cache.stats, "entradas": len(cache._snap)}
+
+def buscar(db: Session, catalogo: str, nombre: str):
+    """Búsqueda por nombre sin distinguir mayúsculas; None si no existe."""
+    return cache.obtener(db, catalogo).por_nombre.get((nombre or "").strip().lower())
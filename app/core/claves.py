@@ -0,0 +1,131 @@
+# app/core/claves.py
+"""
+Hash y verificación de contraseñas (bcrypt) fuera del threadpool de Starlette.
+
+bcrypt consume CPU a propósito; si se ejecuta en el threadpool compartido, una
+ráfaga de logins deja sin hilos a las páginas normales. Aquí se usa un
+ProcessPoolExecutor acotado (HASH_WORKERS procesos) y un tope de trabajos en
+espera (HASH_COLA_MAX); cuando se supera, se rechaza de inmediato con `Ocupado`
+en vez de encolar sin límite.
+
+Los procesos se crean con "spawn" (no fork desde un worker de uvicorn con
+hilos) y vuelven a los manejadores por defecto de SIGTERM/SIGINT: así terminan
+junto con el servicio (systemd, Docker) en vez de quedar huérfanos. Con
+"spawn" el hijo vuelve a importar el módulo principal: un script que use el
+hash debe arrancar bajo `if __name__ == "__main__":` (uvicorn ya lo hace).
+
+El costo se configura con BCRYPT_ROUNDS. Al verificar se usa
+`verify_and_update`: si el hash guardado tiene otro costo, se devuelve uno nuevo
+para reemplazarlo (rehash al iniciar sesión) con `guardar_hash`.
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+from sqlalchemy import update
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+HASH_COLA_MAX = int(os.getenv("HASH_COLA_MAX", str(HASH_WORKERS * 8)))
+
+pwd = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# hash válido con el costo actual, para que un usuario inexistente tarde lo mismo
+_hash_falso: str | None = None
+
+class Ocupado(Exception):
+    """Demasiados hash pendientes: el llamador debe responder 'intente más tarde'."""
+
+# ---------- funciones que corren en los procesos hijos ----------
+def _init_hijo() -> None:
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+
+def _hashear(password: str) -> str:
+    return pwd.hash(password)
+
+def _verificar(password: str, hashed: str) -> tuple[bool, str | None]:
+    try:
+        return pwd.verify_and_update(password, hashed)
+    except (ValueError, TypeError):
+        # hash vacío o con formato desconocido
+        return False, None
+
+# ---------- pool ----------
+_lock = threading.Lock()
+_pool: ProcessPoolExecutor | None = None
+_pendientes = 0
+
+def _obtener_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_hijo,
+                )
+    return _pool
+
+def cerrar() -> None:
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _reservar() -> None:
+    global _pendientes
+    with _lock:
+        if _pendientes >= HASH_COLA_MAX:
+            raise Ocupado()
+        _pendientes += 1
+
+def _liberar(_=None) -> None:
+    global _pendientes
+    with _lock:
+        _pendientes -= 1
+
+def _enviar(fn, *args):
+    _reservar()
+    try:
+        fut = _obtener_pool().submit(fn, *args)
+    except BaseException:
+        _liberar()
+        raise
+    fut.add_done_callback(_liberar)
+    return fut
+
+# ---------- API ----------
+async def verificar(password: str, hashed: str | None) -> tuple[bool, str | None]:
+    """(ok, hash_nuevo). Con `hashed` None se verifica contra un hash falso y devuelve False."""
+    global _hash_falso
+    if hashed is None and _hash_falso is None:
+        _hash_falso = await hashear("usuario-inexistente")
+    ok, nuevo = await asyncio.wrap_future(_enviar(_verificar, password, hashed or _hash_falso))
+    return (ok and hashed is not None), (nuevo if hashed is not None else None)
+
+async def hashear(password: str) -> str:
+    return await asyncio.wrap_future(_enviar(_hashear, password))
+
+def hashear_sync(password: str) -> str:
+    """Para rutas síncronas (admin): espera el resultado del pool sin usar CPU del hilo."""
+    return _enviar(_hashear, password).result()
+
+def guardar_hash(user_id: int, nuevo: str) -> None:
+    """Reemplaza el hash del usuario en su propia sesión (llamar con run_in_threadpool)."""
+    # import local: los procesos hijos importan este módulo y no necesitan la BD
+    from app.db import SessionLocal
+    from app.models import User
+
+    db = SessionLocal()
+    try:
+        db.execute(update(User).where(User.id == user_id).values(password_hash=nuevo))
+        db.commit()
+    finally:
+        db.close()
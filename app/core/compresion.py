@@ -0,0 +1,28 @@
+# app/core/compresion.py
+"""
+Compresión gzip de las respuestas generadas por la app (HTML, JSON, CSV).
+
+Envuelve el GZipMiddleware de Starlette para que no toque /static: ahí
+`Estaticos` ya entrega variantes precomprimidas y respuestas con Range, que
+no deben recomprimirse. Las respuestas en streaming se comprimen por bloques,
+así que siguen llegando de a poco al navegador.
+"""
+import os
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+GZIP_NIVEL = int(os.getenv("GZIP_NIVEL", "6"))        # 9 cuesta mucha CPU y gana poco en HTML
+GZIP_MINIMO = int(os.getenv("GZIP_MINIMO_BYTES", "1024"))
+
+class Compresion:
+    def __init__(self, app: ASGIApp, excluir: tuple[str, ...] = ("/static",)) -> None:
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=GZIP_MINIMO, compresslevel=GZIP_NIVEL)
+        self.excluir = excluir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and not scope["path"].startswith(self.excluir):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
@@ -0,0 +1,251 @@
+# app/core/consultas.py
+"""
+Medición de SQL por request.
+
+Los eventos de cursor de SQLAlchemy (en todos los motores, también el
+asíncrono) cuentan y cronometran cada sentencia del request en curso:
+
+- `Server-Timing` en cada respuesta: db (tiempo y cantidad de consultas),
+  render (plantillas) y total. Se ve en la pestaña Red del navegador.
+- N+1: un SELECT idéntico (mismo SQL, otros parámetros) repetido SQL_N_MAS_1
+  veces o más en un mismo request queda en el log como advertencia. No cuentan
+  las sentencias con la opción de ejecución `por_lotes` (listados leídos por
+  lotes a propósito, ver app.core.templates.FilasDiferidas).
+- Consultas lentas: las que pasan SQL_LENTA_MS se registran siempre (también
+  fuera de un request), con su EXPLAIN si SQL_EXPLAIN=1.
+- Panel: con SQL_PANEL=1, un admin que agrega `?_sql=1` a una página ve al
+  final la lista de sentencias del request, de la más lenta a la más rápida.
+
+Las páginas se envían en streaming (ver app.core.templates) y el encabezado
+sale junto con el primer bloque de HTML: en páginas largas `db` y `render`
+cubren hasta ese punto. El log y el panel ven el request completo.
+"""
+import html
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders, QueryParams
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import is_admin
+
+log = logging.getLogger(__name__)
+
+LENTA_MS = float(os.getenv("SQL_LENTA_MS", "200"))
+N_MAS_1 = int(os.getenv("SQL_N_MAS_1", "5"))
+EXPLAIN = os.getenv("SQL_EXPLAIN", "0") == "1"
+PANEL = os.getenv("SQL_PANEL", "0") == "1"
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+PARAM_PANEL = "_sql"
+PANEL_FILAS = 25
+
+_espacios = re.compile(r"\s+")
+
+def _corto(sql: str, largo: int = 300) -> str:
+    sql = _espacios.sub(" ", sql).strip()
+    return sql if len(sql) <= largo else sql[:largo] + "…"
+
+def _es_select(sql: str) -> bool:
+    return sql.lstrip()[:6].upper() == "SELECT"
+
+class Medicion:
+    """
+    Consultas y tiempos de un request (o de cualquier bloque con `medir()`).
+    Las consultas de una medición abierta dentro de otra cuentan también en la
+    de afuera: un `medir()` alrededor de un request ve las del middleware.
+    """
+
+    __slots__ = ("ruta", "inicio", "db_seg", "render_seg", "n", "sentencias", "por_lotes", "padre")
+
+    def __init__(self, ruta: str = "", padre: "Medicion | None" = None):
+        self.ruta = ruta
+        self.padre = padre
+        self.inicio = time.perf_counter()
+        self.db_seg = 0.0
+        self.render_seg = 0.0
+        self.n = 0
+        # SQL -> [veces, segundos en total, el más lento]
+        self.sentencias: dict[str, list] = {}
+        self.por_lotes: set[str] = set()   # repetidas a propósito: no son N+1
+
+    def anotar(self, sql: str, seg: float, por_lotes: bool = False) -> None:
+        self.n += 1
+        self.db_seg += seg
+        s = self.sentencias.get(sql)
+        if s is None:
+            self.sentencias[sql] = [1, seg, seg]
+        else:
+            s[0] += 1
+            s[1] += seg
+            if seg > s[2]:
+                s[2] = seg
+        if por_lotes:
+            self.por_lotes.add(sql)
+        if self.padre is not None:
+            self.padre.anotar(sql, seg, por_lotes)
+
+    def repetidas(self) -> list[tuple[str, int, float]]:
+        """Probables N+1: (sql, veces, segundos en total)."""
+        return [
+            (sql, veces, total)
+            for sql, (veces, total, _) in self.sentencias.items()
+            if veces >= N_MAS_1 and _es_select(sql) and sql not in self.por_lotes
+        ]
+
+    def server_timing(self) -> str:
+        total = (time.perf_counter() - self.inicio) * 1000
+        return (
+            f'db;dur={self.db_seg * 1000:.1f};desc="{self.n} consultas", '
+            f"render;dur={self.render_seg * 1000:.1f}, total;dur={total:.1f}"
+        )
+
+    def panel_html(self) -> str:
+        filas = sorted(self.sentencias.items(), key=lambda kv: kv[1][1], reverse=True)
+        marca = ' style="background:#fde68a"'
+        n_mas_1 = {sql for sql, _, _ in self.repetidas()}
+        cuerpo = "".join(
+            f'<tr{marca if sql in n_mas_1 else ""}>'
+            f"<td>{veces}</td><td>{total * 1000:.1f}</td><td>{maximo * 1000:.1f}</td>"
+            f'<td title="{html.escape(_corto(sql, 4000))}"><code>{html.escape(_corto(sql))}</code></td></tr>'
+            for sql, (veces, total, maximo) in filas[:PANEL_FILAS]
+        )
+        return (
+            '<div id="panel-sql" style="position:fixed;bottom:0;left:0;right:0;max-height:40vh;'
+            'overflow:auto;background:#fff;border-top:2px solid #333;font:12px monospace;z-index:9999">'
+            f"<b>{self.n} consultas · db {self.db_seg * 1000:.1f} ms · render {self.render_seg * 1000:.1f} ms"
+            f" · {len(self.sentencias)} distintas</b> (en amarillo: repetidas {N_MAS_1}+ veces)"
+            '<table style="width:100%"><tr><th>veces</th><th>ms total</th><th>ms máx.</th><th>SQL</th></tr>'
+            f"{cuerpo}</table></div>"
+        )
+
+    def cerrar(self) -> None:
+        for sql, veces, total in self.repetidas():
+            log.warning("Posible N+1 en %s: %d veces, %.0f ms en total: %s",
+                        self.ruta, veces, total * 1000, _corto(sql))
+
+_actual: ContextVar[Medicion | None] = ContextVar("medicion_sql", default=None)
+
+def actual() -> Medicion | None:
+    """La medición del request en curso, o None fuera de un request."""
+    return _actual.get()
+
+@contextmanager
+def medir(ruta: str = "") -> Iterator[Medicion]:
+    """
+    Mide las consultas de un bloque fuera del middleware (scripts, benchmarks):
+
+        with consultas.medir() as m:
+            ...
+        print(m.n, m.db_seg)
+    """
+    m = Medicion(ruta, _actual.get())
+    token = _actual.set(m)
+    try:
+        yield m
+    finally:
+        _actual.reset(token)
+
+# ---------- eventos de SQLAlchemy (todos los motores) ----------
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    context._sql_t0 = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    seg = time.perf_counter() - context._sql_t0
+    m = _actual.get()
+    if m is not None:
+        m.anotar(statement, seg, context.execution_options.get("por_lotes", False))
+    if seg * 1000 >= LENTA_MS:
+        _registrar_lenta(conn, statement, parameters, context, executemany, seg, m)
+
+def _explain(conn, statement, parameters, context, executemany):
+    # por la misma conexión y en otro cursor; no con resultados en streaming
+    # (yield_per en MySQL deja el cursor ocupado hasta leer todo)
+    if executemany or not _es_select(statement) or context.execution_options.get("stream_results"):
+        return None
+    prefijo = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cur = conn.connection.cursor()
+    try:
+        cur.execute(prefijo + statement, parameters)
+        return cur.fetchall()
+    finally:
+        cur.close()
+
+def _registrar_lenta(conn, statement, parameters, context, executemany, seg, m):
+    plan = None
+    if EXPLAIN:
+        try:
+            plan = _explain(conn, statement, parameters, context, executemany)
+        except Exception as e:
+            plan = f"(sin EXPLAIN: {type(e).__name__})"
+    log.warning(
+        "SQL lenta (%.0f ms%s): %s | parámetros: %s%s",
+        seg * 1000,
+        f", {m.ruta}" if m is not None and m.ruta else "",
+        _corto(statement, 2000),
+        _corto(repr(parameters), 500),
+        f" | plan: {plan}" if plan is not None else "",
+    )
+
+# ---------- middleware ----------
+class MedicionSQL:
+    """
+    Abre una `Medicion` por request y agrega `Server-Timing` (y el panel, si
+    corresponde). El inicio de la respuesta se retiene hasta el primer bloque
+    del cuerpo, para que el encabezado incluya lo que tomó generarlo.
+    """
+
+    def __init__(self, app: ASGIApp, excluir: tuple[str, ...] = ("/static",)) -> None:
+        self.app = app
+        self.excluir = excluir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.excluir):
+            await self.app(scope, receive, send)
+            return
+
+        m = Medicion(scope["path"], _actual.get())
+        token = _actual.set(m)
+        pide_panel = (
+            PANEL and scope["method"] == "GET"
+            and PARAM_PANEL in QueryParams(scope.get("query_string", b""))
+        )
+        inicio: Message | None = None
+        panel = False
+
+        async def enviar(message: Message) -> None:
+            nonlocal inicio, panel
+            if message["type"] == "http.response.start":
+                inicio = message
+                return
+            if message["type"] == "http.response.body" and inicio is not None:
+                headers = MutableHeaders(scope=inicio)
+                if SERVER_TIMING:
+                    headers.append("Server-Timing", m.server_timing())
+                # el usuario lo deja el middleware de autenticación en scope["state"]
+                panel = (
+                    pide_panel
+                    and headers.get("content-type", "").startswith("text/html")
+                    and is_admin(scope.get("state", {}).get("user"))
+                )
+                if panel:
+                    del headers["content-length"]
+                await send(inicio)
+                inicio = None
+            if panel and not message.get("more_body", False):
+                message = {**message, "body": message.get("body", b"") + m.panel_html().encode()}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _actual.reset(token)
+            m.cerrar()
@@ -0,0 +1,233 @@
+# app/core/estaticos.py
+"""
+Archivos estáticos: URLs con hash de contenido, variantes precomprimidas y
+envío eficiente de documentos grandes.
+
+- `static_url("css/app.css")` (global de Jinja) devuelve `/static/css/app.css?v=<hash>`.
+  Esas URLs se sirven con `Cache-Control: immutable` por un año; si el archivo
+  cambia, cambia el hash y el navegador pide la nueva URL.
+- `python -m app.core.estaticos` genera junto a cada CSS/JS/SVG su `.gz` (y `.br`
+  si está instalado el paquete opcional `brotli`). `Estaticos` elige la variante
+  según `Accept-Encoding`.
+- Los documentos subidos (docs_salidas, pacientes) admiten `Range` (206) y se
+  envían con zero-copy si el servidor ASGI lo ofrece. Con ESTATICOS_ACCEL_PREFIX
+  (ej. `/_estaticos/`) se delega el envío a nginx vía `X-Accel-Redirect`.
+"""
+import gzip
+import hashlib
+import os
+import re
+import threading
+from mimetypes import guess_type
+from pathlib import Path
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+try:
+    import brotli   # opcional
+except ImportError:
+    brotli = None
+
+ESTATICOS_DIR = Path("static")
+COMPRIMIBLES = {".css", ".js", ".mjs", ".svg", ".json", ".map", ".txt", ".html"}
+SUBIDAS = ("docs_salidas", "pacientes")   # carpetas con archivos de usuarios
+ACCEL_PREFIX = os.getenv("ESTATICOS_ACCEL_PREFIX", "")
+ACCEL_MIN_BYTES = int(os.getenv("ESTATICOS_ACCEL_MIN_BYTES", str(256 * 1024)))
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_SUBIDA_INMUTABLE = "private, max-age=31536000, immutable"
+CACHE_REVALIDAR = "no-cache"
+CACHE_SUBIDA = "private, no-cache"
+
+# ---------- hash de contenido ----------
+_lock = threading.Lock()
+_hashes: dict[str, tuple[int, int, str]] = {}   # ruta -> (mtime_ns, tamaño, hash)
+
+def _ruta_relativa(ruta: str) -> str:
+    ruta = ruta.lstrip("/")
+    return ruta[len("static/"):] if ruta.startswith("static/") else ruta
+
+def hash_de(ruta: str) -> str | None:
+    """Hash corto del contenido; se recalcula solo si cambian mtime o tamaño."""
+    rel = _ruta_relativa(ruta)
+    try:
+        st = os.stat(ESTATICOS_DIR / rel)
+    except OSError:
+        return None
+    previo = _hashes.get(rel)
+    if previo and previo[0] == st.st_mtime_ns and previo[1] == st.st_size:
+        return previo[2]
+    h = hashlib.sha1()
+    with open(ESTATICOS_DIR / rel, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    digest = h.hexdigest()[:10]
+    with _lock:
+        _hashes[rel] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+def static_url(ruta: str | None) -> str:
+    """URL versionada para `ruta` (relativa a static/, acepta también '/static/...')."""
+    if not ruta:
+        return ""
+    rel = _ruta_relativa(ruta)
+    h = hash_de(rel)
+    return f"/static/{rel}?v={h}" if h else f"/static/{rel}"
+
+# ---------- precompresión ----------
+def precomprimir(directorio: Path = ESTATICOS_DIR) -> list[str]:
+    """Genera .gz/.br de los archivos comprimibles que no los tengan al día."""
+    generados = []
+    for p in directorio.rglob("*"):
+        if not p.is_file() or p.suffix not in COMPRIMIBLES or p.relative_to(directorio).parts[0] in SUBIDAS:
+            continue
+        datos = None
+        variantes = [(".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+        if brotli is not None:
+            variantes.append((".br", lambda d: brotli.compress(d, quality=11)))
+        for ext, comprimir in variantes:
+            destino = p.with_name(p.name + ext)
+            if destino.exists() and destino.stat().st_mtime >= p.stat().st_mtime:
+                continue
+            datos = datos if datos is not None else p.read_bytes()
+            salida = comprimir(datos)
+            if len(salida) < len(datos):
+                destino.write_bytes(salida)
+                os.utime(destino, (p.stat().st_atime, p.stat().st_mtime))
+                generados.append(str(destino))
+    return generados
+
+# ---------- respuestas ----------
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def _rango(valor: str | None, tamano: int) -> tuple[int, int] | None | bool:
+    """(inicio, fin) inclusive; None si no hay rango usable; False si es insatisfacible."""
+    if not valor:
+        return None
+    m = _RANGO.match(valor.strip())
+    if not m:   # varios rangos o formato desconocido: se sirve completo
+        return None
+    ini, fin = m.groups()
+    if ini == "" and fin == "":
+        return None
+    if ini == "":
+        largo = int(fin)
+        if largo == 0:
+            return False
+        return max(0, tamano - largo), tamano - 1
+    ini = int(ini)
+    fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if ini >= tamano or fin < ini:
+        return False
+    return ini, fin
+
+class ArchivoResponse(FileResponse):
+    """FileResponse con un rango opcional (206) y zero-copy cuando el servidor lo soporta."""
+
+    def __init__(self, path, stat_result: os.stat_result, rango: tuple[int, int] | None = None, **kw):
+        super().__init__(path, stat_result=stat_result, **kw)
+        self.headers["accept-ranges"] = "bytes"
+        self.rango = rango
+        if rango:
+            ini, fin = rango
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {ini}-{fin}/{stat_result.st_size}"
+            self.headers["content-length"] = str(fin - ini + 1)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        ini, fin = self.rango or (0, self.stat_result.st_size - 1)
+        pendiente = fin - ini + 1
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD" or pendiente <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({"type": "http.response.zerocopysend", "file": f,
+                            "offset": ini, "count": pendiente, "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(ini)
+            while pendiente > 0:
+                bloque = await f.read(min(self.chunk_size, pendiente))
+                if not bloque:
+                    break
+                pendiente -= len(bloque)
+                await send({"type": "http.response.body", "body": bloque, "more_body": pendiente > 0})
+        if pendiente > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+class Estaticos(StaticFiles):
+    """StaticFiles con caché inmutable para URLs versionadas, variantes .br/.gz y Range."""
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        rel = os.path.relpath(full_path, os.path.realpath(self.directory or ESTATICOS_DIR))
+        es_subida = rel.split(os.sep, 1)[0] in SUBIDAS
+        query = scope.get("query_string", b"").decode()
+        versionada = "v=" in query and f"v={hash_de(rel)}" in query.split("&")
+
+        if versionada:
+            cache = CACHE_SUBIDA_INMUTABLE if es_subida else CACHE_INMUTABLE
+        else:
+            cache = CACHE_SUBIDA if es_subida else CACHE_REVALIDAR
+
+        # variante precomprimida
+        ext = os.path.splitext(full_path)[1]
+        if ext in COMPRIMIBLES and not es_subida:
+            aceptadas = {c.split(";")[0].strip() for c in request_headers.get("accept-encoding", "").split(",")}
+            for codificacion, sufijo in (("br", ".br"), ("gzip", ".gz")):
+                if codificacion not in aceptadas:
+                    continue
+                try:
+                    st = os.stat(full_path + sufijo)
+                except OSError:
+                    continue
+                if st.st_mtime < stat_result.st_mtime:
+                    continue
+                response = FileResponse(full_path + sufijo, stat_result=st, status_code=status_code,
+                                        media_type=guess_type(full_path)[0] or "text/plain",
+                                        headers={"content-encoding": codificacion, "vary": "Accept-Encoding",
+                                                 "cache-control": cache})
+                if self.is_not_modified(response.headers, request_headers):
+                    return _no_modificado(response)
+                return response
+
+        # documento grande delegado al proxy (sendfile + Range en nginx)
+        if ACCEL_PREFIX and es_subida and stat_result.st_size >= ACCEL_MIN_BYTES:
+            return Response(headers={
+                "x-accel-redirect": ACCEL_PREFIX.rstrip("/") + "/" + rel.replace(os.sep, "/"),
+                "content-type": guess_type(full_path)[0] or "application/octet-stream",
+                "cache-control": cache,
+            })
+
+        response = ArchivoResponse(full_path, stat_result, status_code=status_code,
+                                   headers={"cache-control": cache})
+        if ext in COMPRIMIBLES:
+            response.headers["vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return _no_modificado(response)
+
+        rango_hdr = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if rango_hdr and (not if_range or if_range == response.headers.get("etag")):
+            rango = _rango(rango_hdr, stat_result.st_size)
+            if rango is False:
+                return Response(status_code=416, headers={"content-range": f"bytes */{stat_result.st_size}"})
+            if rango:
+                return ArchivoResponse(full_path, stat_result, rango=rango, status_code=206,
+                                       headers={"cache-control": cache})
+        return response
+
+def _no_modificado(response: Response) -> Response:
+    return NotModifiedResponse(response.headers)
+
+if __name__ == "__main__":
+    for ruta in precomprimir():
+        print(ruta)
+    if brotli is None:
+        print("(brotli no instalado: solo se generaron variantes .gz)")
@@ -0,0 +1,100 @@
+# app/core/fragmentos.py
+"""
+Caché de fragmentos de plantilla en memoria.
+
+Uso en una plantilla:
+
+    {% cache rol, seccion_menu(path) %} ... {% endcache %}
+
+El bloque se renderiza una vez por combinación de (plantilla, bloque, claves) y
+luego se reutiliza el HTML. La clave incluye un token de compilación: si la
+plantilla cambia y Jinja la recompila, las entradas viejas dejan de usarse.
+`invalidar()` borra el caché (todo o de una plantilla) cuando cambia algo que
+el bloque muestra y que no está en las claves.
+
+FRAGMENTOS_CACHE=0 lo desactiva (útil para medir, ver bench/fragmentos.py).
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+ACTIVO = os.getenv("FRAGMENTOS_CACHE", "1") == "1"
+MAX_ENTRADAS = int(os.getenv("FRAGMENTOS_MAX", "1024"))
+
+_lock = threading.Lock()
+_cache: dict[tuple, tuple[str, float]] = {}   # clave -> (html, segundos que tomó renderizarlo)
+_stats = {"aciertos": 0, "fallos": 0, "seg_ahorrados": 0.0}
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        claves = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            claves.append(parser.parse_expression())
+        cuerpo = parser.parse_statements(("name:endcache",), drop_needle=True)
+        bloque = nodes.Const(f"{parser.name}:{lineno}:{uuid.uuid4().hex[:8]}")
+        return nodes.CallBlock(
+            self.call_method("_render", [bloque, nodes.List(claves)]), [], [], cuerpo
+        ).set_lineno(lineno)
+
+    def _render(self, bloque: str, claves: list, caller) -> str:
+        if not ACTIVO:
+            return caller()
+        clave = (bloque, *claves)
+        entrada = _cache.get(clave)
+        if entrada is not None:
+            _stats["aciertos"] += 1
+            _stats["seg_ahorrados"] += entrada[1]
+            return entrada[0]
+        t0 = time.perf_counter()
+        html = caller()
+        with _lock:
+            _stats["fallos"] += 1
+            if len(_cache) >= MAX_ENTRADAS:
+                _cache.clear()
+            _cache[clave] = (html, time.perf_counter() - t0)
+        return html
+
+def invalidar(plantilla: str | None = None) -> None:
+    """Olvida los fragmentos de `plantilla` (ej. 'partials/sidebar.html'), o todos."""
+    with _lock:
+        if plantilla is None:
+            _cache.clear()
+            return
+        for clave in [c for c in _cache if c[0].startswith(plantilla + ":")]:
+            del _cache[clave]
+
+def estadisticas() -> dict:
+    return {**_stats, "entradas": len(_cache)}
+
+# ---------- clave de sección para el sidebar ----------
+SIDEBAR = Path("templates/partials/sidebar.html")
+_rutas_menu: tuple[int, frozenset[str]] = (0, frozenset())
+
+def _links_exactos() -> frozenset[str]:
+    # rutas que el sidebar compara con `path == '...'`; se releen si cambia el archivo
+    global _rutas_menu
+    mtime = SIDEBAR.stat().st_mtime_ns
+    if _rutas_menu[0] != mtime:
+        _rutas_menu = (mtime, frozenset(re.findall(r"path == '([^']+)'", SIDEBAR.read_text(encoding="utf-8"))))
+    return _rutas_menu[1]
+
+def seccion_menu(path: str) -> str:
+    """
+    Reduce la ruta a lo que cambia el sidebar: la ruta misma si es un link del
+    menú; si no, sus dos primeros segmentos (ids numéricos normalizados), que es
+    lo que miran los `path.startswith(...)`. Así /pacientes/1 y /pacientes/2
+    comparten fragmento.
+    """
+    if path in _links_exactos():
+        return path
+    partes = ["_" if p.isdigit() else p for p in path.strip("/").split("/")[:2]]
+    return "/" + "/".join(partes) + "/…"
@@ -0,0 +1,25 @@
+# app/core/indices.py
+"""
+`create_all` solo crea índices junto con tablas nuevas. Al arrancar se revisan
+los índices declarados en los modelos y se crean los que falten en tablas que
+ya existían (por ejemplo `ix_inventario_nombre`).
+"""
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from app.models.base import Base
+
+log = logging.getLogger(__name__)
+
+def asegurar_indices(engine: Engine) -> None:
+    insp = inspect(engine)
+    for tabla in Base.metadata.sorted_tables:
+        if not tabla.indexes or not insp.has_table(tabla.name):
+            continue
+        existentes = {i["name"] for i in insp.get_indexes(tabla.name)}
+        for idx in tabla.indexes:
+            if idx.name not in existentes:
+                log.info("creando índice %s en %s", idx.name, tabla.name)
+                idx.create(bind=engine)
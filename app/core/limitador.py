@@ -0,0 +1,63 @@
+# app/core/limitador.py
+"""
+Límite de intentos fallidos de login por usuario y por IP (ventana deslizante,
+en memoria del proceso). Se consulta antes de calcular bcrypt, así que un
+ataque de fuerza bruta se rechaza sin gastar CPU en hashes.
+
+    LOGIN_MAX_USUARIO  fallos permitidos por nombre de usuario (5)
+    LOGIN_MAX_IP       fallos permitidos por IP (20)
+    LOGIN_VENTANA_SEG  largo de la ventana (300)
+
+`ambito` separa los contadores por usuario: los fallos de la contraseña actual
+en /mi-password ("mi-password") no bloquean el login ("login") del usuario.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+MAX_USUARIO = int(os.getenv("LOGIN_MAX_USUARIO", "5"))
+MAX_IP = int(os.getenv("LOGIN_MAX_IP", "20"))
+VENTANA_SEG = float(os.getenv("LOGIN_VENTANA_SEG", "300"))
+MAX_CLAVES = 50_000   # tope de memoria: se purgan las claves vencidas al superarlo
+
+_lock = threading.Lock()
+_fallos: dict[str, deque] = {}
+
+def _vigentes(clave: str, ahora: float) -> int:
+    d = _fallos.get(clave)
+    if not d:
+        return 0
+    while d and d[0] <= ahora - VENTANA_SEG:
+        d.popleft()
+    if not d:
+        del _fallos[clave]
+        return 0
+    return len(d)
+
+def _purgar(ahora: float) -> None:
+    for clave in list(_fallos):
+        _vigentes(clave, ahora)
+
+def _clave_usuario(usuario: str, ambito: str) -> str:
+    return f"{ambito}:u:{usuario.lower()}"
+
+def permitido(usuario: str, ip: str | None, ambito: str = "login") -> bool:
+    ahora = time.monotonic()
+    with _lock:
+        if _vigentes(_clave_usuario(usuario, ambito), ahora) >= MAX_USUARIO:
+            return False
+        return not ip or _vigentes(f"ip:{ip}", ahora) < MAX_IP
+
+def fallo(usuario: str, ip: str | None, ambito: str = "login") -> None:
+    ahora = time.monotonic()
+    with _lock:
+        if len(_fallos) > MAX_CLAVES:
+            _purgar(ahora)
+        for clave in (_clave_usuario(usuario, ambito), f"ip:{ip}" if ip else None):
+            if clave:
+                _fallos.setdefault(clave, deque()).append(ahora)
+
+def exito(usuario: str, ambito: str = "login") -> None:
+    with _lock:
+        _fallos.pop(_clave_usuario(usuario, ambito), None)
@@ -0,0 +1,170 @@
+# app/core/metricas.py
+"""
+Métricas del proceso en el formato de texto de Prometheus (`GET /metrics`).
+
+Por método y ruta (la plantilla, ej. `/api/{scope}/movimientos`, no la URL:
+así no se crea una serie por cada id):
+
+- app_http_duracion_segundos   histograma de latencia hasta el último byte
+- app_http_requests_total      requests por código de estado
+- app_http_en_curso            requests en curso (todo el proceso)
+- app_db_segundos, app_render_segundos, app_db_consultas_total
+                               tiempo en BD y en plantillas, de app.core.consultas
+
+Pool de conexiones, cachés y réplica se leen recién al pedir /metrics.
+
+El middleware es ASGI puro y todo se registra en el event loop, así que los
+contadores son dicts sin lock: un par de sumas por request. Cada worker de
+uvicorn tiene sus propios contadores (el scraper debe ver cada proceso).
+"""
+import time
+from bisect import bisect_left
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import consultas
+
+BUCKETS_SEG = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIN_RUTA = "sin_ruta"   # 404 y redirecciones a /login antes del ruteo
+
+class Histograma:
+    __slots__ = ("cuentas", "suma")
+
+    def __init__(self):
+        self.cuentas = [0] * (len(BUCKETS_SEG) + 1)   # el último es +Inf
+        self.suma = 0.0
+
+    def observar(self, valor: float) -> None:
+        self.cuentas[bisect_left(BUCKETS_SEG, valor)] += 1
+        self.suma += valor
+
+_duracion: dict[tuple[str, str], Histograma] = {}
+_db: dict[tuple[str, str], Histograma] = {}
+_render: dict[tuple[str, str], Histograma] = {}
+_consultas: dict[tuple[str, str], int] = {}
+_estados: dict[tuple[str, str, int], int] = {}
+_en_curso = 0
+
+def _observar(serie: dict, clave: tuple, valor: float) -> None:
+    h = serie.get(clave)
+    if h is None:
+        h = serie[clave] = Histograma()
+    h.observar(valor)
+
+def registrar(metodo: str, ruta: str, estado: int, seg: float, m: consultas.Medicion | None) -> None:
+    clave = (metodo, ruta)
+    _observar(_duracion, clave, seg)
+    _estados[(metodo, ruta, estado)] = _estados.get((metodo, ruta, estado), 0) + 1
+    if m is not None:
+        _observar(_db, clave, m.db_seg)
+        _observar(_render, clave, m.render_seg)
+        _consultas[clave] = _consultas.get(clave, 0) + m.n
+
+class MetricasHTTP:
+    """
+    Registra cada request al terminar de enviar la respuesta. Va dentro de
+    consultas.MedicionSQL para leer su medición del request.
+    """
+
+    def __init__(self, app: ASGIApp, excluir: tuple[str, ...] = ("/static",)) -> None:
+        self.app = app
+        self.excluir = excluir
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _en_curso
+        if scope["type"] != "http" or scope["path"].startswith(self.excluir):
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        async def enviar(message: Message) -> None:
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        _en_curso += 1
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _en_curso -= 1
+            # el router deja la ruta encontrada en el mismo scope
+            ruta = getattr(scope.get("route"), "path", None) or SIN_RUTA
+            registrar(scope["method"], ruta, estado, time.perf_counter() - t0, consultas.actual())
+
+# ---------- exposición ----------
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"')
+
+def _etiquetas(**kw) -> str:
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in kw.items()) + "}"
+
+def _cabecera(lineas: list[str], nombre: str, tipo: str, ayuda: str) -> None:
+    lineas.append(f"# HELP {nombre} {ayuda}")
+    lineas.append(f"# TYPE {nombre} {tipo}")
+
+def _histogramas(lineas: list[str], nombre: str, ayuda: str, serie: dict) -> None:
+    _cabecera(lineas, nombre, "histogram", ayuda)
+    for (metodo, ruta), h in sorted(serie.items()):
+        acum = 0
+        for b, n in zip(BUCKETS_SEG, h.cuentas):
+            acum += n
+            lineas.append(f"{nombre}_bucket{_etiquetas(metodo=metodo, ruta=ruta, le=b)} {acum}")
+        acum += h.cuentas[-1]
+        lineas.append(f"{nombre}_bucket{_etiquetas(metodo=metodo, ruta=ruta, le='+Inf')} {acum}")
+        lineas.append(f"{nombre}_sum{_etiquetas(metodo=metodo, ruta=ruta)} {h.suma:.6f}")
+        lineas.append(f"{nombre}_count{_etiquetas(metodo=metodo, ruta=ruta)} {acum}")
+
+def _valores(lineas: list[str], nombre: str, tipo: str, ayuda: str, valores: list[tuple[dict, float]]) -> None:
+    _cabecera(lineas, nombre, tipo, ayuda)
+    for etiquetas, valor in valores:
+        lineas.append(f"{nombre}{_etiquetas(**etiquetas) if etiquetas else ''} {valor}")
+
+def exponer(pools: dict, caches: dict, replica: dict) -> str:
+    """
+    Texto para /metrics. `pools` es {motor: pool.estadisticas(...)},
+    `caches` es {nombre: {"entradas", "aciertos"?, "fallos"?}} y `replica`
+    es replicas.estado().
+    """
+    lineas: list[str] = []
+    _histogramas(lineas, "app_http_duracion_segundos", "Latencia por ruta hasta el último byte.", _duracion)
+    _valores(lineas, "app_http_requests_total", "counter", "Requests por ruta y código de estado.", [
+        ({"metodo": m, "ruta": r, "estado": e}, n) for (m, r, e), n in sorted(_estados.items())
+    ])
+    _valores(lineas, "app_http_en_curso", "gauge", "Requests en curso en este proceso.", [({}, _en_curso)])
+    _histogramas(lineas, "app_db_segundos", "Tiempo en consultas SQL por request.", _db)
+    _histogramas(lineas, "app_render_segundos", "Tiempo renderizando plantillas por request.", _render)
+    _valores(lineas, "app_db_consultas_total", "counter", "Sentencias SQL ejecutadas por ruta.", [
+        ({"metodo": m, "ruta": r}, n) for (m, r), n in sorted(_consultas.items())
+    ])
+
+    con_pool = {motor: s for motor, s in pools.items() if s}
+    _valores(lineas, "app_pool_conexiones", "gauge", "Conexiones del pool por estado.", [
+        ({"motor": motor, "estado": estado}, s[estado])
+        for motor, s in con_pool.items() for estado in ("en_uso", "libres", "overflow", "tamano")
+    ])
+    for clave, ayuda in (("checkouts", "Conexiones entregadas por el pool."),
+                         ("timeouts", "Checkouts que agotaron DB_POOL_TIMEOUT.")):
+        _valores(lineas, f"app_pool_{clave}_total", "counter", ayuda, [
+            ({"motor": motor}, s[clave]) for motor, s in con_pool.items()
+        ])
+    _valores(lineas, "app_pool_espera_segundos_total", "counter", "Tiempo total esperando una conexión.", [
+        ({"motor": motor}, s["espera_ms_total"] / 1000) for motor, s in con_pool.items()
+    ])
+
+    _valores(lineas, "app_cache_entradas", "gauge", "Entradas en cada caché en memoria.", [
+        ({"cache": nombre}, c["entradas"]) for nombre, c in caches.items()
+    ])
+    for clave, ayuda in (("aciertos", "Lecturas servidas desde la caché."),
+                         ("fallos", "Lecturas que tuvieron que calcularse.")):
+        _valores(lineas, f"app_cache_{clave}_total", "counter", ayuda, [
+            ({"cache": nombre}, c[clave]) for nombre, c in caches.items() if clave in c
+        ])
+
+    if replica.get("activa"):
+        retraso = replica.get("retraso_seg")
+        _valores(lineas, "app_replica_retraso_segundos", "gauge", "Retraso medido de la réplica.", [
+            ({}, "NaN" if retraso is None else retraso)
+        ])
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,214 @@
+# app/core/perfilador.py
+"""
+Perfil de un request puntual, a pedido de un Admin.
+
+Con `?_perfil=1` en la URL (o el encabezado `X-Perfil: 1`) se perfila ese
+request: mientras dura, hasta el último byte, un hilo toma cada
+PERFIL_INTERVALO_MS la pila de los hilos que están ejecutando código de la app
+(el event loop, con las consultas de `run_sync`, y los hilos del threadpool).
+El resultado queda en PERFILES_DIR en formato speedscope (abrir el archivo en
+https://www.speedscope.app) y se lista en /admin/perfiles; se conservan los
+últimos PERFILES_MAX.
+
+Es un muestreo de todo el proceso: si el worker atiende otros requests al
+mismo tiempo, también aparecen. Los requests normales no pagan nada más que
+mirar si viene el parámetro.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.auth import is_admin
+
+log = logging.getLogger(__name__)
+
+DIR = Path(os.getenv("PERFILES_DIR") or os.path.join(tempfile.gettempdir(), "fundacion-perfiles"))
+MAX = int(os.getenv("PERFILES_MAX", "50"))
+INTERVALO_SEG = float(os.getenv("PERFIL_INTERVALO_MS", "2")) / 1000
+PARAM = "_perfil"
+ENCABEZADO = b"x-perfil"
+APP_DIR = str(Path(__file__).resolve().parent.parent)   # solo pilas que pasan por app/
+EXTENSION = ".speedscope.json"
+
+class Muestreador(threading.Thread):
+    """Toma muestras de las pilas de los demás hilos hasta que se llama a `detener()`."""
+
+    def __init__(self, intervalo: float = INTERVALO_SEG):
+        super().__init__(name="perfilador", daemon=True)
+        self.intervalo = intervalo
+        self._fin = threading.Event()
+        self.marcos: list[dict] = []            # `shared.frames` de speedscope
+        self._indices: dict[object, int] = {}   # code object -> índice en marcos
+        self.muestras: dict[int, list[tuple[list[int], float]]] = {}   # hilo -> [(pila, seg)]
+        self.nombres: dict[int, str] = {}
+
+    def _indice(self, code) -> int:
+        i = self._indices.get(code)
+        if i is None:
+            i = self._indices[code] = len(self.marcos)
+            self.marcos.append({
+                "name": getattr(code, "co_qualname", code.co_name),
+                "file": code.co_filename,
+                "line": code.co_firstlineno,
+            })
+        return i
+
+    def _pila(self, frame) -> list[int] | None:
+        codes = []
+        de_la_app = False
+        while frame is not None:
+            codes.append(frame.f_code)
+            de_la_app = de_la_app or frame.f_code.co_filename.startswith(APP_DIR)
+            frame = frame.f_back
+        if not de_la_app:
+            return None   # hilo inactivo o ajeno a la app
+        return [self._indice(c) for c in reversed(codes)]
+
+    def run(self) -> None:
+        propio = threading.get_ident()
+        anterior = time.perf_counter()
+        while not self._fin.wait(self.intervalo):
+            ahora = time.perf_counter()
+            peso, anterior = ahora - anterior, ahora
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = self._pila(frame)
+                if pila is not None:
+                    self.muestras.setdefault(ident, []).append((pila, peso))
+        self.nombres = {t.ident: t.name for t in threading.enumerate()}
+
+    def detener(self) -> None:
+        self._fin.set()
+        self.join()
+
+    def speedscope(self, nombre: str) -> dict:
+        perfiles = [
+            {
+                "type": "sampled",
+                "name": self.nombres.get(ident, f"hilo {ident}"),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(p for _, p in muestras),
+                "samples": [pila for pila, _ in muestras],
+                "weights": [p for _, p in muestras],
+            }
+            for ident, muestras in self.muestras.items()
+        ]
+        perfiles.sort(key=lambda p: p["endValue"], reverse=True)   # el hilo más ocupado primero
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": nombre,
+            "exporter": "fundacion-perfilador",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.marcos},
+            "profiles": perfiles,
+        }
+
+# ---------- archivos ----------
+def _guardar(m: Muestreador, meta: dict) -> str:
+    DIR.mkdir(parents=True, exist_ok=True)
+    ahora = time.time()
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", meta["ruta"]).strip("_")[:60] or "raiz"
+    nombre = (
+        f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(ahora))}-{int(ahora * 1000) % 1000:03d}"
+        f"-{meta['metodo']}-{slug}"
+    )
+    meta = {**meta, "nombre": nombre + EXTENSION, "fecha": ahora,
+            "muestras": sum(len(v) for v in m.muestras.values())}
+    titulo = f"{meta['metodo']} {meta['url']} · {meta['estado']} · {meta['ms']:.0f} ms"
+    (DIR / (nombre + EXTENSION)).write_text(json.dumps(m.speedscope(titulo)), encoding="utf-8")
+    (DIR / (nombre + ".meta.json")).write_text(json.dumps(meta), encoding="utf-8")
+    _podar()
+    return meta["nombre"]
+
+def _podar() -> None:
+    perfiles = sorted(DIR.glob("*" + EXTENSION), reverse=True)
+    for viejo in perfiles[MAX:]:
+        viejo.unlink(missing_ok=True)
+        (DIR / viejo.name.replace(EXTENSION, ".meta.json")).unlink(missing_ok=True)
+
+def listar() -> list[dict]:
+    """Perfiles guardados, del más reciente al más antiguo."""
+    if not DIR.is_dir():
+        return []
+    perfiles = []
+    for meta in sorted(DIR.glob("*.meta.json"), reverse=True):
+        try:
+            datos = json.loads(meta.read_text(encoding="utf-8"))
+            datos["bytes"] = (DIR / datos["nombre"]).stat().st_size
+        except (OSError, ValueError, KeyError):
+            continue   # borrado por otro worker mientras se listaba
+        perfiles.append(datos)
+    return perfiles
+
+def ruta_archivo(nombre: str) -> Path | None:
+    """Ruta del perfil `nombre`, solo si es uno de los guardados."""
+    if nombre.endswith(EXTENSION) and "/" not in nombre and "\\" not in nombre:
+        ruta = DIR / nombre
+        if ruta.is_file():
+            return ruta
+    return None
+
+# ---------- middleware ----------
+def _pedido(scope: Scope) -> bool:
+    if f"{PARAM}=".encode() in scope.get("query_string", b""):
+        return True
+    return any(k == ENCABEZADO for k, _ in scope.get("headers", ()))
+
+class Perfilador:
+    """
+    Perfila los requests de Admin que lo piden. Va dentro del middleware de
+    autenticación, que deja el usuario en scope["state"].
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not _pedido(scope):
+            await self.app(scope, receive, send)
+            return
+        user = scope.get("state", {}).get("user")
+        if not is_admin(user):
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        async def enviar(message: Message) -> None:
+            nonlocal estado
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+            await send(message)
+
+        m = Muestreador()
+        m.start()
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            await run_in_threadpool(m.detener)
+            qs = scope.get("query_string", b"").decode("latin-1")
+            meta = {
+                "metodo": scope["method"],
+                "ruta": scope["path"],
+                "url": scope["path"] + (f"?{qs}" if qs else ""),
+                "estado": estado,
+                "ms": round(ms, 1),
+                "usuario": user.username,
+            }
+            try:
+                nombre = await run_in_threadpool(_guardar, m, meta)
+                log.info("Perfil guardado: %s (%.0f ms)", nombre, ms)
+            except OSError:
+                log.exception("No se pudo guardar el perfil de %s", meta["url"])
@@ -0,0 +1,111 @@
+# app/core/pool.py
+"""
+Pool de conexiones con métricas y verificación barata de conexiones viejas.
+
+- `PoolMedido` es el QueuePool de SQLAlchemy midiendo cuánto espera cada
+  checkout (histograma en ms) y cuántos terminan en timeout.
+- En vez de `pool_pre_ping` (un SELECT 1 en cada checkout) solo se verifica la
+  conexión si estuvo inactiva más de DB_PING_INACTIVA_SEG; si falla, el pool la
+  descarta y entrega otra. Con carga, las conexiones se reusan al instante y no
+  pagan el ida y vuelta.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+PING_INACTIVA_SEG = float(os.getenv("DB_PING_INACTIVA_SEG", "30"))
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+def _stats_nuevas() -> dict:
+    return {
+        "checkouts": 0,
+        "timeouts": 0,
+        "pings": 0,
+        "descartadas": 0,
+        "espera_ms_total": 0.0,
+        "espera_buckets": [0] * (len(BUCKETS_MS) + 1),   # el último es > BUCKETS_MS[-1]
+    }
+
+class PoolMedido(QueuePool):
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._lock_stats = threading.Lock()
+        self._stats = _stats_nuevas()
+
+    def _sumar(self, clave: str, n: float = 1) -> None:
+        with self._lock_stats:
+            self._stats[clave] += n
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            entrada = super()._do_get()
+        except exc.TimeoutError:
+            self._sumar("timeouts")
+            raise
+        ms = (time.perf_counter() - t0) * 1000
+        i = next((i for i, b in enumerate(BUCKETS_MS) if ms <= b), len(BUCKETS_MS))
+        with self._lock_stats:
+            self._stats["checkouts"] += 1
+            self._stats["espera_ms_total"] += ms
+            self._stats["espera_buckets"][i] += 1
+        return entrada
+
+class PoolMedidoAsync(PoolMedido, AsyncAdaptedQueuePool):
+    """El mismo pool para el motor asíncrono (app.db_async)."""
+
+# ---------- conexiones inactivas ----------
+@event.listens_for(PoolMedido, "connect")
+def _al_conectar(dbapi_con, record):
+    record.info["devuelta"] = time.monotonic()
+
+@event.listens_for(PoolMedido, "checkin")
+def _al_devolver(dbapi_con, record):
+    record.info["devuelta"] = time.monotonic()
+
+@event.listens_for(PoolMedido, "checkout")
+def _al_sacar(dbapi_con, record, proxy):
+    devuelta = record.info.get("devuelta")
+    if devuelta is None or time.monotonic() - devuelta < PING_INACTIVA_SEG:
+        return
+    pool = proxy._pool
+    pool._sumar("pings")
+    try:
+        cur = dbapi_con.cursor()
+        cur.execute("SELECT 1")
+        cur.close()
+    except Exception:
+        pool._sumar("descartadas")
+        # el pool invalida esta conexión y reintenta el checkout con una nueva
+        raise exc.DisconnectionError()
+
+# ---------- API pública ----------
+def agotado(pool) -> bool:
+    """True si un checkout tendría que esperar: todas las conexiones en uso y sin overflow libre."""
+    if not isinstance(pool, QueuePool):
+        return False
+    return pool.checkedin() == 0 and pool.checkedout() >= pool.size() + pool._max_overflow
+
+def estadisticas(pool) -> dict:
+    if not isinstance(pool, PoolMedido):
+        return {}
+    with pool._lock_stats:
+        copia = {**pool._stats, "espera_buckets": list(pool._stats["espera_buckets"])}
+    etiquetas = [f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+    return {
+        "checkouts": copia["checkouts"],
+        "timeouts": copia["timeouts"],
+        "pings": copia["pings"],
+        "descartadas": copia["descartadas"],
+        "espera_ms_total": round(copia["espera_ms_total"], 3),
+        "espera_ms": dict(zip(etiquetas, copia["espera_buckets"])),
+        "tamano": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "en_uso": pool.checkedout(),
+        "libres": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seg": pool.timeout(),
+    }
@@ -0,0 +1,96 @@
+# app/core/replicas.py
+"""
+Lecturas en una réplica de MySQL (DB_REPLICA_URL) para informes y dashboard.
+
+- Retraso: un hilo escribe cada REPLICA_LATIDO_SEG la hora actual en la fila
+  `latido` de `versiones` del primario y la lee en la réplica; la diferencia es
+  el retraso de replicación (como pt-heartbeat, sin permisos especiales).
+- Si la réplica no responde, no tiene la fila o va atrasada más de
+  REPLICA_MAX_RETRASO_SEG, las lecturas vuelven al primario.
+- Lee-lo-que-escribiste: después de un POST del usuario, sus lecturas van al
+  primario durante REPLICA_PEGAJOSO_SEG (marca en la cookie de sesión, así
+  vale para todos los workers).
+"""
+import logging
+import os
+import threading
+import time
+
+from fastapi import Request
+from sqlalchemy import insert, select, update
+from sqlalchemy.engine import Engine
+
+from app.models.sistema import Version
+
+log = logging.getLogger(__name__)
+
+LATIDO = "latido"
+LATIDO_SEG = float(os.getenv("REPLICA_LATIDO_SEG", "1"))
+MAX_RETRASO_SEG = float(os.getenv("REPLICA_MAX_RETRASO_SEG", "5"))
+PEGAJOSO_SEG = float(os.getenv("REPLICA_PEGAJOSO_SEG", "10"))
+CLAVE_SESION = "escritura_hasta"
+EPOCA = 1577836800   # 2020-01-01: `versiones.version` es INT, así el latido no se desborda en 2038
+
+_estado = {"activa": False, "retraso_seg": None, "error": None, "medido": 0.0}
+_detener = threading.Event()
+_hilo: threading.Thread | None = None
+
+def _latir(primario: Engine, replica: Engine) -> None:
+    ahora = int(time.time()) - EPOCA
+    with primario.begin() as con:
+        res = con.execute(update(Version).where(Version.nombre == LATIDO).values(version=ahora))
+        if not res.rowcount:
+            con.execute(insert(Version).values(nombre=LATIDO, version=ahora))
+    with replica.connect() as con:
+        visto = con.execute(select(Version.version).where(Version.nombre == LATIDO)).scalar()
+    _estado.update(
+        retraso_seg=max(0.0, time.time() - EPOCA - visto) if visto else None,
+        error=None if visto else "sin latido en la réplica",
+        medido=time.monotonic(),
+    )
+
+def _bucle(primario: Engine, replica: Engine) -> None:
+    while not _detener.is_set():
+        try:
+            _latir(primario, replica)
+        except Exception as e:
+            _estado.update(retraso_seg=None, error=type(e).__name__, medido=time.monotonic())
+            log.warning("Réplica no disponible: %s", e)
+        _detener.wait(LATIDO_SEG)
+
+def iniciar(primario: Engine, replica: Engine | None) -> None:
+    """Arranca el monitor de retraso (una vez por proceso); sin réplica no hace nada."""
+    global _hilo
+    if replica is None or _hilo is not None:
+        return
+    _estado["activa"] = True
+    _detener.clear()
+    _hilo = threading.Thread(target=_bucle, args=(primario, replica), name="latido-replica", daemon=True)
+    _hilo.start()
+
+def detener() -> None:
+    global _hilo
+    _detener.set()
+    _hilo = None
+
+def estado() -> dict:
+    return {**_estado, "max_retraso_seg": MAX_RETRASO_SEG}
+
+def disponible() -> bool:
+    """True si hay réplica, se midió hace poco y su retraso está dentro del límite."""
+    if not _estado["activa"] or _estado["retraso_seg"] is None:
+        return False
+    if time.monotonic() - _estado["medido"] > max(3 * LATIDO_SEG, MAX_RETRASO_SEG):
+        return False   # el monitor se quedó pegado: no confiar en la última medición
+    return _estado["retraso_seg"] <= MAX_RETRASO_SEG
+
+# ---------- por request ----------
+def marcar_escritura(request: Request) -> None:
+    """Llamar después de un POST/PUT/DELETE: las próximas lecturas del usuario van al primario."""
+    if _estado["activa"]:
+        request.session[CLAVE_SESION] = time.time() + PEGAJOSO_SEG
+
+def usar_replica(request: Request) -> bool:
+    if not disponible():
+        return False
+    return request.session.get(CLAVE_SESION, 0) < time.time()
@@ -0,0 +1,56 @@
+# app/core/respuestas.py
+"""
+Respuestas JSON de la API.
+
+- `JSONRapido` serializa con orjson (Decimal, date y datetime sin pasar por
+  `jsonable_encoder`).
+- `json_condicional` calcula un ETag a partir de las versiones de las tablas
+  que alimentan la respuesta (ver `versiones.vigilar`) y de los parámetros; si
+  el cliente ya tiene esa versión responde 304 sin consultar ni serializar nada.
+"""
+import hashlib
+from decimal import Decimal
+from typing import Any, Callable
+
+import orjson
+from fastapi import Request
+from fastapi.responses import ORJSONResponse
+from starlette.responses import Response
+from sqlalchemy.orm import Session
+
+from app.core import versiones
+
+FORMATO = "1"   # subir si cambia la forma del JSON, para invalidar los ETag emitidos
+CACHE_API = "private, no-cache"
+
+def _default(obj: Any):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+class JSONRapido(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def _etag(claves: dict[str, int], params: dict) -> str:
+    normalizados = sorted((k, str(v)) for k, v in params.items() if v not in (None, ""))
+    crudo = orjson.dumps([FORMATO, sorted(claves.items()), normalizados])
+    return 'W/"' + hashlib.sha1(crudo).hexdigest()[:20] + '"'
+
+def json_condicional(
+    request: Request,
+    db: Session,
+    tablas: tuple[str, ...],
+    params: dict,
+    producir: Callable[[], Any],
+) -> Response:
+    """
+    `tablas` son claves de `versiones` (ej. `clave_tabla("banco_movimientos")`,
+    `"catalogo:categorias"`); `producir` arma el contenido solo si hace falta.
+    """
+    etag = _etag(versiones.leer(db, tablas), params)
+    headers = {"etag": etag, "cache-control": CACHE_API}
+    previos = {e.strip() for e in request.headers.get("if-none-match", "").split(",")}
+    if etag in previos or "*" in previos:
+        return Response(status_code=304, headers=headers)
+    return JSONRapido(producir(), headers=headers)
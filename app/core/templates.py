@@ -1,9 +1,190 @@
+"""
+Único entorno de Jinja de la app: todas las rutas importan `templates` de aquí,
+y filtros y globales se registran solo en este módulo.
+
+Las plantillas compiladas se guardan en disco (TEMPLATES_CACHE_DIR) para que un
+proceso nuevo no tenga que volver a compilarlas, y `precompilar()` las carga
+todas al arrancar. Para calentar el caché en el deploy, antes de levantar los
+workers:
+
+    python -m app.core.templates
+"""
+import logging
+import os
+import tempfile
+import time
 from datetime import datetime
+from typing import Callable, Iterable, Iterator
+
+import jinja2
+from fastapi import Request
+from fastapi.responses import StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-templates = Jinja2Templates(directory="templates")
+from app.core import consultas
+from app.core.estaticos import static_url
+from app.core.fragmentos import FragmentCacheExtension, seccion_menu
+from app.db import SessionLocal
+from app.utils.fechas import fecha_cl, fecha_hora_cl
+from app.utils.money import clp, clp_signed
+
+log = logging.getLogger(__name__)
+
+TEMPLATES_DIR = "templates"
+CACHE_DIR = os.getenv("TEMPLATES_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "fundacion-jinja")
+# en producción conviene 0: no se revisa el mtime de cada plantilla en cada render
+AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "1") == "1"
+
+os.makedirs(CACHE_DIR, exist_ok=True)
+
+class Plantilla(jinja2.Template):
+    """Template que suma su tiempo de `render()` al request en curso (Server-Timing)."""
+
+    def render(self, *args, **kwargs) -> str:
+        m = consultas.actual()
+        if m is None:
+            return super().render(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            m.render_seg += time.perf_counter() - t0
+
+env = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+    autoescape=True,
+    auto_reload=AUTO_RELOAD,
+    cache_size=-1,   # sin límite: son pocas plantillas y todas quedan precompiladas
+    bytecode_cache=jinja2.FileSystemBytecodeCache(CACHE_DIR),
+    extensions=[FragmentCacheExtension],   # {% cache ... %} (ver app.core.fragmentos)
+)
+env.template_class = Plantilla
+templates = Jinja2Templates(env=env)
 
 # helpers globales
-templates.env.globals.update(
+env.globals.update(
     now=datetime.now,       # {{ now() }}
-)
\ No newline at end of file
+    static_url=static_url,  # {{ static_url('css/app.css') }} -> URL con hash de contenido
+    seccion_menu=seccion_menu,
+)
+
+# filtros
+env.filters.update(
+    clp=clp,                # {{ monto|clp }}        -> $1.234.-
+    clp_signed=clp_signed,  # {{ monto|clp_signed }} -> +$1.234.-
+    fecha_cl=fecha_cl,      # {{ fecha|fecha_cl }}   -> 31/12/2025
+    fecha_hora_cl=fecha_hora_cl,  # {{ utc|fecha_hora_cl }} -> 31/12/2025 21:30 (hora local)
+)
+
+def precompilar() -> int:
+    """Compila (o lee del caché en disco) todas las plantillas; devuelve cuántas."""
+    t0 = time.perf_counter()
+    n = 0
+    for nombre in env.list_templates(filter_func=lambda n: n.endswith(".html")):
+        try:
+            env.get_template(nombre)
+            n += 1
+        except jinja2.TemplateError:
+            log.exception("No se pudo compilar la plantilla %s", nombre)
+    log.info("%d plantillas precompiladas en %.0f ms", n, (time.perf_counter() - t0) * 1000)
+    return n
+
+# ---------- render en streaming ----------
+BLOQUE_BYTES = 16 * 1024
+
+def _por_bloques(partes: Iterator[str]) -> Iterator[bytes]:
+    # Template.generate() entrega fragmentos muy chicos; se agrupan para no
+    # pagar un salto al threadpool (y un bloque gzip) por cada uno.
+    # El tiempo generando cada bloque se suma a `render` del request.
+    m = consultas.actual()
+    buf: list[str] = []
+    tam = 0
+    t0 = time.perf_counter()
+    for parte in partes:
+        buf.append(parte)
+        tam += len(parte)
+        if tam >= BLOQUE_BYTES:
+            if m is not None:
+                m.render_seg += time.perf_counter() - t0
+            yield "".join(buf).encode("utf-8")
+            buf, tam = [], 0
+            t0 = time.perf_counter()
+    if m is not None:
+        m.render_seg += time.perf_counter() - t0
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+def stream_template(request: Request, name: str, context: dict, status_code: int = 200,
+                    bloque: str | None = None) -> StreamingResponse:
+    """
+    Como templates.TemplateResponse, pero envía el HTML a medida que se genera.
+    Con `bloque` se renderiza solo ese `{% block %}` de la plantilla.
+
+    El render ocurre después de que la ruta retorna y la sesión de BD ya se
+    cerró: el contexto debe traer los datos ya cargados (listas, dicts o
+    relaciones cargadas con joinedload/contains_eager) o `FilasDiferidas`.
+    """
+    context.setdefault("request", request)
+    plantilla = templates.get_template(name)
+    if bloque:
+        partes = plantilla.blocks[bloque](plantilla.new_context(context))
+    else:
+        partes = plantilla.generate(context)
+    return StreamingResponse(
+        _por_bloques(partes),
+        status_code=status_code,
+        media_type="text/html; charset=utf-8",
+    )
+
+# ---------- actualizaciones parciales ----------
+BLOQUE_PARCIAL = "resultados"
+
+def es_parcial(request: Request) -> bool:
+    """
+    True si el pedido viene de un filtro que solo reemplaza los resultados
+    (app.js manda `HX-Request: true`, igual que htmx). La ruta puede saltarse
+    lo que solo usa el resto de la página, como los catálogos de los selects.
+    """
+    return request.headers.get("hx-request") == "true"
+
+def pagina_o_parcial(request: Request, name: str, context: dict) -> StreamingResponse:
+    """La página completa, o solo su bloque `resultados` si es un pedido parcial."""
+    parcial = es_parcial(request)
+    context["parcial"] = parcial
+    response = stream_template(request, name, context, bloque=BLOQUE_PARCIAL if parcial else None)
+    response.headers["vary"] = "HX-Request"
+    return response
+
+class FilasDiferidas:
+    """
+    Filas de un listado que se consultan recién cuando la plantilla las recorre.
+
+    Se leen por lotes: `lote(db, ultima)` recibe una sesión propia (la del
+    request ya está cerrada) y la última fila del lote anterior (None en el
+    primero), y devuelve hasta `tamano` filas siguientes, paginando por cursor
+    sobre el orden del listado (sin OFFSET). La sesión se cierra antes de
+    entregar el lote a la plantilla, así que la conexión vuelve al pool
+    mientras el HTML se genera y se envía: un cliente lento no retiene una
+    conexión por todo el listado. Cada lote es su propia transacción.
+
+    Solo admite `{% for %}`: no usar `|length` ni indexar.
+    """
+
+    def __init__(self, lote: Callable[..., Iterable], tamano: int = 500):
+        self.lote = lote
+        self.tamano = tamano
+
+    def __iter__(self):
+        ultima = None
+        while True:
+            with SessionLocal() as db:
+                # la misma consulta en cada lote no es un N+1 (ver app.core.consultas)
+                db.connection(execution_options={"por_lotes": True})
+                filas = list(self.lote(db, ultima))
+            yield from filas
+            if len(filas) < self.tamano:
+                return
+            ultima = filas[-1]
+
+if __name__ == "__main__":
+    print(f"{precompilar()} plantillas en caché ({CACHE_DIR})")
@@ -0,0 +1,75 @@
+# app/core/usuarios.py
+"""
+Identidad del usuario por request sin consultar la BD en cada página.
+
+El middleware de autenticación resuelve `request.session["user_id"]` una vez y
+deja en `request.state.user` una instantánea inmutable (`UsuarioSesion`). Las
+instantáneas se guardan en memoria USUARIOS_CACHE_SEG segundos; las rutas que
+editan usuarios llaman a `invalidar(uid)` para que el cambio se vea de inmediato
+en este proceso (los demás procesos lo ven al vencer el TTL).
+"""
+import os
+import threading
+import time
+from typing import NamedTuple
+
+from sqlalchemy import select
+
+from app.db import engine
+from app.models import User
+
+TTL_SEG = float(os.getenv("USUARIOS_CACHE_SEG", "30"))
+
+class UsuarioSesion(NamedTuple):
+    id: int
+    username: str
+    role: str
+    active: bool
+
+_lock = threading.Lock()
+_cache: dict[int, tuple[float, UsuarioSesion | None]] = {}
+_stats = {"aciertos": 0, "fallos": 0}
+
+def _cargar(user_id: int) -> UsuarioSesion | None:
+    # conexión propia y una sola fila: no abre una Session del ORM
+    _stats["fallos"] += 1
+    with engine.connect() as conn:
+        r = conn.execute(
+            select(User.id, User.username, User.role, User.active).where(User.id == user_id)
+        ).first()
+    return UsuarioSesion(r.id, r.username, r.role, bool(r.active)) if r else None
+
+def en_cache(user_id: int) -> UsuarioSesion | None | bool:
+    """La instantánea vigente, o False si no hay (o venció) y hay que cargarla."""
+    entrada = _cache.get(user_id)
+    if entrada is None or entrada[0] < time.monotonic():
+        return False
+    _stats["aciertos"] += 1
+    return entrada[1]
+
+def resolver(user_id: int) -> UsuarioSesion | None:
+    """Instantánea del usuario (None si no existe). Bloqueante en caso de fallo de caché."""
+    snap = en_cache(user_id)
+    if snap is not False:
+        return snap
+    snap = _cargar(user_id)
+    guardar(user_id, snap)
+    return snap
+
+def guardar(user_id: int, snap: UsuarioSesion | None) -> None:
+    with _lock:
+        _cache[user_id] = (time.monotonic() + TTL_SEG, snap)
+
+def desde_modelo(u: User) -> UsuarioSesion:
+    return UsuarioSesion(u.id, u.username, u.role, bool(u.active))
+
+def invalidar(user_id: int | None = None) -> None:
+    """Olvida un usuario (o todos) tras editarlo."""
+    with _lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(user_id, None)
+
+def estadisticas() -> dict:
+    return {**_stats, "entradas": len(_cache)}
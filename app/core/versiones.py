@@ -0,0 +1,77 @@
+# app/core/versiones.py
+"""
+Contadores de versión en la tabla `versiones`.
+
+Además de los catálogos (ver app.core.catalogos), las tablas registradas con
+`vigilar(...)` incrementan su versión `tabla:<nombre>` en el mismo commit en que
+el ORM las modifica. Las respuestas de la API usan esas versiones como ETag.
+"""
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.sistema import Version
+
+def leer(db: Session, nombres: tuple[str, ...]) -> dict[str, int]:
+    """Versiones actuales de `nombres` (0 si aún no existe la fila)."""
+    rows = db.execute(
+        select(Version.nombre, Version.version).where(Version.nombre.in_(nombres))
+    ).all()
+    actuales = {n: 0 for n in nombres}
+    actuales.update({r.nombre: r.version for r in rows})
+    return actuales
+
+def incrementar(db: Session, *nombres: str) -> None:
+    """
+    Incrementa la versión dentro de la transacción del llamador,
+    así el cambio se publica recién con su commit.
+    """
+    for nombre in nombres:
+        res = db.execute(
+            update(Version).where(Version.nombre == nombre).values(version=Version.version + 1)
+        )
+        if res.rowcount:
+            continue
+        try:
+            with db.begin_nested():
+                db.add(Version(nombre=nombre, version=1))
+        except IntegrityError:
+            # otro worker creó la fila en paralelo
+            db.execute(
+                update(Version).where(Version.nombre == nombre).values(version=Version.version + 1)
+            )
+
+# ---------- versiones por tabla ----------
+_vigiladas: set[str] = set()
+
+def clave_tabla(tabla: str) -> str:
+    return f"tabla:{tabla}"
+
+def vigilar(*modelos) -> None:
+    """Registra modelos cuyas escrituras por ORM incrementan `tabla:<nombre>`."""
+    _vigiladas.update(m.__tablename__ for m in modelos)
+
+@event.listens_for(Session, "after_flush")
+def _anotar_tablas(session: Session, flush_context):
+    if not _vigiladas:
+        return
+    tablas = {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if getattr(obj, "__tablename__", None) in _vigiladas
+    }
+    if tablas:
+        session.info.setdefault("tablas_modificadas", set()).update(tablas)
+
+@event.listens_for(Session, "before_commit")
+def _incrementar_tablas(session: Session):
+    if not _vigiladas:
+        return
+    session.flush()
+    tablas = session.info.pop("tablas_modificadas", None)
+    if tablas:
+        incrementar(session, *(clave_tabla(t) for t in sorted(tablas)))
+
+@event.listens_for(Session, "after_rollback")
+def _limpiar_tablas(session: Session):
+    session.info.pop("tablas_modificadas", None)
@@ -1,8 +1,26 @@
+# app/db.py
+"""
+Motor y sesiones de la BD.
+
+DATABASE_URL elige el motor; si no está, se arma la URL de MySQL con DB_*.
+Para correr sin servidor (laptop, CI, benchmarks) sirve SQLite:
+
+    DATABASE_URL=sqlite:///dev.db      # archivo
+    DATABASE_URL=sqlite://             # en memoria, compartida por todo el proceso
+"""
 import os
+import sqlite3
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import sessionmaker
 
+from fastapi import Request
+
+from app.core import replicas
+from app.core.pool import PoolMedido
+
 load_dotenv()
 
 DB_HOST = os.getenv("DB_HOST", "localhost")
@@ -11,18 +29,113 @@ DB_NAME = os.getenv("DB_NAME", "fundacion_contabilidad")
 DB_USER = os.getenv("DB_USER", "root")
 DB_PASS = os.getenv("DB_PASS", "")
 
-DATABASE_URL = (
+DATABASE_URL = os.getenv("DATABASE_URL") or (
     f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
 )
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,
-    pool_recycle=280,
-    echo=False  # pon True si quieres ver SQL en consola
-)
+# Pool: ver app.core.pool (métricas y ping solo de conexiones inactivas)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))    # seg. esperando una conexión libre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "280"))     # < wait_timeout de MySQL
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
+# Réplica de solo lectura para informes y dashboard (ver app.core.replicas); vacío = sin réplica
+DB_REPLICA_URL = os.getenv("DB_REPLICA_URL", "")
+
+# ---------- SQLite ----------
+# La BD en memoria tiene nombre, para que el motor síncrono y el asíncrono
+# (app.db_async) vean las mismas tablas. Cada hilo usa su propia conexión del
+# pool (una conexión sqlite3 compartida no admite dos transacciones a la vez);
+# la BD vive mientras quede una abierta, y para eso se deja una de ancla fuera
+# del pool. Con el VFS memdb (SQLite 3.36+) las conexiones se bloquean como con
+# un archivo y esperan `timeout`; el cache compartido, en cambio, falla al
+# instante con "database table is locked" cuando dos requests se cruzan.
+if sqlite3.sqlite_version_info >= (3, 36):
+    MEMORIA_COMPARTIDA = "file:/fundacion?vfs=memdb&uri=true"
+else:
+    MEMORIA_COMPARTIDA = "file:fundacion?mode=memory&cache=shared&uri=true"
+_ancla: sqlite3.Connection | None = None
+
+def es_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def es_memoria(url: str) -> bool:
+    u = make_url(url)
+    return es_sqlite(url) and (
+        u.database in (None, "", ":memory:") or "mode=memory" in str(u) or "vfs=memdb" in str(u)
+    )
+
+def normalizar_url(url: str) -> str:
+    if es_memoria(url):
+        return f"{make_url(url).drivername}:///{MEMORIA_COMPARTIDA}"
+    return url
+
+def opciones_engine(url: str) -> dict:
+    """Pool y connect_args según el motor (compartido con app.db_async)."""
+    if not es_sqlite(url):
+        return {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "pool_recycle": DB_POOL_RECYCLE,
+            "connect_args": {"connect_timeout": DB_CONNECT_TIMEOUT} if url.startswith("mysql") else {},
+        }
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "connect_args": {"check_same_thread": False, "timeout": 30},
+    }
+
+def anclar_memoria() -> None:
+    """Abre (una vez por proceso) la conexión que mantiene viva la BD en memoria."""
+    global _ancla
+    if _ancla is None:
+        _ancla = sqlite3.connect(MEMORIA_COMPARTIDA.removesuffix("&uri=true"), uri=True, check_same_thread=False)
+
+def preparar_sqlite(sync_engine: Engine) -> None:
+    """
+    Claves foráneas activas (ON DELETE SET NULL como en MySQL), WAL para que las
+    lecturas no esperen a las escrituras, y BEGIN explícito: el driver sqlite3
+    maneja mal las transacciones por su cuenta y rompe los SAVEPOINT de
+    `begin_nested()` (ver app.core.versiones).
+    """
+    @event.listens_for(sync_engine, "connect")
+    def _al_conectar(dbapi_con, record):
+        dbapi_con.isolation_level = None
+        cur = dbapi_con.cursor()
+        cur.execute("PRAGMA foreign_keys=ON")
+        if not es_memoria(str(sync_engine.url)):
+            cur.execute("PRAGMA journal_mode=WAL")
+        cur.close()
+
+    @event.listens_for(sync_engine, "begin")
+    def _al_empezar(con):
+        con.exec_driver_sql("BEGIN")
+
+def crear_engine(url: str):
+    url = normalizar_url(url)
+    if es_memoria(url):
+        anclar_memoria()
+    nuevo = create_engine(
+        url,
+        poolclass=PoolMedido,
+        **opciones_engine(url),
+        echo=False  # pon True si quieres ver SQL en consola
+    )
+    if es_sqlite(url):
+        preparar_sqlite(nuevo)
+    return nuevo
+
+engine = crear_engine(DATABASE_URL)
+engine_replica = crear_engine(DB_REPLICA_URL) if DB_REPLICA_URL else None
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionReplica = (
+    sessionmaker(autocommit=False, autoflush=False, bind=engine_replica)
+    if engine_replica is not None else None
+)
 
 def get_db():
     db = SessionLocal()
@@ -30,3 +143,13 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_db_lectura(request: Request):
+    """Como get_db, pero en la réplica si está al día (ver app.core.replicas)."""
+    replica = SessionReplica is not None and replicas.usar_replica(request)
+    request.state.bd = "replica" if replica else "primario"
+    db = (SessionReplica if replica else SessionLocal)()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,73 @@
+# app/db_async.py
+"""
+Motor y sesiones asíncronas para las rutas de lectura con más consultas
+(informes, transacciones, movimientos y /api): mientras esperan a
+MySQL no ocupan un hilo del threadpool de Starlette.
+
+Las consultas se escriben igual que en el resto de la app:
+`await adb.run_sync(funcion, ...)` ejecuta `funcion(session, ...)` con una
+sesión normal sobre la conexión asíncrona, así que los servicios de
+app/services sirven para ambos caminos.
+
+ASYNC_DATABASE_URL permite otro driver o base (ej. `sqlite+aiosqlite:///dev.db`
+para pruebas locales); por defecto es la misma BD de app.db con aiomysql (o
+aiosqlite si DATABASE_URL es SQLite). Lo mismo ASYNC_DB_REPLICA_URL para la
+réplica.
+
+`get_adb_lectura` es para rutas de solo lectura que toleran unos segundos de
+retraso: usa la réplica si está al día (ver app.core.replicas).
+"""
+import os
+
+from fastapi import Request
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import replicas
+from app.core.pool import PoolMedidoAsync
+from app.db import (
+    DATABASE_URL, DB_REPLICA_URL, anclar_memoria, es_memoria, es_sqlite, normalizar_url, opciones_engine, preparar_sqlite,
+)
+
+def _url_async(url: str) -> str:
+    if not url:
+        return ""
+    if es_sqlite(url):
+        return make_url(normalizar_url(url)).set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url.replace("mysql+pymysql://", "mysql+aiomysql://", 1)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _url_async(DATABASE_URL)
+ASYNC_DB_REPLICA_URL = os.getenv("ASYNC_DB_REPLICA_URL") or _url_async(DB_REPLICA_URL)
+
+def crear_engine_async(url: str):
+    url = normalizar_url(url)
+    opciones = opciones_engine(url)
+    if es_sqlite(url):
+        opciones["connect_args"] = {"timeout": 30}   # aiosqlite ya usa su propio hilo
+    if es_memoria(url):
+        anclar_memoria()
+    nuevo = create_async_engine(url, poolclass=PoolMedidoAsync, **opciones)
+    if es_sqlite(url):
+        preparar_sqlite(nuevo.sync_engine)
+    return nuevo
+
+engine_async = crear_engine_async(ASYNC_DATABASE_URL)
+engine_async_replica = crear_engine_async(ASYNC_DB_REPLICA_URL) if ASYNC_DB_REPLICA_URL else None
+
+# expire_on_commit=False: los objetos se leen después en la plantilla, con la sesión cerrada
+AsyncSessionLocal = async_sessionmaker(engine_async, expire_on_commit=False, autoflush=False)
+AsyncSessionReplica = (
+    async_sessionmaker(engine_async_replica, expire_on_commit=False, autoflush=False)
+    if engine_async_replica is not None else None
+)
+
+async def get_adb():
+    async with AsyncSessionLocal() as adb:
+        yield adb
+
+async def get_adb_lectura(request: Request):
+    """Sesión en la réplica si está disponible y el usuario no escribió hace poco; si no, el primario."""
+    replica = AsyncSessionReplica is not None and replicas.usar_replica(request)
+    request.state.bd = "replica" if replica else "primario"
+    async with (AsyncSessionReplica if replica else AsyncSessionLocal)() as adb:
+        yield adb
@@ -1,13 +1,21 @@
 from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.responses import RedirectResponse
+from starlette.concurrency import run_in_threadpool
 import os
 
 # -------------------------------
 # Base de datos y modelos
 # -------------------------------
-from app.db import engine, SessionLocal
+from app.db import engine, engine_replica, SessionLocal
+from app.core.indices import asegurar_indices
+from app.core import usuarios, claves, replicas
+from app.core.estaticos import Estaticos
+from app.core.compresion import Compresion
+from app.core.consultas import MedicionSQL
+from app.core.metricas import MetricasHTTP
+from app.core.perfilador import Perfilador
+from app.core.templates import precompilar
 
 # Importa la Base y modelos principales desde el paquete models
 from app.models import Base, User
@@ -15,6 +23,11 @@ from app.models import Base, User
 # Asegura que todas las tablas se registren en el mismo metadata
 import app.models.finance          # incluye User, Categoria, Transaccion
 import app.models_finanzas         # incluye BancoMovimiento, CajaMovimiento
+import app.models.sistema          # incluye Version (caché de catálogos)
+import app.models.analitica        # agregados de pacientes
+import app.models.vulnerabilidad   # reglas y puntajes calculados
+import app.models.atenciones       # atenciones y resumen por paciente
+import app.models.inv_movimientos  # libro y saldos de inventario
 
 # -------------------------------
 # Routers
@@ -30,12 +43,15 @@ from app.routers.dashboard import router as dashboard_router
 from app.routers.finanzas import router as finanzas_pages_router
 from app.routers import usuarios as r_usuarios
 from app.routers.reports import router as reports_router
+from app.routers.atenciones import router as atenciones_router
+from app.routers.api import router as api_router
+from app.routers import sistema as r_sistema
 
 # -------------------------------
 # Configuración de la app
 # -------------------------------
 app = FastAPI(title="Contabilidad Fundación")
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", Estaticos(directory="static"), name="static")
 
 SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-change-me")
 
@@ -50,7 +66,16 @@ def on_startup():
     que todos los modelos están sincronizados con la BD.
     """
     Base.metadata.create_all(bind=engine)
+    asegurar_indices(engine)
     seed_admin_user()
+    precompilar()   # el primer request no paga la compilación de Jinja
+    replicas.iniciar(engine, engine_replica)   # monitor de retraso (solo con DB_REPLICA_URL)
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    claves.cerrar()   # procesos de bcrypt
+    replicas.detener()
 
 
 # -------------------------------
@@ -63,13 +88,20 @@ PUBLIC_PATH_PREFIXES = (
     "/docs",
     "/redoc",
     "/favicon.ico",
+    "/healthz",
+    "/metrics",   # valida admin o token por su cuenta (ver app.routers.sistema)
 )
 
+# ?_perfil=1 de un Admin (ver app.core.perfilador). Se agrega antes que el de
+# autenticación para quedar dentro de él y ver el usuario en scope["state"].
+app.add_middleware(Perfilador)
+
 @app.middleware("http")
 async def auth_required(request: Request, call_next):
     """
     Middleware que protege las rutas privadas.
-    Si no hay sesión iniciada, redirige a /login.
+    Si no hay sesión iniciada (o el usuario ya no está activo), redirige a /login.
+    Deja en request.state.user una instantánea del usuario (ver app.core.usuarios).
     """
     request.state.user = None
     path = request.url.path
@@ -83,13 +115,18 @@ async def auth_required(request: Request, call_next):
     if not user_id:
         return RedirectResponse(url=f"/login?next={path}", status_code=303)
 
-    try:
-        db = SessionLocal()
-        request.state.user = db.get(User, user_id)
-    finally:
-        db.close()
+    user = usuarios.en_cache(user_id)
+    if user is False:
+        user = await run_in_threadpool(usuarios.resolver, user_id)
+    if user is None or not user.active:
+        request.session.clear()
+        return RedirectResponse(url=f"/login?next={path}", status_code=303)
+    request.state.user = user
 
-    return await call_next(request)
+    response = await call_next(request)
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        replicas.marcar_escritura(request)   # sus próximas lecturas, en el primario
+    return response
 
 
 # -------------------------------
@@ -104,6 +141,15 @@ app.add_middleware(
     max_age=60 * 60 * 24 * 14,  # 14 días
 )
 
+# latencias, estados y tiempos por ruta para /metrics (ver app.core.metricas)
+app.add_middleware(MetricasHTTP)
+
+# consultas y tiempos por request: Server-Timing, N+1 y panel (ver app.core.consultas)
+app.add_middleware(MedicionSQL)
+
+# gzip de HTML/JSON (el más externo, para comprimir también las respuestas de los middlewares)
+app.add_middleware(Compresion)
+
 
 # -------------------------------
 # Rutas principales
@@ -119,4 +165,8 @@ app.include_router(dashboard_router)
 app.include_router(r_usuarios.router_admin)
 app.include_router(r_usuarios.router_account)
 app.include_router(finanzas_pages_router)
-app.include_router(reports_router)
\ No newline at end of file
+app.include_router(reports_router)
+app.include_router(atenciones_router)
+app.include_router(api_router)
+app.include_router(r_sistema.router)
+app.include_router(r_sistema.router_admin)
\ No newline at end of file
@@ -0,0 +1,25 @@
+# app/models/analitica.py
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+# Agregados de pacientes activos. Las dimensiones sin dato se guardan como ""
+# (o 0 en ids) para que formen parte de la clave primaria.
+
+class PacienteCubo(Base):
+    __tablename__ = "pacientes_cubo"
+    comuna_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    dependencia: Mapped[str] = mapped_column(String(20), primary_key=True)
+    prevision: Mapped[str] = mapped_column(String(20), primary_key=True)
+    movilidad: Mapped[str] = mapped_column(String(20), primary_key=True)
+    tramo_edad: Mapped[str] = mapped_column(String(10), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+class PacienteEnfermedadCubo(Base):
+    __tablename__ = "pacientes_enfermedad_cubo"
+    enfermedad_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    comuna_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    dependencia: Mapped[str] = mapped_column(String(20), primary_key=True)
+    tramo_edad: Mapped[str] = mapped_column(String(10), primary_key=True)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,35 @@
+# app/models/atenciones.py
+from datetime import datetime
+from sqlalchemy import BigInteger, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+TIPOS_ATENCION = ("visita", "llamada")
+
+class Atencion(Base):
+    """
+    Registro de solo-anexar: cada visita domiciliaria o llamada a un paciente.
+    El único índice secundario es (paciente_id, fecha), que cubre la ficha del
+    paciente y mantiene baratas las inserciones masivas.
+    """
+    __tablename__ = "atenciones"
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    paciente_id: Mapped[int] = mapped_column(ForeignKey("pacientes.id", ondelete="CASCADE"), nullable=False)
+    fecha: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    tipo: Mapped[str] = mapped_column(String(20), nullable=False)
+    usuario_id: Mapped[int | None] = mapped_column(Integer, default=None)
+    nota: Mapped[str] = mapped_column(Text, default="")
+    creado_en: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_atenciones_paciente_fecha", "paciente_id", "fecha"),
+    )
+
+class PacienteUltimaAtencion(Base):
+    """Resumen por paciente mantenido en cada ingesta (no se recalcula desde el historial)."""
+    __tablename__ = "pacientes_ultima_atencion"
+    paciente_id: Mapped[int] = mapped_column(ForeignKey("pacientes.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    ultima_fecha: Mapped[datetime | None] = mapped_column(DateTime, default=None, index=True)
+    ultimo_tipo: Mapped[str | None] = mapped_column(String(20), default=None)
+    total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from decimal import Decimal
-from sqlalchemy import String, Integer, ForeignKey, DECIMAL, DateTime, func
+from sqlalchemy import String, Integer, ForeignKey, DECIMAL, DateTime, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 # Usa la Base de tu proyecto (ya existente)
@@ -24,7 +24,7 @@ class UnidadMedida(Base):
 class InventarioItem(Base):
     __tablename__ = "inventario"
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    categoria_id: Mapped[int] = mapped_column(ForeignKey("inv_categoria.id", ondelete="RESTRICT"))
+    categoria_id: Mapped[int] = mapped_column(ForeignKey("inv_categoria.id", ondelete="RESTRICT"), index=True)
     nombre: Mapped[str] = mapped_column(String(150), nullable=False)
     unidad_id: Mapped[int] = mapped_column(ForeignKey("inv_unidad_medida.id", ondelete="RESTRICT"))
     stock_inicial: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), default=0, nullable=False)
@@ -32,3 +32,8 @@ class InventarioItem(Base):
 
     categoria: Mapped["InvCategoria"] = relationship(back_populates="items")
     unidad: Mapped["UnidadMedida"] = relationship(back_populates="items")
+
+    __table_args__ = (
+        # búsqueda por prefijo y paginación por (nombre, id)
+        Index("ix_inventario_nombre", "nombre", "id"),
+    )
@@ -0,0 +1,74 @@
+# app/models/inv_movimientos.py
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import BigInteger, Integer, String, DateTime, ForeignKey, DECIMAL, Boolean, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+TIPOS_MOVIMIENTO = ("entrada", "salida", "ajuste")
+
+class InvStock(Base):
+    """
+    Saldo actual de cada ítem (1:1 con `inventario`). Se actualiza en la misma
+    transacción que inserta el movimiento, así que leer el stock es una lectura por PK.
+    `bajo_minimo` se guarda ya calculado para que las alertas usen su índice.
+    """
+    __tablename__ = "inv_stock"
+    item_id: Mapped[int] = mapped_column(ForeignKey("inventario.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    cantidad: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), default=0, nullable=False)
+    stock_minimo: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), default=0, nullable=False)
+    bajo_minimo: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False, index=True)
+    actualizado_en: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class InvMovimiento(Base):
+    """
+    Libro de movimientos por ítem. `delta` lleva signo (salidas negativas) y
+    `saldo` es el stock que quedó después del movimiento. `costo_unitario` es el
+    costo con que entró (o salió, a promedio ponderado) y `valor_promedio` /
+    `valor_fifo` el valor con signo que el movimiento sumó o restó en cada método.
+    """
+    __tablename__ = "inv_movimientos"
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    item_id: Mapped[int] = mapped_column(ForeignKey("inventario.id", ondelete="CASCADE"), nullable=False)
+    fecha: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    tipo: Mapped[str] = mapped_column(String(10), nullable=False)
+    delta: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), nullable=False)
+    saldo: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), nullable=False)
+    costo_unitario: Mapped[Decimal | None] = mapped_column(DECIMAL(18, 4), default=None)
+    valor_promedio: Mapped[Decimal] = mapped_column(DECIMAL(18, 4), default=0, nullable=False)
+    valor_fifo: Mapped[Decimal] = mapped_column(DECIMAL(18, 4), default=0, nullable=False)
+    nota: Mapped[str] = mapped_column(String(255), default="")
+    usuario_id: Mapped[int | None] = mapped_column(Integer, default=None)
+    creado_en: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_inv_movimientos_item_id", "item_id", "id"),
+    )
+
+class InvValorizacion(Base):
+    """
+    Valor actual del stock de cada ítem según promedio ponderado y FIFO.
+    Se actualiza con cada movimiento; el informe de valorización solo lee esta tabla.
+    """
+    __tablename__ = "inv_valorizacion"
+    item_id: Mapped[int] = mapped_column(ForeignKey("inventario.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    valor_promedio: Mapped[Decimal] = mapped_column(DECIMAL(18, 4), default=0, nullable=False)
+    valor_fifo: Mapped[Decimal] = mapped_column(DECIMAL(18, 4), default=0, nullable=False)
+    actualizado_en: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+class InvCapa(Base):
+    """Capa FIFO: cantidad que entró a un costo y cuánto de ella sigue en bodega."""
+    __tablename__ = "inv_capas"
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    item_id: Mapped[int] = mapped_column(ForeignKey("inventario.id", ondelete="CASCADE"), nullable=False)
+    fecha: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    cantidad: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), nullable=False)
+    restante: Mapped[Decimal] = mapped_column(DECIMAL(18, 3), nullable=False)
+    costo_unitario: Mapped[Decimal] = mapped_column(DECIMAL(18, 4), nullable=False)
+    abierta: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
+
+    __table_args__ = (
+        # capas con saldo de un ítem, de la más antigua a la más nueva
+        Index("ix_inv_capas_item_abierta", "item_id", "abierta", "id"),
+    )
@@ -1,13 +1,10 @@
 # models/pacientes.py
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy import String, Integer, Date, DateTime, ForeignKey, Text, Boolean, Enum
 from datetime import datetime
 from app.models.base import Base
 import enum
 
-class Base(DeclarativeBase):
-    pass
-
 class SexoEnum(str, enum.Enum):
     M = "M"
     F = "F"
@@ -0,0 +1,15 @@
+# app/models/sistema.py
+from sqlalchemy import String, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class Version(Base):
+    """
+    Contador de versión por nombre lógico (catálogo o tabla).
+    Cada escritura lo incrementa; los procesos lo consultan para saber
+    si sus copias en memoria siguen vigentes.
+    """
+    __tablename__ = "versiones"
+    nombre: Mapped[str] = mapped_column(String(60), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,21 @@
+# app/models/vulnerabilidad.py
+from datetime import datetime
+from sqlalchemy import String, Integer, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+class ReglaVulnerabilidad(Base):
+    """Peso configurable de cada factor del puntaje (sobrescribe el valor por defecto)."""
+    __tablename__ = "vulnerabilidad_reglas"
+    clave: Mapped[str] = mapped_column(String(40), primary_key=True)
+    peso: Mapped[int] = mapped_column(Integer, nullable=False)
+    actualizado_en: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class PacientePuntaje(Base):
+    """Último puntaje calculado y la firma de los datos con que se calculó."""
+    __tablename__ = "pacientes_puntaje"
+    paciente_id: Mapped[int] = mapped_column(ForeignKey("pacientes.id", ondelete="CASCADE"), primary_key=True, autoincrement=False)
+    puntaje: Mapped[int] = mapped_column(Integer, nullable=False)
+    firma: Mapped[str] = mapped_column(String(40), nullable=False)
+    calculado_en: Mapped[datetime] = mapped_column(DateTime, nullable=False)
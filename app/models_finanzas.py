@@ -5,7 +5,7 @@ from app.models.base import Base  # 👈 usa la MISMA Base
 
 class BancoMovimiento(Base):
     __tablename__ = "banco_movimientos"
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     fecha: Mapped[Date] = mapped_column(Date, nullable=False)
     tipo: Mapped[str] = mapped_column(String(10), nullable=False)
     monto: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
@@ -19,7 +19,7 @@ class BancoMovimiento(Base):
 
 class CajaMovimiento(Base):
     __tablename__ = "caja_movimientos"
-    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     fecha: Mapped[Date] = mapped_column(Date, nullable=False)
     tipo: Mapped[str] = mapped_column(String(10), nullable=False)
     monto: Mapped[float] = mapped_column(Numeric(14, 2), nullable=False)
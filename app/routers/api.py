@@ -0,0 +1,138 @@
+# app/routers/api.py
+"""
+API JSON de solo lectura para los gráficos y el libro de movimientos.
+
+Las respuestas llevan un ETag derivado de las versiones de las tablas que leen
+(ver app.core.respuestas): mientras nadie escriba en ellas, el navegador recibe
+304 sin que se vuelva a consultar nada. Las consultas van por la sesión
+asíncrona (app.db_async); las de gráficos, por la réplica si está al día. El
+ETag se calcula con las versiones leídas en la misma base que los datos.
+"""
+from datetime import date
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db_async import get_adb, get_adb_lectura
+from app.core import versiones
+from app.core.respuestas import json_condicional
+from app.models import Categoria
+from app.models_finanzas import BancoMovimiento, CajaMovimiento
+from app.services.dashboard import PALETA_COLORES, datos_dashboard
+from app.services.informes import obtener_datos_informe
+
+router = APIRouter(prefix="/api", tags=["API"])
+
+versiones.vigilar(BancoMovimiento, CajaMovimiento)
+
+MOVIMIENTOS = (versiones.clave_tabla(BancoMovimiento.__tablename__),
+               versiones.clave_tabla(CajaMovimiento.__tablename__))
+CATEGORIAS = "catalogo:categorias"   # la incrementa catalogos.invalidar
+LIMITE_MAX = 500
+
+@router.get("/dashboard")
+async def api_dashboard(
+    request: Request,
+    adb: AsyncSession = Depends(get_adb_lectura),
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    categoria_id: Optional[int] = Query(None),
+    metodo: Optional[str] = Query(None),
+    origen: Optional[str] = Query(None),
+    agrupar: str = Query("dia"),
+):
+    """Serie de flujo y top de categorías del dashboard (sin la tabla de movimientos)."""
+    params = {"desde": desde, "hasta": hasta, "categoria_id": categoria_id,
+              "metodo": metodo, "origen": origen, "agrupar": agrupar}
+
+    def responder(db: Session):
+        def producir():
+            datos = datos_dashboard(db, **params, con_items=False)
+            del datos["items"]
+            return {**datos, "paleta": PALETA_COLORES}
+        return json_condicional(request, db, (*MOVIMIENTOS, CATEGORIAS), params, producir)
+
+    return await adb.run_sync(responder)
+
+@router.get("/informes")
+async def api_informes(
+    request: Request,
+    adb: AsyncSession = Depends(get_adb_lectura),
+    desde: Optional[date] = Query(None),
+    hasta: Optional[date] = Query(None),
+    origen: Optional[Literal["banco", "caja"]] = None,
+):
+    """Serie mensual, distribución de gastos y KPIs del informe ejecutivo."""
+    # mismos valores por defecto que /informes/anual: año en curso hasta hoy
+    hasta = hasta or date.today()
+    desde = desde or hasta.replace(month=1, day=1)
+    params = {"desde": desde, "hasta": hasta, "origen": origen}
+    return await adb.run_sync(lambda db: json_condicional(
+        request, db, (*MOVIMIENTOS, CATEGORIAS), params,
+        lambda: obtener_datos_informe(db, desde, hasta, origen),
+    ))
+
+@router.get("/{scope}/movimientos")
+async def api_movimientos(
+    request: Request,
+    scope: Literal["banco", "caja"],
+    adb: AsyncSession = Depends(get_adb),
+    desde: Optional[date] = None,
+    hasta: Optional[date] = None,
+    categoria_id: Optional[int] = None,
+    metodo: Optional[str] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="valor de `siguiente` de la página anterior"),
+    limite: int = Query(100, ge=1, le=LIMITE_MAX),
+):
+    """
+    Libro de movimientos en orden (fecha, id), por páginas de `limite` filas.
+    La paginación es por cursor: cada página continúa después de la última
+    fila de la anterior, sin OFFSET.
+    """
+    Model = BancoMovimiento if scope == "banco" else CajaMovimiento
+    despues_de = None
+    if cursor:
+        try:
+            f, i = cursor.split("_", 1)
+            despues_de = (date.fromisoformat(f), int(i))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="cursor inválido")
+
+    params = {"desde": desde, "hasta": hasta, "categoria_id": categoria_id, "metodo": metodo,
+              "q": q, "cursor": cursor, "limite": limite}
+
+    def producir(db: Session):
+        qs = db.query(Model, Categoria.nombre).outerjoin(Categoria, Model.categoria_id == Categoria.id)
+        if desde: qs = qs.filter(Model.fecha >= desde)
+        if hasta: qs = qs.filter(Model.fecha <= hasta)
+        if categoria_id: qs = qs.filter(Model.categoria_id == categoria_id)
+        if scope == "banco" and metodo: qs = qs.filter(Model.metodo_pago == metodo)
+        if q: qs = qs.filter(Model.concepto.ilike(f"%{q}%"))
+        if despues_de:
+            f, i = despues_de
+            qs = qs.filter(or_(Model.fecha > f, and_(Model.fecha == f, Model.id > i)))
+        filas = qs.order_by(Model.fecha.asc(), Model.id.asc()).limit(limite + 1).all()
+
+        items = [{
+            "id": obj.id,
+            "fecha": obj.fecha,
+            "tipo": obj.tipo,
+            "monto": obj.monto,
+            "concepto": obj.concepto,
+            "numero_documento": obj.numero_documento,
+            "metodo_pago": getattr(obj, "metodo_pago", None),
+            "categoria_id": obj.categoria_id,
+            "categoria_nombre": cat_nombre,
+        } for obj, cat_nombre in filas[:limite]]
+        siguiente = None
+        if len(filas) > limite:
+            ultimo = items[-1]
+            siguiente = f"{ultimo['fecha'].isoformat()}_{ultimo['id']}"
+        return {"items": items, "siguiente": siguiente}
+
+    tablas = (versiones.clave_tabla(Model.__tablename__), CATEGORIAS)
+    return await adb.run_sync(lambda db: json_condicional(request, db, tablas, params, lambda: producir(db)))
@@ -0,0 +1,65 @@
+# app/routers/atenciones.py
+from datetime import datetime
+from fastapi import APIRouter, Request, Depends, Form, HTTPException, Query
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.orm import Session
+
+from app.db import get_db
+from app.core.templates import templates
+from app.models.atenciones import TIPOS_ATENCION
+from app.schemas.atenciones import AtencionLote, AtencionLoteOut
+from app.services import atenciones as srv
+from app.utils.fechas import desde_local
+
+router = APIRouter(tags=["atenciones"])
+
+def _usuario_id(request: Request) -> int | None:
+    user = getattr(request.state, "user", None)
+    return user.id if user else None
+
+# Ingesta masiva (sincronización de terreno): JSON con hasta 5000 atenciones
+@router.post("/atenciones/lote", response_model=AtencionLoteOut)
+def atenciones_lote(payload: AtencionLote, request: Request, db: Session = Depends(get_db)):
+    try:
+        return srv.registrar_lote(db, [a.model_dump() for a in payload.atenciones], _usuario_id(request))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+
+# Alta individual desde la ficha del paciente
+@router.post("/pacientes/{paciente_id}/atenciones")
+def atenciones_crear(
+    paciente_id: int,
+    request: Request,
+    fecha: str = Form(""),
+    tipo: str = Form("visita"),
+    nota: str = Form(""),
+    db: Session = Depends(get_db),
+):
+    try:
+        # el datetime-local del formulario viene en hora local, sin zona
+        f = srv.a_utc(desde_local(datetime.fromisoformat(fecha))) if fecha else datetime.utcnow()
+    except ValueError:
+        return RedirectResponse(url=f"/pacientes/{paciente_id}?error=Fecha%20inv%C3%A1lida", status_code=303)
+    if tipo not in TIPOS_ATENCION:
+        return RedirectResponse(url=f"/pacientes/{paciente_id}?error=Tipo%20inv%C3%A1lido", status_code=303)
+    try:
+        srv.registrar_lote(db, [{"paciente_id": paciente_id, "fecha": f, "tipo": tipo, "nota": nota}], _usuario_id(request))
+    except ValueError:
+        db.rollback()
+        raise HTTPException(404, "Paciente no encontrado")
+    return RedirectResponse(url=f"/pacientes/{paciente_id}?ok=1", status_code=303)
+
+@router.get("/atenciones/sin-visita", response_class=HTMLResponse)
+def atenciones_sin_visita(
+    request: Request,
+    db: Session = Depends(get_db),
+    dias: int = Query(30, ge=1, le=3650),
+):
+    datos = srv.sin_visita(db, dias)
+    return templates.TemplateResponse("atenciones/sin_visita.html", {
+        "request": request,
+        "dias": dias,
+        **datos,
+        "path": request.url.path
+    })
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
 from app.db import get_db, SessionLocal
 from app.models import User
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+
 from app.auth import verify_password, hash_password, get_current_user
+from app.core import usuarios, claves, limitador
 
 router = APIRouter(tags=["auth"])
 from app.core.templates import templates
@@ -14,18 +17,44 @@ from app.core.templates import templates
 def login_form(request: Request):
     return templates.TemplateResponse("auth/login.html", {"request": request, "next": request.query_params.get("next", "/")})
 
+def _buscar_activo(username: str):
+    db = SessionLocal()
+    try:
+        return db.execute(
+            select(User.id, User.username, User.role, User.active, User.password_hash)
+            .where(User.username == username, User.active == True)
+        ).first()
+    finally:
+        db.close()
+
+# async: la consulta va al threadpool y bcrypt al pool de procesos de app.core.claves
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
     next: str = Form("/"),
-    db: Session = Depends(get_db),
 ):
-    user = db.query(User).filter(User.username == username, User.active == True).first()
-    if not user or not verify_password(password, user.password_hash):
+    username = username.strip()
+    ip = request.client.host if request.client else None
+    if not limitador.permitido(username, ip):
+        return RedirectResponse(url="/login?error=Demasiados%20intentos.%20Espera%20unos%20minutos", status_code=303)
+
+    user = await run_in_threadpool(_buscar_activo, username)
+    try:
+        ok, nuevo = await claves.verificar(password, user.password_hash if user else None)
+    except claves.Ocupado:
+        return RedirectResponse(url="/login?error=Servidor%20ocupado,%20intenta%20nuevamente", status_code=303)
+    if not user or not ok:
+        limitador.fallo(username, ip)
         return RedirectResponse(url="/login?error=Credenciales%20inv%C3%A1lidas", status_code=303)
+
+    if nuevo:
+        # el hash guardado tiene otro costo (BCRYPT_ROUNDS cambió): se reemplaza
+        await run_in_threadpool(claves.guardar_hash, user.id, nuevo)
+    limitador.exito(username)
     request.session["user_id"] = user.id
+    usuarios.guardar(user.id, usuarios.UsuarioSesion(user.id, user.username, user.role, bool(user.active)))
     return RedirectResponse(url=next or "/", status_code=303)
 
 @router.get("/logout")
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
@@ -9,6 +8,7 @@ from app.models import Categoria
 
 router = APIRouter(tags=["categorias"])
 from app.core.templates import templates
+from app.core import catalogos
 
 @router.get("/categorias", response_class=HTMLResponse)
 def index(request: Request, db: Session = Depends(get_db)):
@@ -32,6 +32,7 @@ def crear(
 ):
     c = Categoria(nombre=nombre.strip(), tipo=tipo)
     db.add(c)
+    catalogos.invalidar(db, "categorias")
     try:
         db.commit()
     except IntegrityError:
@@ -44,7 +45,7 @@ def editar_form(cat_id: int, request: Request, db: Session = Depends(get_db)):
     c = db.get(Categoria, cat_id)
     if not c:
         return RedirectResponse(url="/categorias?error=No%20encontrada", status_code=303)
-    return templates.TemplateResponse("categorias/categorias_form.html", {
+    return templates.TemplateResponse("categorias/form.html", {
         "request": request, "modo": "editar", "categoria": c
     })
 
@@ -61,6 +62,7 @@ def actualizar(
         return RedirectResponse(url="/categorias?error=No%20encontrada", status_code=303)
     c.nombre = nombre.strip()
     c.tipo = tipo
+    catalogos.invalidar(db, "categorias")
     try:
         db.commit()
     except IntegrityError:
@@ -73,5 +75,6 @@ def eliminar(cat_id: int, db: Session = Depends(get_db)):
     c = db.get(Categoria, cat_id)
     if c:
         db.delete(c)
+        catalogos.invalidar(db, "categorias")
         db.commit()
     return RedirectResponse(url="/categorias?ok=1", status_code=303)
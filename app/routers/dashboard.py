@@ -3,17 +3,19 @@ from typing import Optional
 from fastapi import APIRouter, Request, Depends, Query
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from app.db import get_db
-from app.models_finanzas import BancoMovimiento, CajaMovimiento
-from app.models import Categoria
-from app.core.templates import templates
+from app.db import get_db_lectura
+from app.core.templates import es_parcial, pagina_o_parcial
+from app.core import catalogos
+from app.services.dashboard import datos_dashboard
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
+# Ruta síncrona a propósito: la tabla arma un dict por movimiento del período,
+# trabajo de CPU que con la sesión asíncrona correría en el event loop.
 @router.get("/", response_class=HTMLResponse)
 def dashboard_consolidado(
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_lectura),
     desde: Optional[date] = Query(None),
     hasta: Optional[date] = Query(None),
     categoria_id: Optional[int] = Query(None),
@@ -21,87 +23,15 @@ def dashboard_consolidado(
     origen: Optional[str] = Query(None),
     agrupar: str = Query("dia"),
 ):
-    # 1. Configuración dinámica de fuentes
-    fuentes_config = []
-    if not origen or origen == "Banco":
-        fuentes_config.append({"model": BancoMovimiento, "label": "Banco"})
-    if not origen or origen == "Caja":
-        fuentes_config.append({"model": CajaMovimiento, "label": "Caja"})
-
-    movimientos_mezclados = []
-    datos_agrupados = {}
-    datos_cat_ent = {}
-    datos_cat_sal = {}
-
-    # Paleta de colores para el gráfico de distribución
-    paleta_colores = [
-        '#ef4444', '#f97316', '#eab308', '#22c55e', 
-        '#06b6d4', '#3b82f6', '#8b5cf6', '#d946ef'
-    ]
-
-    for fuente in fuentes_config:
-        Model = fuente["model"]
-        query = db.query(Model, Categoria.nombre.label("cat_nombre")).outerjoin(
-            Categoria, Model.categoria_id == Categoria.id
-        )
-
-        if desde: query = query.filter(Model.fecha >= desde)
-        if hasta: query = query.filter(Model.fecha <= hasta)
-        if categoria_id: query = query.filter(Model.categoria_id == categoria_id)
-        if fuente["label"] == "Banco" and metodo:
-            query = query.filter(Model.metodo_pago == metodo)
-
-        resultados = query.all()
-
-        for obj, cat_nombre in resultados:
-            monto = float(obj.monto)
-            cat_name = cat_nombre or "Sin categoría"
-            
-            # Agrupación para el gráfico de línea
-            if agrupar == "año": key_grafico = obj.fecha.strftime("%Y")
-            elif agrupar == "mes": key_grafico = obj.fecha.strftime("%Y-%m")
-            else: key_grafico = obj.fecha.isoformat()
-
-            if key_grafico not in datos_agrupados:
-                datos_agrupados[key_grafico] = {"entradas": 0, "salidas": 0}
-            
-            if obj.tipo == "entrada":
-                datos_agrupados[key_grafico]["entradas"] += monto
-                datos_cat_ent[cat_name] = datos_cat_ent.get(cat_name, 0) + monto
-            else:
-                datos_agrupados[key_grafico]["salidas"] += monto
-                datos_cat_sal[cat_name] = datos_cat_sal.get(cat_name, 0) + monto
-
-            movimientos_mezclados.append({
-                "fecha": obj.fecha,
-                "tipo": obj.tipo,
-                "monto": monto,
-                "categoria": cat_name,
-                "origen": fuente["label"],
-                "concepto": obj.concepto
-            })
-
-    # Ordenar por fecha descendente
-    movimientos_mezclados.sort(key=lambda x: x["fecha"], reverse=True)
-    
-    # Preparar series
-    serie_grafico = [{"label": k, "entradas": v["entradas"], "salidas": v["salidas"]} for k, v in sorted(datos_agrupados.items())]
-    cat_ent_list = [{"categoria": k, "total": v} for k, v in sorted(datos_cat_ent.items(), key=lambda x: x[1], reverse=True)]
-    cat_sal_list = [{"categoria": k, "total": v} for k, v in sorted(datos_cat_sal.items(), key=lambda x: x[1], reverse=True)]
-
-    return templates.TemplateResponse("dashboard/index.html", {
-        "request": request,
-        "items": movimientos_mezclados,
-        "kpi": {
-            "entradas": sum(d['total'] for d in cat_ent_list),
-            "salidas": sum(d['total'] for d in cat_sal_list),
-            "neto": sum(d['total'] for d in cat_ent_list) - sum(d['total'] for d in cat_sal_list)
-        },
-        "serie": serie_grafico,
-        "cat_entradas": cat_ent_list[:8],
-        "cat_salidas": cat_sal_list[:8],
-        "paleta_colores": paleta_colores,
-        "categorias": db.query(Categoria).order_by(Categoria.nombre).all(),
+    datos = datos_dashboard(db, desde, hasta, categoria_id, metodo, origen, agrupar)
+    # al filtrar solo se reemplaza #resultados: el select de categorías no cambia
+    categorias = [] if es_parcial(request) else catalogos.categorias(db)
+
+    # los gráficos se cargan después desde /api/dashboard (ver la plantilla)
+    return pagina_o_parcial(request, "dashboard/index.html", {
+        "items": datos["items"],
+        "kpi": datos["kpi"],
+        "categorias": categorias,
         "filtro": {
             "desde": desde.isoformat() if desde else "",
             "hasta": hasta.isoformat() if hasta else "",
@@ -2,32 +2,16 @@
 from datetime import date, datetime
 from fastapi import APIRouter, Request, Depends, Form, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import or_, func
 
 from app.db import get_db
 from app.models import Transaccion, Categoria
-from app.core.templates import templates
+from app.core.templates import templates, es_parcial, pagina_o_parcial
+from app.core import catalogos
 
 router = APIRouter(tags=["entradas"])
 
-# --- helpers de formato ---
-def clp(value):
-    try:
-        n = int(round(float(value)))
-        return f"${n:,}".replace(",", ".") + ".-"
-    except Exception:
-        return value
-
-def fecha_cl(value):
-    try:
-        return value.strftime("%d/%m/%Y")
-    except Exception:
-        return value
-
-templates.env.filters["clp"] = clp
-templates.env.filters["fecha_cl"] = fecha_cl
-
 # --- helpers de contexto ---
 def _user_from_request(request: Request):
     # Ajusta esto si usas otra estrategia (p.ej. dependencia get_current_user)
@@ -43,12 +27,7 @@ def _ctx(request: Request, **extra):
     }
 
 def categorias_entrada(db: Session):
-    return (
-        db.query(Categoria)
-          .filter(or_(Categoria.tipo == "entrada", Categoria.tipo == "mixta"))
-          .order_by(Categoria.nombre)
-          .all()
-    )
+    return catalogos.categorias(db, "entrada")
 
 # LISTADO
 @router.get("/entradas", response_class=HTMLResponse)
@@ -94,6 +73,7 @@ def listar_entradas(
     base_q = (
         db.query(Transaccion)
           .outerjoin(Categoria, Transaccion.categoria_id == Categoria.id)
+          .options(contains_eager(Transaccion.categoria))   # t.categoria sin una consulta por fila
           .filter(*filtros)
     )
 
@@ -117,9 +97,10 @@ def listar_entradas(
               .limit(limit).all()
     )
 
-    cats = categorias_entrada(db)
+    # al filtrar solo se reemplazan total y tabla: el select de categorías no cambia
+    cats = [] if es_parcial(request) else categorias_entrada(db)
 
-    return templates.TemplateResponse("entradas/list.html", _ctx(request,
+    return pagina_o_parcial(request, "entradas/list.html", _ctx(request,
         entradas=entradas,
         categorias=cats,
         total=total,
@@ -3,23 +3,23 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 from datetime import date
 from typing import Optional, Literal
-from sqlalchemy import select, or_, func
+from sqlalchemy import select, and_, or_, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db import SessionLocal
+from app.db_async import get_adb
 from app.models_finanzas import BancoMovimiento, CajaMovimiento
 from app.models import Categoria
-from app.core.templates import templates  # Importación central
-from app.utils.money import clp, clp_signed # Importación de filtros
-
-# REGISTRO DE FILTROS (Esto es lo que falta)
-templates.env.filters["clp"] = clp
-templates.env.filters["clp_signed"] = clp_signed
+from app.core.templates import templates, stream_template, es_parcial, pagina_o_parcial, FilasDiferidas  # Importación central
+from app.core import catalogos
 
 router = APIRouter(prefix="/finanzas", tags=["Finanzas"])
 
 Tipo = Literal["entrada", "salida"]
 Scope = Literal["banco", "caja"]
 
+LOTE_FILAS = 500   # filas por lote al generar listados en streaming
+
 # -------------------------- utils --------------------------
 def get_db():
     db = SessionLocal()
@@ -39,6 +39,12 @@ def to_int_or_none(v: str | None):
 def model_for(scope: Scope):
     return BancoMovimiento if scope == "banco" else CajaMovimiento
 
+def despues_de(Model, fecha: date, id_: int, desc: bool = False):
+    """Filas que siguen a (fecha, id) en un listado ordenado por (fecha, id)."""
+    if desc:
+        return or_(Model.fecha < fecha, and_(Model.fecha == fecha, Model.id < id_))
+    return or_(Model.fecha > fecha, and_(Model.fecha == fecha, Model.id > id_))
+
 # -------------------------- Listados --------------------------
 
 def render_listado(request: Request, scope: Scope, tipo: Tipo, db: Session, **filtros):
@@ -51,21 +57,25 @@ def render_listado(request: Request, scope: Scope, tipo: Tipo, db: Session, **fi
     if scope == "banco" and filtros.get('metodo'): qs = qs.filter(Model.metodo_pago == filtros['metodo'])
     if filtros.get('q'): qs = qs.filter(Model.concepto.ilike(f"%{filtros['q']}%"))
     
-    items = qs.order_by(Model.fecha.desc(), Model.id.desc()).all()
-    total = float(sum(i.monto for i in items)) if items else 0.0
+    # total en SQL; las filas se leen por lotes mientras se genera el HTML
+    total = float(qs.with_entities(func.coalesce(func.sum(Model.monto), 0)).scalar() or 0)
+    filas = qs.order_by(Model.fecha.desc(), Model.id.desc())
+
+    def lote(s: Session, ultima):
+        q = filas.with_session(s)
+        if ultima is not None:
+            q = q.filter(despues_de(Model, ultima.fecha, ultima.id, desc=True))
+        return q.limit(LOTE_FILAS).all()
+
+    items = FilasDiferidas(lote, LOTE_FILAS)
 
     # categorías para filtro
-    rows = db.execute(
-        select(Categoria.id, Categoria.nombre)
-        .where(or_(Categoria.tipo == tipo, Categoria.tipo == "mixta"))
-        .order_by(Categoria.nombre)
-    ).all()
-    categorias = [{"id": r.id, "nombre": r.nombre} for r in rows]
-
-    return templates.TemplateResponse(
+    categorias = catalogos.categorias(db, tipo)
+
+    return stream_template(
+        request,
         "finanzas/listado.html",
         {
-            "request": request,
             "scope": scope,
             "tipo": tipo,
             "items": items,
@@ -95,7 +105,7 @@ def caja_salidas(request: Request, db: Session = Depends(get_db), desde: Optiona
 
 @router.get("/{scope}/{tipo}/nuevo")
 def nuevo_movimiento(request: Request, scope: Scope, tipo: Tipo, db: Session = Depends(get_db)):
-    categorias = db.query(Categoria).filter(or_(Categoria.tipo == tipo, Categoria.tipo == "mixta")).order_by(Categoria.nombre).all()
+    categorias = catalogos.categorias(db, tipo)
     return templates.TemplateResponse("finanzas/form_movimiento.html", {
         "request": request, "scope": scope, "tipo": tipo, "categorias": categorias, "obj": None
     })
@@ -109,7 +119,7 @@ def editar_movimiento(request: Request, scope: Scope, tipo: Tipo, mid: int, db:
     if not obj:
         return HTMLResponse("<p class='text-white'>Error: No se encontró el registro.</p>")
 
-    categorias = db.query(Categoria).filter(or_(Categoria.tipo == tipo, Categoria.tipo == "mixta")).all()
+    categorias = catalogos.categorias(db, tipo)
     
     # Si la petición viene de AJAX (el modal), podrías usar un template sin layouts
     # Pero por ahora usaremos el mismo, el JS se encargará de extraer el <form>
@@ -169,10 +179,10 @@ def eliminar_movimiento(scope: Scope, tipo: Tipo, mid: int, db: Session = Depend
 # -------------------------- Vista General Movimientos --------------------------
 
 @router.get("/{scope}/movimientos")
-def movimientos(
+async def movimientos(
     request: Request,
     scope: Scope,
-    db: Session = Depends(get_db),
+    adb: AsyncSession = Depends(get_adb),
     desde: Optional[date] = None,
     hasta: Optional[date] = None,
     categoria_id: Optional[int] = None,
@@ -180,18 +190,42 @@ def movimientos(
     q: Optional[str] = None,
 ):
     Model = model_for(scope)
-    base = db.query(Model, Categoria.nombre.label("categoria_nombre")).outerjoin(Categoria, Model.categoria_id == Categoria.id)
-
-    if desde: base = base.filter(Model.fecha >= desde)
-    if hasta: base = base.filter(Model.fecha <= hasta)
-    if categoria_id: base = base.filter(Model.categoria_id == categoria_id)
-    if scope == "banco" and metodo: base = base.filter(Model.metodo_pago == metodo)
-    if q: base = base.filter(Model.concepto.ilike(f"%{q}%"))
-
-    rows = base.order_by(Model.fecha.asc(), Model.id.asc()).all()
-    items = []
-    for obj, cat_nombre in rows:
-        items.append({
+
+    def consultar(db: Session):
+        base = db.query(Model, Categoria.nombre.label("categoria_nombre")).outerjoin(Categoria, Model.categoria_id == Categoria.id)
+
+        if desde: base = base.filter(Model.fecha >= desde)
+        if hasta: base = base.filter(Model.fecha <= hasta)
+        if categoria_id: base = base.filter(Model.categoria_id == categoria_id)
+        if scope == "banco" and metodo: base = base.filter(Model.metodo_pago == metodo)
+        if q: base = base.filter(Model.concepto.ilike(f"%{q}%"))
+
+        entradas = func.coalesce(func.sum(case((Model.tipo == "entrada", Model.monto), else_=0)), 0)
+        salidas = func.coalesce(func.sum(case((Model.tipo == "salida", Model.monto), else_=0)), 0)
+        ent, sal = base.with_entities(entradas, salidas).one()
+        totales = {"entradas": float(ent), "salidas": float(sal)}
+
+        # Saldo inicial
+        saldo_inicial = 0.0
+        if desde:
+            saldo_inicial = float(db.query(func.coalesce(func.sum(
+                case((Model.tipo == "entrada", Model.monto), else_=-Model.monto)), 0))
+                .filter(Model.fecha < desde).scalar())
+
+        # al filtrar solo se reemplazan totales y tabla: el select de categorías no cambia
+        categorias = [] if es_parcial(request) else catalogos.categorias(db)
+        return base, totales, saldo_inicial, categorias
+
+    # totales y saldo con la sesión asíncrona; las filas se leen después, por
+    # lotes y con sesión propia, mientras se genera el HTML
+    base, totales, saldo_inicial, categorias = await adb.run_sync(consultar)
+    filas = base.order_by(Model.fecha.asc(), Model.id.asc())
+
+    def items_de(s: Session, ultima: dict | None):
+        q = filas.with_session(s)
+        if ultima is not None:
+            q = q.filter(despues_de(Model, ultima["fecha"], ultima["id"]))
+        return [{
             "id": obj.id,
             "fecha": obj.fecha,
             "tipo": obj.tipo,
@@ -200,25 +234,14 @@ def movimientos(
             "numero_documento": obj.numero_documento,
             "metodo_pago": getattr(obj, "metodo_pago", None),
             "categoria_nombre": cat_nombre,
-        })
-
-    totales = {"entradas": sum(i['monto'] for i in items if i['tipo'] == 'entrada'), "salidas": sum(i['monto'] for i in items if i['tipo'] == 'salida')}
-    
-    # Saldo inicial
-    saldo_inicial = 0.0
-    if desde:
-        prev = db.query(Model.tipo, Model.monto).filter(Model.fecha < desde).all()
-        for t, m in prev:
-            saldo_inicial += float(m) if t == "entrada" else -float(m)
+        } for obj, cat_nombre in q.limit(LOTE_FILAS)]
 
-    categorias = db.query(Categoria.id, Categoria.nombre).order_by(Categoria.nombre).all()
-
-    return templates.TemplateResponse(
+    return pagina_o_parcial(
+        request,
         "finanzas/movimientos.html",
         {
-            "request": request,
             "scope": scope,
-            "items": items,
+            "items": FilasDiferidas(items_de, LOTE_FILAS),
             "totales": totales,
             "saldo_inicial": saldo_inicial,
             "categorias": categorias,
@@ -1,16 +1,23 @@
 from decimal import Decimal, InvalidOperation
 from types import SimpleNamespace
+from urllib.parse import quote
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy import select, func
+from sqlalchemy import select, func, or_, and_
 from sqlalchemy.orm import Session
 
 from app.core.templates import templates
+from app.core import catalogos
 from app.db import get_db
 from app.models.inv_basic import InvCategoria, UnidadMedida, InventarioItem
+from app.models.inv_movimientos import InvStock, TIPOS_MOVIMIENTO
+from app.schemas.inventario import MovimientoLote, MovimientoLoteOut
+from app.services import inventario as srv
 
 router = APIRouter(prefix="/inventario", tags=["inventario"])
 
+POR_PAGINA = 50
+
 # ---------- utilidades ----------
 def _to_int(v: str | None) -> int | None:
     return int(v) if v and v.isdigit() else None
@@ -23,25 +30,36 @@ def _to_decimal(v: str | None) -> Decimal:
     except InvalidOperation:
         return Decimal("0")
 
+def _prefijo(q: str) -> str:
+    """Patrón LIKE 'q%' (usa el índice por nombre, a diferencia de '%q%')."""
+    q = q.strip().replace("/", "//").replace("%", "/%").replace("_", "/_")
+    return f"{q}%"
+
+def _usuario_id(request: Request) -> int | None:
+    user = getattr(request.state, "user", None)
+    return user.id if user else None
+
 # ========== CATEGORÍAS ==========
 @router.get("/categorias", response_class=HTMLResponse)
-def cat_list(request: Request, q: str | None = None, db: Session = Depends(get_db)):
-    stmt = select(InvCategoria).order_by(InvCategoria.nombre)
+def cat_list(request: Request, q: str | None = None, desde: str | None = None, db: Session = Depends(get_db)):
+    # una página de categorías (por nombre) y el conteo de items solo de esas, en una consulta
+    pagina = select(InvCategoria.id, InvCategoria.nombre).order_by(InvCategoria.nombre).limit(POR_PAGINA + 1)
     if q:
-        stmt = stmt.where(InvCategoria.nombre.like(f"%{q}%"))
-    cats = db.execute(stmt).scalars().all()
-
-    # conteo de items por categoría
-    counts = dict(
-        db.execute(
-            select(InventarioItem.categoria_id, func.count())
-            .group_by(InventarioItem.categoria_id)
-        ).all()
-    )
-
-    items = [{"cat": c, "productos": counts.get(c.id, 0)} for c in cats]
-    return templates.TemplateResponse("inventario/categorias_list.html",
-                                      {"request": request, "items": items, "q": q or ""})
+        pagina = pagina.where(InvCategoria.nombre.like(_prefijo(q), escape="/"))
+    if desde:
+        pagina = pagina.where(InvCategoria.nombre > desde)
+    pagina = pagina.subquery()
+    rows = db.execute(
+        select(pagina.c.id, pagina.c.nombre, func.count(InventarioItem.id).label("productos"))
+        .outerjoin(InventarioItem, InventarioItem.categoria_id == pagina.c.id)
+        .group_by(pagina.c.id, pagina.c.nombre)
+        .order_by(pagina.c.nombre)
+    ).all()
+    siguiente = rows[POR_PAGINA - 1].nombre if len(rows) > POR_PAGINA else None
+    return templates.TemplateResponse("inventario/categorias_list.html", {
+        "request": request, "items": rows[:POR_PAGINA], "q": q or "",
+        "desde": desde, "siguiente": siguiente,
+    })
 
 @router.get("/categorias/nueva", response_class=HTMLResponse)
 def cat_new_form(request: Request):
@@ -51,7 +69,9 @@ def cat_new_form(request: Request):
 @router.post("/categorias/nueva")
 def cat_create(nombre: str = Form(...), db: Session = Depends(get_db)):
     c = InvCategoria(nombre=nombre.strip())
-    db.add(c); db.commit()
+    db.add(c)
+    catalogos.invalidar(db, "inv_categorias")
+    db.commit()
     return RedirectResponse("/inventario/categorias?ok=1", status_code=303)
 
 @router.get("/categorias/{cat_id}/editar", response_class=HTMLResponse)
@@ -66,6 +86,7 @@ def cat_update(cat_id: int, nombre: str = Form(...), db: Session = Depends(get_d
     c = db.get(InvCategoria, cat_id)
     if not c: raise HTTPException(404)
     c.nombre = nombre.strip()
+    catalogos.invalidar(db, "inv_categorias")
     db.commit()
     return RedirectResponse("/inventario/categorias?ok=1", status_code=303)
 
@@ -77,23 +98,54 @@ def cat_delete(cat_id: int, db: Session = Depends(get_db)):
     usados = db.scalar(select(func.count()).select_from(InventarioItem).where(InventarioItem.categoria_id == c.id)) or 0
     if usados:
         return RedirectResponse("/inventario/categorias?error=No%20se%20puede%20eliminar:%20tiene%20items", status_code=303)
-    db.delete(c); db.commit()
+    db.delete(c)
+    catalogos.invalidar(db, "inv_categorias")
+    db.commit()
     return RedirectResponse("/inventario/categorias?ok=1", status_code=303)
 
 # ========== ITEMS ==========
 @router.get("/items", response_class=HTMLResponse)
-def items_list(request: Request, q: str | None = None, db: Session = Depends(get_db)):
-    stmt = select(InventarioItem).order_by(InventarioItem.nombre)
+def items_list(
+    request: Request,
+    q: str | None = None,
+    desde: str | None = None,
+    desde_id: int | None = None,
+    db: Session = Depends(get_db),
+):
+    # una página de items con categoría, unidad y stock (inv_stock por PK) en una sola consulta;
+    # los ítems sin fila de saldo aún muestran su stock inicial
+    stmt = (
+        select(InventarioItem.id, InventarioItem.nombre,
+               InvCategoria.nombre.label("categoria"), UnidadMedida.codigo.label("unidad"),
+               func.coalesce(InvStock.cantidad, InventarioItem.stock_inicial).label("stock"),
+               func.coalesce(InvStock.stock_minimo, 0).label("minimo"),
+               func.coalesce(InvStock.bajo_minimo, False).label("bajo"))
+        .outerjoin(InvCategoria, InvCategoria.id == InventarioItem.categoria_id)
+        .outerjoin(UnidadMedida, UnidadMedida.id == InventarioItem.unidad_id)
+        .outerjoin(InvStock, InvStock.item_id == InventarioItem.id)
+        .order_by(InventarioItem.nombre, InventarioItem.id)
+        .limit(POR_PAGINA + 1)
+    )
     if q:
-        stmt = stmt.where(InventarioItem.nombre.like(f"%{q}%"))
-    rows = db.execute(stmt).scalars().all()
-    return templates.TemplateResponse("inventario/items_list.html",
-        {"request": request, "rows": rows, "q": q or ""})
+        stmt = stmt.where(InventarioItem.nombre.like(_prefijo(q), escape="/"))
+    if desde is not None and desde_id is not None:
+        # paginación por clave (nombre, id): el costo no crece con el número de página
+        stmt = stmt.where(or_(
+            InventarioItem.nombre > desde,
+            and_(InventarioItem.nombre == desde, InventarioItem.id > desde_id),
+        ))
+    rows = db.execute(stmt).all()
+    siguiente = rows[POR_PAGINA - 1] if len(rows) > POR_PAGINA else None
+    alertas = db.scalar(select(func.count()).select_from(InvStock).where(InvStock.bajo_minimo == True)) or 0
+    return templates.TemplateResponse("inventario/items_list.html", {
+        "request": request, "rows": rows[:POR_PAGINA], "q": q or "", "alertas": alertas,
+        "desde": desde, "siguiente": siguiente,
+    })
 
 @router.get("/items/nuevo", response_class=HTMLResponse)
 def items_new_form(request: Request, db: Session = Depends(get_db)):
-    cats = db.execute(select(InvCategoria).order_by(InvCategoria.nombre)).scalars().all()
-    unidades = db.execute(select(UnidadMedida).order_by(UnidadMedida.nombre)).scalars().all()
+    cats = catalogos.inv_categorias(db)
+    unidades = catalogos.unidades(db)
     return templates.TemplateResponse("inventario/items_form.html",
         {"request": request, "item": None, "cats": cats, "unidades": unidades})
 
@@ -103,6 +155,7 @@ def items_create(
     categoria_id: str | None = Form(None),
     unidad_id: str | None = Form(None),
     stock_inicial: str | None = Form("0"),
+    costo_unitario: str | None = Form("0"),
     db: Session = Depends(get_db),
 ):
     cat = _to_int(categoria_id)
@@ -115,21 +168,24 @@ def items_create(
         unidad_id=uni,
         stock_inicial=_to_decimal(stock_inicial),
     )
-    db.add(item); db.commit()
+    db.add(item)
+    srv.crear_saldo(db, item, max(_to_decimal(costo_unitario), Decimal("0")))
+    db.commit()
     return RedirectResponse("/inventario/items?ok=1", status_code=303)
 
 @router.get("/items/{item_id}/editar", response_class=HTMLResponse)
 def items_edit_form(item_id: int, request: Request, db: Session = Depends(get_db)):
     it = db.get(InventarioItem, item_id)
     if not it: raise HTTPException(404)
-    cats = db.execute(select(InvCategoria).order_by(InvCategoria.nombre)).scalars().all()
-    unidades = db.execute(select(UnidadMedida).order_by(UnidadMedida.nombre)).scalars().all()
+    cats = catalogos.inv_categorias(db)
+    unidades = catalogos.unidades(db)
     return templates.TemplateResponse("inventario/items_form.html",
         {"request": request, "item": it, "cats": cats, "unidades": unidades})
 
 @router.post("/items/{item_id}/editar")
 def items_update(
     item_id: int,
+    request: Request,
     nombre: str = Form(...),
     categoria_id: str | None = Form(None),
     unidad_id: str | None = Form(None),
@@ -141,7 +197,17 @@ def items_update(
     it.nombre = nombre.strip()
     it.categoria_id = _to_int(categoria_id) or it.categoria_id
     it.unidad_id = _to_int(unidad_id) or it.unidad_id
-    it.stock_inicial = _to_decimal(stock_inicial)
+    nuevo_inicial = _to_decimal(stock_inicial)
+    diferencia = nuevo_inicial - it.stock_inicial
+    it.stock_inicial = nuevo_inicial
+    if diferencia:
+        # corregir el stock inicial se registra como ajuste en el libro
+        try:
+            srv.registrar_movimientos(db, [{"item_id": it.id, "tipo": "ajuste", "cantidad": diferencia,
+                                            "nota": "Corrección de stock inicial"}], _usuario_id(request))
+        except ValueError:
+            db.rollback()
+            return RedirectResponse(f"/inventario/items/{item_id}/editar?error=El%20stock%20quedar%C3%ADa%20negativo", status_code=303)
     db.commit()
     return RedirectResponse("/inventario/items?ok=1", status_code=303)
 
@@ -151,3 +217,64 @@ def items_delete(item_id: int, db: Session = Depends(get_db)):
     if not it: raise HTTPException(404)
     db.delete(it); db.commit()
     return RedirectResponse("/inventario/items?ok=1", status_code=303)
+
+# ========== MOVIMIENTOS ==========
+@router.get("/items/{item_id}/movimientos", response_class=HTMLResponse)
+def movimientos_list(item_id: int, request: Request, db: Session = Depends(get_db)):
+    it = db.get(InventarioItem, item_id)
+    if not it: raise HTTPException(404)
+    return templates.TemplateResponse("inventario/movimientos.html", {
+        "request": request,
+        "item": it,
+        "saldo": srv.saldo(db, item_id),
+        "valor": srv.valorizacion(db, item_id),
+        "movimientos": srv.historial(db, item_id),
+        "tipos": TIPOS_MOVIMIENTO,
+    })
+
+@router.post("/items/{item_id}/movimientos")
+def movimientos_create(
+    item_id: int,
+    request: Request,
+    tipo: str = Form(...),
+    cantidad: str = Form(...),
+    costo_unitario: str | None = Form(None),
+    nota: str = Form(""),
+    db: Session = Depends(get_db),
+):
+    if not db.get(InventarioItem, item_id): raise HTTPException(404)
+    costo = _to_decimal(costo_unitario) if costo_unitario and costo_unitario.strip() else None
+    try:
+        srv.registrar_movimientos(db, [{"item_id": item_id, "tipo": tipo, "cantidad": _to_decimal(cantidad),
+                                        "costo_unitario": costo, "nota": nota}], _usuario_id(request))
+    except ValueError as e:
+        db.rollback()
+        return RedirectResponse(f"/inventario/items/{item_id}/movimientos?error={quote(str(e))}", status_code=303)
+    return RedirectResponse(f"/inventario/items/{item_id}/movimientos?ok=1", status_code=303)
+
+@router.post("/items/{item_id}/minimo")
+def movimientos_minimo(item_id: int, stock_minimo: str = Form("0"), db: Session = Depends(get_db)):
+    if not db.get(InventarioItem, item_id): raise HTTPException(404)
+    srv.fijar_minimo(db, item_id, _to_decimal(stock_minimo))
+    return RedirectResponse(f"/inventario/items/{item_id}/movimientos?ok=1", status_code=303)
+
+# Carga masiva (recepción de donaciones, consumo diario): JSON con hasta 5000 movimientos
+@router.post("/movimientos/lote", response_model=MovimientoLoteOut)
+def movimientos_lote(payload: MovimientoLote, request: Request, db: Session = Depends(get_db)):
+    try:
+        return srv.registrar_movimientos(db, [m.model_dump() for m in payload.movimientos], _usuario_id(request))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+
+@router.get("/alertas", response_class=HTMLResponse)
+def alertas_list(request: Request, db: Session = Depends(get_db)):
+    return templates.TemplateResponse("inventario/alertas.html",
+        {"request": request, "rows": srv.bajo_minimo(db)})
+
+@router.get("/valorizacion", response_class=HTMLResponse)
+def valorizacion_informe(request: Request, metodo: str = "promedio", db: Session = Depends(get_db)):
+    if metodo not in ("promedio", "fifo"):
+        metodo = "promedio"
+    return templates.TemplateResponse("inventario/valorizacion.html",
+        {"request": request, **srv.informe_valorizacion(db, metodo)})
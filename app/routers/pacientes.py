@@ -1,20 +1,24 @@
-from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, HTTPException
+from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.responses import RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import func, asc, desc
 from datetime import datetime
 from pathlib import Path
 import os, shutil, unicodedata
+from urllib.parse import quote
 
 from app.db import get_db
+from app.auth import require_admin
+from app.core import catalogos
+from app.core.templates import templates
+from app.services import analitica_pacientes, vulnerabilidad, atenciones
+from app.models.vulnerabilidad import PacientePuntaje
 from app.models.pacientes import (
     Paciente, Enfermedad, PacienteEnfermedad, Comuna,
     SexoEnum, PrevisionEnum, MovilidadEnum, DependenciaEnum
 )
 
 router = APIRouter(prefix="/pacientes", tags=["Pacientes"])
-templates = Jinja2Templates(directory="templates")
 
 # Carpeta para imágenes dentro del proyecto
 BASE_DIR = Path(__file__).resolve().parents[2]  # /srv/www/admin_fundacion
@@ -42,6 +46,21 @@ def _norm_str(s: str) -> str:
     # Normaliza acentos y espacios
     return unicodedata.normalize("NFC", (s or "").strip())
 
+def _buscar_o_crear(db: Session, modelo, catalogo: str, nombre: str, creadas: dict):
+    """Fila del catálogo con ese nombre; la crea si no existe.
+
+    La caché de catálogos es una foto tomada antes de esta transacción: no ve
+    las filas creadas en este mismo request, por eso se llevan en `creadas`.
+    """
+    clave = nombre.lower()
+    fila = creadas.get(clave) or catalogos.buscar(db, catalogo, nombre)
+    if fila is None:
+        fila = modelo(nombre=nombre)
+        db.add(fila); db.flush()
+        catalogos.invalidar(db, catalogo)
+        creadas[clave] = fila
+    return fila
+
 # --- listado ---
 @router.get("/")
 def pacientes_index(
@@ -84,8 +103,8 @@ def pacientes_index(
     total_pacientes = query.count()
 
     # Mapeo de columnas ordenables
-    # Usamos func.concat para compatibilidad (evita operador || específico del motor)
-    nombre_expr = func.lower(func.concat(Paciente.nombres, " ", Paciente.apellidos))
+    # `+` entre columnas de texto se compila a CONCAT() en MySQL y a || en SQLite
+    nombre_expr = func.lower(Paciente.nombres + " " + Paciente.apellidos)
     sort_map = {
         "id": Paciente.id,
         "nombre": nombre_expr,
@@ -105,7 +124,8 @@ def pacientes_index(
     if limit not in (25, 50, 100, 200):
         limit = 50
 
-    pacientes = query.limit(limit).all()
+    # la comuna viene en el mismo JOIN (sin una consulta por fila en la plantilla)
+    pacientes = query.options(contains_eager(Paciente.comuna)).limit(limit).all()
 
     filtros = {
         "q": q or "",
@@ -123,11 +143,75 @@ def pacientes_index(
         "path": request.url.path
     })
 
+# --- analítica de población ---
+@router.get("/analitica")
+def pacientes_analitica(
+    request: Request,
+    db: Session = Depends(get_db),
+    filas: str = "comuna",
+    columnas: str | None = "dependencia",
+):
+    columnas = columnas or None
+    if not analitica_pacientes.dimensiones_validas(filas, columnas):
+        filas, columnas = "comuna", "dependencia"
+    tabla = analitica_pacientes.tabla_cruzada(db, filas, columnas)
+    return templates.TemplateResponse("pacientes/analitica.html", {
+        "request": request,
+        "tabla": tabla,
+        "total_activos": analitica_pacientes.total_activos(db),
+        "dimensiones": analitica_pacientes.ETIQUETAS,
+        "filtros": {"filas": filas, "columnas": columnas or ""},
+        "path": request.url.path
+    })
+
+@router.post("/analitica/reconstruir", dependencies=[Depends(require_admin)])
+def pacientes_analitica_reconstruir(db: Session = Depends(get_db)):
+    analitica_pacientes.reconstruir(db)
+    return RedirectResponse(url="/pacientes/analitica?ok=1", status_code=303)
+
+# --- reglas del puntaje de vulnerabilidad ---
+@router.get("/vulnerabilidad", dependencies=[Depends(require_admin)])
+def pacientes_vulnerabilidad(request: Request, db: Session = Depends(get_db)):
+    return templates.TemplateResponse("pacientes/vulnerabilidad.html", {
+        "request": request,
+        "pesos": vulnerabilidad.cargar_pesos(db),
+        "defecto": vulnerabilidad.PESOS_DEFECTO,
+        "etiquetas": vulnerabilidad.ETIQUETAS,
+        "rangos": vulnerabilidad.RANGOS,
+        "path": request.url.path
+    })
+
+@router.post("/vulnerabilidad", dependencies=[Depends(require_admin)])
+async def pacientes_vulnerabilidad_guardar(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+):
+    form = await request.form()
+    pesos = {}
+    for clave in vulnerabilidad.PESOS_DEFECTO:
+        v = str(form.get(clave, "")).strip()
+        if not v:
+            continue   # vacío: se mantiene el valor actual
+        try:
+            pesos[clave] = int(v)
+        except ValueError:
+            error = f"{vulnerabilidad.ETIQUETAS[clave]}: no es un número entero"
+            return RedirectResponse(url=f"/pacientes/vulnerabilidad?error={quote(error)}", status_code=303)
+    try:
+        cambios = vulnerabilidad.guardar_pesos(db, pesos)
+    except ValueError as e:
+        return RedirectResponse(url=f"/pacientes/vulnerabilidad?error={quote(str(e))}", status_code=303)
+    if cambios:
+        # el recálculo completo corre fuera del request
+        background_tasks.add_task(vulnerabilidad.recalcular_en_segundo_plano)
+    return RedirectResponse(url="/pacientes/vulnerabilidad?ok=1", status_code=303)
+
 # --- formulario crear ---
 @router.get("/crear")
 def pacientes_crear(request: Request, db: Session = Depends(get_db)):
     # El template ya trae comunas fijas; mandamos solo opciones de combos
-    enfermedades = db.query(Enfermedad).order_by(Enfermedad.nombre).all()
+    enfermedades = catalogos.enfermedades(db)
     return templates.TemplateResponse("pacientes/create.html", {
         "request": request,
         "enfermedades": enfermedades,  # por si usas select por IDs además de 'otras'
@@ -142,6 +226,7 @@ def pacientes_crear(request: Request, db: Session = Depends(get_db)):
 @router.post("/crear")
 async def pacientes_store(
     request: Request,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
 
     # datos básicos
@@ -164,7 +249,6 @@ async def pacientes_store(
     cuidador_parentesco: str | None = Form(None),
     vive_solo: str | None = Form(None),  # "on" si marcado
     red_apoyo: str | None = Form(None),
-    puntaje_vulnerabilidad: int | None = Form(None),
     observaciones: str | None = Form(None),
     activo: str | None = Form("on"),
 
@@ -183,17 +267,8 @@ async def pacientes_store(
     try:
         comuna_id_int = int(comuna_id)
     except ValueError:
-        nombre_busca = _norm_str(comuna_id)
-        c = (
-            db.query(Comuna)
-              .filter(func.lower(Comuna.nombre) == func.lower(nombre_busca))
-              .first()
-        )
-        if not c:
-            # Si no existe, la creamos (útil cuando las comunas del template son las únicas)
-            c = Comuna(nombre=nombre_busca)
-            db.add(c)
-            db.flush()
+        # Si no existe, la creamos (útil cuando las comunas del template son las únicas)
+        c = _buscar_o_crear(db, Comuna, "comunas", _norm_str(comuna_id), {})
         comuna_id_int = c.id
 
     # crear paciente
@@ -214,26 +289,31 @@ async def pacientes_store(
         cuidador_parentesco=cuidador_parentesco or None,
         vive_solo=(vive_solo == "on"),
         red_apoyo=red_apoyo or None,
-        puntaje_vulnerabilidad=puntaje_vulnerabilidad,
         observaciones=observaciones or None,
         activo=(activo == "on"),
     )
     db.add(p); db.flush()
 
     # Enfermedades por ID
-    for enf_id in (enfermedades_ids or []):
-        db.add(PacienteEnfermedad(paciente_id=p.id, enfermedad_id=int(enf_id)))
+    enf_ids = list(dict.fromkeys(int(enf_id) for enf_id in (enfermedades_ids or [])))
 
-    # Enfermedades por nombre (otras)
+    # Enfermedades por nombre (otras), sin repetir nombres ni las ya marcadas por ID
+    otras = {}
     for nombre in (enfermedades_otras or []):
         nombre = _norm_str(nombre)
-        if not nombre:
-            continue
-        existente = db.query(Enfermedad).filter(func.lower(Enfermedad.nombre) == func.lower(nombre)).first()
-        enf = existente or Enfermedad(nombre=nombre)
-        if not existente:
-            db.add(enf); db.flush()
-        db.add(PacienteEnfermedad(paciente_id=p.id, enfermedad_id=enf.id))
+        if nombre:
+            otras.setdefault(nombre.lower(), nombre)
+    creadas = {}
+    for nombre in otras.values():
+        enf = _buscar_o_crear(db, Enfermedad, "enfermedades", nombre, creadas)
+        if enf.id not in enf_ids:
+            enf_ids.append(enf.id)
+
+    for enf_id in enf_ids:
+        db.add(PacienteEnfermedad(paciente_id=p.id, enfermedad_id=enf_id))
+
+    # Agregados de analítica (misma transacción que el alta)
+    analitica_pacientes.registrar(db, p, enf_ids)
 
     # Imagen
     if imagen and imagen.filename:
@@ -247,6 +327,7 @@ async def pacientes_store(
         p.imagen_path = f"static/pacientes/{filename}"
 
     db.commit()
+    background_tasks.add_task(vulnerabilidad.recalcular_en_segundo_plano, [p.id])
     return RedirectResponse(url=f"/pacientes/{p.id}", status_code=303)
 
 # --- detalle ---
@@ -255,15 +336,20 @@ def pacientes_show(paciente_id: int, request: Request, db: Session = Depends(get
     p = db.get(Paciente, paciente_id)
     if not p:
         raise HTTPException(404, "Paciente no encontrado")
-    rels = db.query(PacienteEnfermedad).filter_by(paciente_id=p.id).all()
-    enf = []
-    for r in rels:
-        e = db.get(Enfermedad, r.enfermedad_id)
-        if e:
-            enf.append(e.nombre)
+    # nombres en una sola consulta (antes: un db.get por enfermedad)
+    enf = [
+        nombre for (nombre,) in
+        db.query(Enfermedad.nombre)
+        .join(PacienteEnfermedad, PacienteEnfermedad.enfermedad_id == Enfermedad.id)
+        .filter(PacienteEnfermedad.paciente_id == p.id)
+        .order_by(PacienteEnfermedad.id)
+    ]
     return templates.TemplateResponse("pacientes/show.html", {
         "request": request,
         "p": p,
         "enfermedades": enf,
+        "puntaje": db.get(PacientePuntaje, p.id),
+        "atenciones": atenciones.ultimas(db, p.id),
+        "resumen_atenciones": atenciones.resumen(db, p.id),
         "path": request.url.path
     })
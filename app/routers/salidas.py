@@ -4,24 +4,21 @@ import secrets
 
 from fastapi import APIRouter, Request, Depends, Form, UploadFile, File, Query
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
 from sqlalchemy import or_, func
 
 from app.db import get_db
 from app.models import Transaccion, Categoria
 
 router = APIRouter(tags=["salidas"])
-from app.core.templates import templates
+from app.core.templates import templates, es_parcial, pagina_o_parcial
+from app.core import catalogos
 
 DOCS_DIR = Path("static") / "docs_salidas"
 DOCS_DIR.mkdir(parents=True, exist_ok=True)
 
 def categorias_salida(db: Session):
-    return db.query(Categoria)\
-             .filter(or_(Categoria.tipo == "salida", Categoria.tipo == "mixta"))\
-             .order_by(Categoria.nombre)\
-             .all()
+    return catalogos.categorias(db, "salida")
 
 def guardar_archivo(upload: UploadFile | None) -> str:
     if not upload or not upload.filename:
@@ -89,6 +86,7 @@ def listar_salidas(
 
     base_q = (db.query(Transaccion)
                 .outerjoin(Categoria, Transaccion.categoria_id == Categoria.id)
+                .options(contains_eager(Transaccion.categoria))   # t.categoria sin una consulta por fila
                 .filter(*filtros))
 
     total = base_q.with_entities(func.coalesce(func.sum(Transaccion.monto), 0)).scalar() or 0
@@ -113,10 +111,10 @@ def listar_salidas(
                .order_by(ordering, Transaccion.id.desc())   # desempate por id
                .limit(limit).all())
 
-    cats = categorias_salida(db)
+    # al filtrar solo se reemplazan total y tabla: el select de categorías no cambia
+    cats = [] if es_parcial(request) else categorias_salida(db)
 
-    return templates.TemplateResponse("salidas/list.html", {
-        "request": request,
+    return pagina_o_parcial(request, "salidas/list.html", {
         "salidas": salidas,
         "categorias": cats,
         "total": total,
@@ -0,0 +1,100 @@
+# app/routers/sistema.py
+"""
+Estado del proceso: `/healthz` (público, para el balanceador), métricas
+internas en JSON para administradores, `/metrics` para Prometheus y los
+perfiles de requests guardados (ver app.core.perfilador).
+"""
+import hmac
+import os
+import time
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+
+from app.db import engine, engine_replica
+from app.db_async import engine_async, engine_async_replica
+from app.auth import get_current_user, is_admin, require_admin
+from app.core import catalogos, fragmentos, perfilador, pool, replicas, usuarios
+from app.core.metricas import exponer
+from app.core.templates import templates
+from app.core.usuarios import UsuarioSesion
+
+# para el scraper, que no tiene sesión: `Authorization: Bearer <METRICAS_TOKEN>`
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "")
+
+router = APIRouter(tags=["sistema"])
+
+router_admin = APIRouter(
+    prefix="/admin",
+    tags=["sistema"],
+    dependencies=[Depends(require_admin)],
+)
+
+@router.get("/healthz")
+def healthz():
+    """
+    Listo si la BD responde un `SELECT 1` por una conexión del pool (sin sesión
+    ORM). Con el pool agotado responde 503 de inmediato en vez de esperar
+    DB_POOL_TIMEOUT.
+    """
+    if pool.agotado(engine.pool):
+        return JSONResponse({"estado": "no_listo", "db": "pool agotado"}, status_code=503)
+    t0 = time.perf_counter()
+    try:
+        with engine.connect() as con:
+            con.exec_driver_sql("SELECT 1")
+    except Exception as e:
+        return JSONResponse({"estado": "no_listo", "db": type(e).__name__}, status_code=503)
+    return {"estado": "listo", "db": "ok", "db_ms": round((time.perf_counter() - t0) * 1000, 2)}
+
+@router_admin.get("/metricas")
+def metricas():
+    return {
+        "pool": pool.estadisticas(engine.pool),
+        "pool_async": pool.estadisticas(engine_async.sync_engine.pool),
+        "replica": replicas.estado(),
+        "fragmentos": fragmentos.estadisticas(),
+    }
+
+@router_admin.get("/perfiles")
+def perfiles(request: Request):
+    lista = [{**p, "fecha_dt": datetime.fromtimestamp(p["fecha"])} for p in perfilador.listar()]
+    return templates.TemplateResponse("sistema/perfiles.html", {
+        "request": request, "perfiles": lista, "maximo": perfilador.MAX,
+    })
+
+@router_admin.get("/perfiles/{nombre}")
+def perfil_descargar(nombre: str):
+    ruta = perfilador.ruta_archivo(nombre)
+    if ruta is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return FileResponse(ruta, media_type="application/json", filename=nombre)
+
+def admin_o_scraper(request: Request, user: UsuarioSesion | None = Depends(get_current_user)):
+    if METRICAS_TOKEN and hmac.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICAS_TOKEN}"
+    ):
+        return
+    if not is_admin(user):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No autorizado")
+
+@router.get("/metrics", dependencies=[Depends(admin_o_scraper)], response_class=PlainTextResponse)
+def metrics():
+    """Formato de texto de Prometheus (ver app.core.metricas)."""
+    motores = {
+        "primario": engine,
+        "primario_async": engine_async.sync_engine,
+        "replica": engine_replica,
+        "replica_async": engine_async_replica.sync_engine if engine_async_replica is not None else None,
+    }
+    texto = exponer(
+        pools={nombre: pool.estadisticas(e.pool) for nombre, e in motores.items() if e is not None},
+        caches={
+            "fragmentos": fragmentos.estadisticas(),
+            "catalogos": catalogos.estadisticas(),
+            "usuarios": usuarios.estadisticas(),
+        },
+        replica=replicas.estado(),
+    )
+    return PlainTextResponse(texto, media_type="text/plain; version=0.0.4; charset=utf-8")
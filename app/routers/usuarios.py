@@ -1,14 +1,17 @@
 # app/routers/usuarios.py
 from fastapi import APIRouter, Request, Depends, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from app.db import get_db
+from app.db import get_db, SessionLocal
 from app.models import User
-from app.auth import get_current_user, hash_password, verify_password
-from app.auth import get_current_user, hash_password, verify_password, require_admin
+from app.auth import get_current_user, require_admin
 from app.core.templates import templates
+from app.core import usuarios as cache_usuarios
+from app.core import claves, limitador
+from starlette.concurrency import run_in_threadpool
 
 # ---------- RUTAS SOLO ADMIN ----------
 router_admin = APIRouter(
@@ -38,10 +41,14 @@ def usuarios_crear(
 ):
     if password != password2:
         return RedirectResponse(url="/usuarios/nuevo?error=Las%20claves%20no%20coinciden", status_code=303)
+    try:
+        password_hash = claves.hashear_sync(password)
+    except claves.Ocupado:
+        return RedirectResponse(url="/usuarios/nuevo?error=Servidor%20ocupado,%20intenta%20nuevamente", status_code=303)
 
     nuevo = User(
         username=username.strip(),
-        password_hash=hash_password(password),
+        password_hash=password_hash,
         role=("Admin" if role == "Admin" else "User"),
         active=True if active == "1" else False
     )
@@ -82,6 +89,7 @@ def usuarios_actualizar(
     except IntegrityError:
         db.rollback()
         return RedirectResponse(url=f"/usuarios/{uid}/editar?error=Usuario%20ya%20existe", status_code=303)
+    cache_usuarios.invalidar(uid)
 
     return RedirectResponse(url="/usuarios?ok=1", status_code=303)
 
@@ -99,7 +107,10 @@ def usuarios_password(uid: int, request: Request, db: Session = Depends(get_db),
     u = db.get(User, uid)
     if not u:
         return RedirectResponse(url="/usuarios?error=No%20encontrado", status_code=303)
-    u.password_hash = hash_password(password)
+    try:
+        u.password_hash = claves.hashear_sync(password)
+    except claves.Ocupado:
+        return RedirectResponse(url=f"/usuarios/{uid}/password?error=Servidor%20ocupado,%20intenta%20nuevamente", status_code=303)
     db.commit()
     return RedirectResponse(url="/usuarios?ok=1", status_code=303)
 
@@ -107,16 +118,22 @@ def usuarios_password(uid: int, request: Request, db: Session = Depends(get_db),
 router_account = APIRouter(tags=["cuenta"])
 
 @router_account.get("/mi-password", response_class=HTMLResponse)
-def mi_password_form(request: Request, user: User = Depends(get_current_user)):
+def mi_password_form(request: Request, user = Depends(get_current_user)):
     if not user:
         return RedirectResponse(url="/login", status_code=303)
     return templates.TemplateResponse("cuenta/mi_password.html", {"request": request})
 
+def _leer_hash(user_id: int) -> str | None:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(User.password_hash).where(User.id == user_id))
+    finally:
+        db.close()
+
 @router_account.post("/mi-password")
-def mi_password(
+async def mi_password(
     request: Request,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    user = Depends(get_current_user),
     actual: str = Form(...),
     nueva: str = Form(...),
     nueva2: str = Form(...),
@@ -125,10 +142,19 @@ def mi_password(
         return RedirectResponse(url="/login", status_code=303)
     if nueva != nueva2:
         return RedirectResponse(url="/mi-password?error=Claves%20no%20coinciden", status_code=303)
-    if not verify_password(actual, user.password_hash):
-        return RedirectResponse(url="/mi-password?error=Contraseña%20actual%20incorrecta", status_code=303)
-
-    u = db.get(User, user.id)
-    u.password_hash = hash_password(nueva)
-    db.commit()
+    # contador propio: equivocarse aquí no debe bloquear el login del usuario
+    if not limitador.permitido(user.username, None, "mi-password"):
+        return RedirectResponse(url="/mi-password?error=Demasiados%20intentos", status_code=303)
+    # la instantánea de sesión no trae el hash: se lee solo aquí
+    try:
+        ok, _ = await claves.verificar(actual, await run_in_threadpool(_leer_hash, user.id))
+        if not ok:
+            limitador.fallo(user.username, None, "mi-password")
+            return RedirectResponse(url="/mi-password?error=Contraseña%20actual%20incorrecta", status_code=303)
+        nuevo = await claves.hashear(nueva)
+    except claves.Ocupado:
+        return RedirectResponse(url="/mi-password?error=Servidor%20ocupado,%20intenta%20nuevamente", status_code=303)
+
+    await run_in_threadpool(claves.guardar_hash, user.id, nuevo)
+    limitador.exito(user.username, "mi-password")
     return RedirectResponse(url="/?ok=1", status_code=303)
@@ -3,18 +3,20 @@ from typing import Optional
 
 from fastapi import APIRouter, Request, Depends, Query
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from datetime import datetime
 from sqlalchemy import or_, func
 
 from app.db import get_db
+from app.db_async import get_adb
 from app.models import Transaccion, Categoria
 
 router = APIRouter()
-from app.core.templates import templates
+from app.core.templates import templates, es_parcial, pagina_o_parcial
+from app.core import catalogos
 
 
 def limites_mes_actual() -> tuple[date, date]:
@@ -63,9 +65,9 @@ def home(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/transacciones", response_class=HTMLResponse)
-def transacciones_list(
+async def transacciones_list(
     request: Request,
-    db: Session = Depends(get_db),
+    adb: AsyncSession = Depends(get_adb),
     desde: str | None = Query(None),
     hasta: str | None = Query(None),
     categoria_id: str | None = Query(None),
@@ -106,20 +108,6 @@ def transacciones_list(
             Transaccion.numero_documento.like(like),
         ))
 
-    # Usamos join para poder ordenar por nombre de categoría
-    base_q = (db.query(Transaccion)
-                .outerjoin(Categoria, Transaccion.categoria_id == Categoria.id)
-                .filter(*filtros))
-
-    # ---- totales con mismos filtros ----
-    total_entradas = (db.query(func.coalesce(func.sum(Transaccion.monto), 0))
-                        .filter(*filtros, Transaccion.tipo == "entrada")
-                        .scalar() or 0)
-    total_salidas  = (db.query(func.coalesce(func.sum(Transaccion.monto), 0))
-                        .filter(*filtros, Transaccion.tipo == "salida")
-                        .scalar() or 0)
-    neto = total_entradas - total_salidas
-
     # ---- ordenamiento seguro ----
     order_map = {
         "fecha": Transaccion.fecha,
@@ -135,14 +123,35 @@ def transacciones_list(
     col = order_map.get(sort, Transaccion.fecha)
     ordering = col.desc() if dir == "desc" else col.asc()
 
-    transacciones = (base_q
-                     .order_by(ordering, Transaccion.id.desc())
-                     .limit(limit).all())
-
-    categorias = db.query(Categoria).order_by(Categoria.nombre).all()
+    def consultar(db: Session):
+        # Usamos join para poder ordenar por nombre de categoría; contains_eager
+        # reutiliza ese join para cargar t.categoria (el HTML se genera en streaming,
+        # con la sesión ya cerrada)
+        base_q = (db.query(Transaccion)
+                    .outerjoin(Categoria, Transaccion.categoria_id == Categoria.id)
+                    .options(contains_eager(Transaccion.categoria))
+                    .filter(*filtros))
+
+        # ---- totales con mismos filtros ----
+        total_entradas = (db.query(func.coalesce(func.sum(Transaccion.monto), 0))
+                            .filter(*filtros, Transaccion.tipo == "entrada")
+                            .scalar() or 0)
+        total_salidas  = (db.query(func.coalesce(func.sum(Transaccion.monto), 0))
+                            .filter(*filtros, Transaccion.tipo == "salida")
+                            .scalar() or 0)
+
+        transacciones = (base_q
+                         .order_by(ordering, Transaccion.id.desc())
+                         .limit(limit).all())
+
+        # al filtrar solo se reemplazan totales y tabla: el select de categorías no cambia
+        categorias = [] if es_parcial(request) else catalogos.categorias(db)
+        return transacciones, total_entradas, total_salidas, categorias
+
+    transacciones, total_entradas, total_salidas, categorias = await adb.run_sync(consultar)
+    neto = total_entradas - total_salidas
 
-    return templates.TemplateResponse("transacciones.html", {
-        "request": request,
+    return pagina_o_parcial(request, "transacciones.html", {
         "transacciones": transacciones,
         "categorias": categorias,
         "tot": {
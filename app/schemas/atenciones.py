@@ -0,0 +1,27 @@
+# schemas/atenciones.py
+from datetime import datetime
+from typing import List, Literal
+from pydantic import BaseModel, Field, field_validator
+
+from app.services.atenciones import a_utc
+
+TipoAtencion = Literal["visita", "llamada"]
+
+class AtencionIn(BaseModel):
+    paciente_id: int
+    fecha: datetime
+    tipo: TipoAtencion
+    nota: str = Field("", max_length=2000)
+
+    @field_validator("fecha")
+    @classmethod
+    def fecha_utc(cls, v: datetime) -> datetime:
+        # un lote puede mezclar fechas con y sin zona; se comparan entre sí
+        return a_utc(v)
+
+class AtencionLote(BaseModel):
+    atenciones: List[AtencionIn] = Field(..., max_length=5000)
+
+class AtencionLoteOut(BaseModel):
+    insertadas: int
+    pacientes: int
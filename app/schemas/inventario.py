@@ -0,0 +1,22 @@
+# schemas/inventario.py
+from datetime import datetime
+from decimal import Decimal
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+TipoMovimiento = Literal["entrada", "salida", "ajuste"]
+
+class MovimientoIn(BaseModel):
+    item_id: int
+    tipo: TipoMovimiento
+    cantidad: Decimal = Field(..., max_digits=18, decimal_places=3)
+    costo_unitario: Optional[Decimal] = Field(None, ge=0, max_digits=18, decimal_places=4)
+    fecha: Optional[datetime] = None
+    nota: str = Field("", max_length=255)
+
+class MovimientoLote(BaseModel):
+    movimientos: List[MovimientoIn] = Field(..., max_length=5000)
+
+class MovimientoLoteOut(BaseModel):
+    registrados: int
+    items: int
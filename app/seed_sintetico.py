@@ -0,0 +1,331 @@
+# app/seed_sintetico.py
+"""
+Datos sintéticos en volumen para benchmarks y pruebas de carga.
+
+    python -m app.seed_sintetico --banco 1000000 --caja 200000 --pacientes 50000
+    DATABASE_URL=sqlite:///bench.db python -m app.seed_sintetico --semilla 7 --hasta 2025-12-31
+
+Con la misma semilla, volúmenes y `--hasta` genera exactamente los mismos datos.
+Agrega a lo que ya haya en la BD: crea las tablas y catálogos que falten y no
+borra nada.
+
+- Fechas con estacionalidad: más movimiento en marzo (inicio de año) y
+  diciembre (campañas y aguinaldos), menos en febrero y los fines de semana.
+- Categorías con sesgo tipo Zipf: pocas concentran la mayoría de los montos.
+- Montos log-normales por categoría, en pesos enteros.
+- Pacientes mayores (la mayoría entre 60 y 95 años) repartidos por las comunas
+  del Biobío, con enfermedades según su prevalencia y RUT válidos (pasan
+  `validar_rut_chileno`).
+
+Las filas se insertan por lotes con `executemany` de Core (sin objetos ORM):
+pymysql lo envía como INSERT de varias filas y sqlite3 lo ejecuta en C, así
+que un millón de movimientos carga en minutos. Al final se crean los saldos de
+inventario, se reconstruyen los agregados de pacientes y los puntajes de
+vulnerabilidad, y se incrementan las versiones de las tablas (ETags y cachés).
+"""
+import argparse
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+import app.models.finance          # noqa: F401  (registra todas las tablas en Base)
+import app.models_finanzas         # noqa: F401
+import app.models.sistema          # noqa: F401
+import app.models.analitica        # noqa: F401
+import app.models.vulnerabilidad   # noqa: F401
+import app.models.atenciones       # noqa: F401
+import app.models.inv_movimientos  # noqa: F401
+from app.core import catalogos, versiones
+from app.db import SessionLocal, engine
+from app.models import Base, Categoria, Transaccion
+from app.models.inv_basic import InvCategoria, InventarioItem, UnidadMedida
+from app.models.pacientes import (
+    Comuna, Enfermedad, Paciente, PacienteEnfermedad,
+    DependenciaEnum, MovilidadEnum, PrevisionEnum, SexoEnum,
+)
+from app.models_finanzas import BancoMovimiento, CajaMovimiento
+from app.seed import CATS_ENTRADA, CATS_SALIDA, seed_categorias
+from app.seed_comunas_biobio import BIOBIO
+from app.services import analitica_pacientes, inventario, vulnerabilidad
+
+LOTE = 5000
+
+# estacionalidad mensual (1 = promedio) y peso por día de la semana (lunes = 0)
+MESES = (0.9, 0.6, 1.3, 1.1, 1.0, 0.95, 1.0, 1.05, 0.95, 1.0, 1.1, 1.5)
+DIAS_SEMANA = (1.1, 1.0, 1.0, 1.0, 1.2, 0.45, 0.25)
+
+METODOS_BANCO = (("transferencia", 60), ("debito", 15), ("credito", 8), ("caja_vecina", 12), ("otro", 5))
+METODOS_TRANSACCION = (("efectivo", 40), ("transferencia", 35), ("debito", 12), ("credito", 5),
+                       ("deposito", 6), ("otros", 2))
+
+NOMBRES_F = ("María", "Rosa", "Ana", "Carmen", "Juana", "Olga", "Luisa", "Teresa", "Marta", "Elena",
+             "Gloria", "Silvia", "Patricia", "Inés", "Sonia", "Margarita", "Isabel", "Ximena")
+NOMBRES_M = ("José", "Juan", "Luis", "Carlos", "Manuel", "Pedro", "Jorge", "Héctor", "Sergio", "Raúl",
+             "Víctor", "Hugo", "Mario", "Francisco", "Patricio", "Ricardo", "Osvaldo", "Fernando")
+APELLIDOS = ("González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez",
+             "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya",
+             "Flores", "Espinoza", "Valenzuela", "Castillo", "Tapia", "Reyes", "Gutiérrez", "Castro",
+             "Pizarro", "Álvarez", "Vásquez", "Sánchez", "Fernández", "Ramírez", "Carrasco", "Vera")
+CALLES = ("Los Carrera", "O'Higgins", "Freire", "Barros Arana", "Colo Colo", "Lincoyán", "Rengo",
+          "Caupolicán", "Tucapel", "Serrano", "Maipú", "Prat", "Las Heras", "Janequeo", "Angol")
+# (nombre, prevalencia aproximada en adultos mayores)
+ENFERMEDADES = (("Hipertensión arterial", 0.55), ("Diabetes mellitus tipo 2", 0.25), ("Artrosis", 0.3),
+                ("Dislipidemia", 0.2), ("Hipoacusia", 0.15), ("Cataratas", 0.12), ("Depresión", 0.1),
+                ("Osteoporosis", 0.12), ("EPOC", 0.08), ("Insuficiencia cardíaca", 0.07),
+                ("Enfermedad renal crónica", 0.07), ("Secuela de ACV", 0.05), ("Alzheimer", 0.06),
+                ("Parkinson", 0.02))
+INV_CATEGORIAS = {
+    "Alimentos": ("Arroz", "Fideos", "Aceite", "Leche en polvo", "Azúcar", "Harina", "Legumbres", "Avena"),
+    "Aseo": ("Jabón", "Shampoo", "Detergente", "Cloro", "Papel higiénico", "Toallas húmedas"),
+    "Insumos clínicos": ("Gasa", "Guantes", "Alcohol gel", "Jeringa", "Apósito", "Suero fisiológico"),
+    "Pañales": ("Pañal adulto M", "Pañal adulto L", "Pañal adulto XL", "Sabanilla"),
+    "Ayudas técnicas": ("Bastón", "Andador", "Silla de ruedas", "Cojín antiescaras", "Colchón antiescaras"),
+    "Oficina": ("Resma carta", "Lápiz pasta", "Archivador", "Tóner", "Carpeta"),
+}
+UNIDADES = (("UN", "Unidad"), ("KG", "Kilogramo"), ("LT", "Litro"), ("CJ", "Caja"), ("PQ", "Paquete"))
+
+# ---------- utilidades ----------
+def digito_verificador(cuerpo: int) -> str:
+    suma, factor = 0, 2
+    while cuerpo:
+        suma += (cuerpo % 10) * factor
+        cuerpo //= 10
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return "0" if resto == 11 else "K" if resto == 10 else str(resto)
+
+def formatear_rut(cuerpo: int) -> str:
+    return f"{cuerpo:,}".replace(",", ".") + "-" + digito_verificador(cuerpo)
+
+def _pesos_zipf(n: int, s: float = 1.1) -> list[float]:
+    return [1 / (i + 1) ** s for i in range(n)]
+
+def _eleccion(rnd: random.Random, opciones: tuple, k: int) -> list:
+    valores, pesos = zip(*opciones)
+    return rnd.choices(valores, weights=pesos, k=k)
+
+class Fechas:
+    """Sorteo de fechas en [desde, hasta] con estacionalidad mensual y semanal."""
+
+    def __init__(self, desde: date, hasta: date):
+        self.dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+        acum, total = [], 0.0
+        for d in self.dias:
+            total += MESES[d.month - 1] * DIAS_SEMANA[d.weekday()]
+            acum.append(total)
+        self.acum = acum
+
+    def sortear(self, rnd: random.Random, k: int) -> list[date]:
+        return rnd.choices(self.dias, cum_weights=self.acum, k=k)
+
+def _insertar(db: Session, tabla, filas) -> int:
+    """executemany por lotes de LOTE filas; devuelve cuántas insertó."""
+    n, lote = 0, []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= LOTE:
+            db.execute(insert(tabla), lote)
+            n += len(lote)
+            lote = []
+    if lote:
+        db.execute(insert(tabla), lote)
+        n += len(lote)
+    return n
+
+# ---------- catálogos ----------
+def _catalogos(db: Session) -> dict:
+    seed_categorias(db)
+    for modelo, nombres in ((Comuna, BIOBIO), (Enfermedad, [n for n, _ in ENFERMEDADES]),
+                            (InvCategoria, list(INV_CATEGORIAS))):
+        existentes = set(db.scalars(select(modelo.nombre)))
+        db.add_all(modelo(nombre=n) for n in nombres if n not in existentes)
+    codigos = set(db.scalars(select(UnidadMedida.codigo)))
+    db.add_all(UnidadMedida(codigo=c, nombre=n) for c, n in UNIDADES if c not in codigos)
+    db.flush()
+    catalogos.invalidar(db, *catalogos.NOMBRES)
+
+    cats = {n: i for n, i in db.execute(select(Categoria.nombre, Categoria.id))}
+    return {
+        # en el orden de app.seed: las primeras de cada lista son las más frecuentes
+        "entrada": [cats[n] for n in CATS_ENTRADA if n in cats],
+        "salida": [cats[n] for n in CATS_SALIDA if n in cats],
+        "comunas": {n: i for n, i in db.execute(select(Comuna.nombre, Comuna.id))},
+        "enfermedades": {n: i for n, i in db.execute(select(Enfermedad.nombre, Enfermedad.id))},
+        "inv_categorias": {n: i for n, i in db.execute(select(InvCategoria.nombre, InvCategoria.id))},
+        "unidades": [i for (i,) in db.execute(select(UnidadMedida.id).order_by(UnidadMedida.id))],
+    }
+
+# ---------- movimientos ----------
+def _movimientos(rnd: random.Random, fechas: Fechas, cats: dict, n: int, escala: float,
+                 metodos: tuple | None, prefijo: str):
+    """Filas de movimientos: 45% entradas; monto log-normal con mediana según la categoría."""
+    tipos = rnd.choices(("entrada", "salida"), weights=(45, 55), k=n)
+    dias = fechas.sortear(rnd, n)
+    metodo = _eleccion(rnd, metodos, n) if metodos else None
+    posiciones = {t: range(len(cats[t])) for t in ("entrada", "salida")}
+    acum = {t: list(accumulate(_pesos_zipf(len(cats[t])))) for t in ("entrada", "salida")}
+    for i in range(n):
+        tipo = tipos[i]
+        posicion = rnd.choices(posiciones[tipo], cum_weights=acum[tipo])[0]
+        # la categoría más frecuente es también la de montos más altos (sueldos, donaciones)
+        mediana = escala * (2.5 if posicion == 0 else 1.0 / (1 + posicion * 0.3))
+        monto = max(500, round(rnd.lognormvariate(math.log(mediana), 0.9), -2))
+        fila = {
+            "fecha": dias[i],
+            "tipo": tipo,
+            "monto": Decimal(monto),
+            "concepto": f"{prefijo} {tipo} {i + 1}",
+            "numero_documento": f"{rnd.randrange(10**6, 10**7)}" if rnd.random() < 0.6 else "",
+            "descripcion": "",
+            "categoria_id": cats[tipo][posicion],
+        }
+        if metodo is not None:
+            fila["metodo_pago"] = metodo[i]
+        yield fila
+
+def _transacciones(rnd, fechas, cats, n):
+    for fila in _movimientos(rnd, fechas, cats, n, 60_000, METODOS_TRANSACCION, "Transacción"):
+        fila["documento_path"] = ""
+        fila["creado_en"] = datetime.combine(fila["fecha"], datetime.min.time())
+        yield fila
+
+# ---------- pacientes ----------
+def _pacientes(db: Session, rnd: random.Random, cats: dict, n: int, hasta: date) -> int:
+    if not n:
+        return 0
+    primer_id = (db.scalar(select(func.max(Paciente.id))) or 0) + 1
+    usados = set(db.scalars(select(Paciente.rut)))
+    comunas = list(cats["comunas"].values())
+    pesos_comuna = _pesos_zipf(len(comunas), 0.8)
+    enfermedades = [(cats["enfermedades"][nombre], p) for nombre, p in ENFERMEDADES]
+
+    cuerpos = rnd.sample(range(3_000_000, 25_000_000), n + len(usados))
+    ruts = (r for r in map(formatear_rut, cuerpos) if r not in usados)
+    ahora = datetime.utcnow()
+    acum_comuna = list(accumulate(pesos_comuna))
+
+    # por lotes propios: las enfermedades de un lote se insertan después de sus pacientes
+    for inicio in range(0, n, LOTE):
+        lote: list[dict] = []
+        relaciones: list[dict] = []
+        for i in range(inicio, min(n, inicio + LOTE)):
+            pid = primer_id + i
+            sexo = SexoEnum.F if rnd.random() < 0.58 else SexoEnum.M
+            edad = min(102, max(18, round(rnd.gauss(77, 9))))
+            nacimiento = hasta - timedelta(days=int(edad * 365.25) + rnd.randrange(365))
+            dependencia = rnd.choices(list(DependenciaEnum) + [None], weights=(40, 30, 15, 15))[0]
+            vive_solo = rnd.random() < 0.25
+            for enf_id, prevalencia in enfermedades:
+                if rnd.random() < prevalencia * 0.6:
+                    relaciones.append({"paciente_id": pid, "enfermedad_id": enf_id})
+            lote.append({
+                "id": pid,
+                "nombres": rnd.choice(NOMBRES_F if sexo is SexoEnum.F else NOMBRES_M),
+                "apellidos": f"{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}",
+                "rut": next(ruts),
+                "sexo": sexo,
+                "fecha_nacimiento": nacimiento,
+                "direccion": f"{rnd.choice(CALLES)} {rnd.randrange(1, 3000)}",
+                "comuna_id": rnd.choices(comunas, cum_weights=acum_comuna)[0],
+                "telefono": f"+569{rnd.randrange(10**7, 10**8)}",
+                "email": None,
+                "prevision_salud": rnd.choices((PrevisionEnum.Fonasa, PrevisionEnum.Isapre,
+                                                PrevisionEnum.Ninguna), weights=(80, 15, 5))[0],
+                "movilidad": rnd.choices(list(MovilidadEnum), weights=(60, 30, 10))[0],
+                "dependencia": dependencia,
+                "cuidador_principal": None if vive_solo else f"{rnd.choice(NOMBRES_F)} {rnd.choice(APELLIDOS)}",
+                "cuidador_parentesco": None if vive_solo else rnd.choice(("Hija", "Hijo", "Cónyuge", "Nieta", "Vecina")),
+                "vive_solo": vive_solo,
+                "red_apoyo": None,
+                "puntaje_vulnerabilidad": None,
+                "observaciones": None,
+                "imagen_path": None,
+                "activo": rnd.random() < 0.93,
+                "creado_en": ahora,
+                "actualizado_en": ahora,
+            })
+        db.execute(insert(Paciente), lote)
+        if relaciones:
+            db.execute(insert(PacienteEnfermedad), relaciones)
+    return n
+
+# ---------- inventario ----------
+def _inventario(rnd: random.Random, cats: dict, n: int):
+    productos = [(cats["inv_categorias"][c], p) for c, lista in INV_CATEGORIAS.items() for p in lista]
+    for i in range(n):
+        categoria_id, producto = productos[i % len(productos)]
+        yield {
+            "categoria_id": categoria_id,
+            "nombre": f"{producto} {rnd.choice(('', 'premium ', 'económico ', 'donación '))}#{i + 1}",
+            "unidad_id": rnd.choice(cats["unidades"]),
+            "stock_inicial": Decimal(rnd.randrange(0, 500)),
+        }
+
+# ---------- principal ----------
+def generar(db: Session, *, semilla: int = 42, hasta: date | None = None, anios: int = 3,
+            transacciones: int = 20_000, banco: int = 50_000, caja: int = 20_000,
+            pacientes: int = 5_000, items: int = 500, informar=print) -> dict[str, int]:
+    """Carga los volúmenes pedidos y deja agregados y versiones al día. Hace commit al terminar."""
+    rnd = random.Random(semilla)
+    hasta = hasta or date.today()
+    fechas = Fechas(hasta - timedelta(days=round(365.25 * anios)) + timedelta(days=1), hasta)
+    cats = _catalogos(db)
+    resultado: dict[str, int] = {}
+
+    def paso(nombre: str, funcion):
+        t0 = time.perf_counter()
+        n = funcion()
+        seg = time.perf_counter() - t0
+        resultado[nombre] = n
+        informar(f"{nombre:16} {n:>10,} filas  {seg:7.1f}s  {n / seg if seg else 0:10,.0f} filas/s")
+
+    paso("transacciones", lambda: _insertar(db, Transaccion, _transacciones(rnd, fechas, cats, transacciones)))
+    paso("banco", lambda: _insertar(db, BancoMovimiento, _movimientos(
+        rnd, fechas, cats, banco, 180_000, METODOS_BANCO, "Banco")))
+    paso("caja", lambda: _insertar(db, CajaMovimiento, _movimientos(
+        rnd, fechas, cats, caja, 25_000, None, "Caja")))
+    paso("pacientes", lambda: _pacientes(db, rnd, cats, pacientes, hasta))
+    paso("inventario", lambda: _inventario_y_saldos(db, rnd, cats, items))
+
+    # las inserciones por Core no pasan por los eventos del ORM
+    versiones.incrementar(db, *(versiones.clave_tabla(m.__tablename__) for m in (BancoMovimiento, CajaMovimiento)))
+    db.commit()
+    if pacientes:
+        informar(f"analítica        {analitica_pacientes.reconstruir(db)}")
+        informar(f"vulnerabilidad   {vulnerabilidad.recalcular(db)}")
+    return resultado
+
+def _inventario_y_saldos(db: Session, rnd: random.Random, cats: dict, n: int) -> int:
+    total = _insertar(db, InventarioItem, _inventario(rnd, cats, n))
+    inventario.asegurar_saldos(db)
+    return total
+
+def main():
+    ap = argparse.ArgumentParser(description="Genera datos sintéticos en la BD de DATABASE_URL.")
+    ap.add_argument("--semilla", type=int, default=42)
+    ap.add_argument("--hasta", type=date.fromisoformat, default=None, help="última fecha (por defecto, hoy)")
+    ap.add_argument("--anios", type=int, default=3, help="años de historia hacia atrás")
+    ap.add_argument("--transacciones", type=int, default=20_000)
+    ap.add_argument("--banco", type=int, default=50_000)
+    ap.add_argument("--caja", type=int, default=20_000)
+    ap.add_argument("--pacientes", type=int, default=5_000)
+    ap.add_argument("--items", type=int, default=500, help="ítems de inventario")
+    args = ap.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        generar(db, **vars(args))
+        print(f"listo en {time.perf_counter() - t0:.1f}s")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+# app/services/analitica_pacientes.py
+"""
+Analítica de población de pacientes activos.
+
+Los conteos viven en dos tablas agregadas (`pacientes_cubo` y
+`pacientes_enfermedad_cubo`) que se mantienen en cada alta de paciente y se
+pueden reconstruir completas con:
+
+    python -m app.services.analitica_pacientes
+
+Las tablas cruzadas se resuelven con un GROUP BY sobre los agregados, cuyo
+tamaño depende de la cantidad de combinaciones y no de la de pacientes.
+El tramo de edad se fija al momento del registro; conviene reconstruir a
+diario (cron) para que los cumpleaños muevan a los pacientes de tramo.
+"""
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core import catalogos
+from app.models.analitica import PacienteCubo, PacienteEnfermedadCubo
+from app.models.pacientes import (
+    Paciente, PacienteEnfermedad,
+    DependenciaEnum, PrevisionEnum, MovilidadEnum,
+)
+
+TRAMOS_EDAD = (
+    (0, 17, "0-17"),
+    (18, 59, "18-59"),
+    (60, 69, "60-69"),
+    (70, 79, "70-79"),
+    (80, 89, "80-89"),
+    (90, 200, "90+"),
+)
+SIN_DATO = ""
+
+# dimensión -> (columna en PacienteCubo, columna en PacienteEnfermedadCubo o None)
+DIMENSIONES = {
+    "comuna": (PacienteCubo.comuna_id, PacienteEnfermedadCubo.comuna_id),
+    "dependencia": (PacienteCubo.dependencia, PacienteEnfermedadCubo.dependencia),
+    "prevision": (PacienteCubo.prevision, None),
+    "movilidad": (PacienteCubo.movilidad, None),
+    "tramo_edad": (PacienteCubo.tramo_edad, PacienteEnfermedadCubo.tramo_edad),
+    "enfermedad": (None, PacienteEnfermedadCubo.enfermedad_id),
+}
+
+ETIQUETAS = {
+    "comuna": "Comuna",
+    "dependencia": "Dependencia",
+    "prevision": "Previsión",
+    "movilidad": "Movilidad",
+    "tramo_edad": "Tramo de edad",
+    "enfermedad": "Enfermedad",
+}
+
+# ---------- claves ----------
+def tramo_edad(fecha_nacimiento: date | None, hoy: date | None = None) -> str:
+    if not fecha_nacimiento:
+        return SIN_DATO
+    hoy = hoy or date.today()
+    edad = hoy.year - fecha_nacimiento.year - ((hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day))
+    for desde, hasta, etiqueta in TRAMOS_EDAD:
+        if desde <= edad <= hasta:
+            return etiqueta
+    return SIN_DATO
+
+def _valor(enum_val) -> str:
+    if enum_val is None:
+        return SIN_DATO
+    return getattr(enum_val, "value", enum_val)
+
+def _clave(comuna_id, dependencia, prevision, movilidad, fecha_nacimiento, hoy) -> tuple:
+    return (comuna_id or 0, _valor(dependencia), _valor(prevision), _valor(movilidad), tramo_edad(fecha_nacimiento, hoy))
+
+# ---------- mantenimiento incremental ----------
+def _sumar(db: Session, Modelo, clave: dict, delta: int) -> None:
+    filtro = [getattr(Modelo, k) == v for k, v in clave.items()]
+    res = db.execute(update(Modelo).where(*filtro).values(total=Modelo.total + delta))
+    if res.rowcount or delta < 0:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(Modelo).values(**clave, total=delta))
+    except IntegrityError:
+        # otro worker insertó la misma combinación en paralelo
+        db.execute(update(Modelo).where(*filtro).values(total=Modelo.total + delta))
+
+def registrar(db: Session, p: Paciente, enfermedad_ids: list[int], signo: int = 1) -> None:
+    """
+    Suma (signo=1) o resta (signo=-1) un paciente en los agregados, dentro de la
+    transacción del llamador. Los pacientes inactivos no se cuentan.
+    """
+    if not p.activo:
+        return
+    comuna_id, dep, prev, mov, tramo = _clave(
+        p.comuna_id, p.dependencia, p.prevision_salud, p.movilidad, p.fecha_nacimiento, None)
+    _sumar(db, PacienteCubo, {
+        "comuna_id": comuna_id, "dependencia": dep, "prevision": prev,
+        "movilidad": mov, "tramo_edad": tramo,
+    }, signo)
+    for enf_id in set(enfermedad_ids):
+        _sumar(db, PacienteEnfermedadCubo, {
+            "enfermedad_id": enf_id, "comuna_id": comuna_id,
+            "dependencia": dep, "tramo_edad": tramo,
+        }, signo)
+
+# ---------- reconstrucción completa ----------
+def reconstruir(db: Session, lote: int = 5000) -> dict[str, int]:
+    """Recalcula ambos agregados desde cero en una sola transacción."""
+    hoy = date.today()
+    cubo: Counter = Counter()
+    filas = db.execute(
+        select(Paciente.comuna_id, Paciente.dependencia, Paciente.prevision_salud,
+               Paciente.movilidad, Paciente.fecha_nacimiento)
+        .where(Paciente.activo == True)
+    )
+    for r in filas.yield_per(lote):
+        cubo[_clave(*r, hoy)] += 1
+
+    # un paciente cuenta una vez por enfermedad, como en `registrar` (set de ids):
+    # el DISTINCT va por (paciente, enfermedad), no por los datos del paciente
+    cubo_enf: Counter = Counter()
+    filas = db.execute(
+        select(PacienteEnfermedad.paciente_id, PacienteEnfermedad.enfermedad_id,
+               Paciente.comuna_id, Paciente.dependencia, Paciente.fecha_nacimiento)
+        .join(Paciente, Paciente.id == PacienteEnfermedad.paciente_id)
+        .where(Paciente.activo == True)
+        .distinct()
+    )
+    for _, enf_id, comuna_id, dep, nacimiento in filas.yield_per(lote):
+        cubo_enf[(enf_id, comuna_id or 0, _valor(dep), tramo_edad(nacimiento, hoy))] += 1
+
+    db.execute(delete(PacienteCubo))
+    db.execute(delete(PacienteEnfermedadCubo))
+    if cubo:
+        db.execute(insert(PacienteCubo), [
+            {"comuna_id": k[0], "dependencia": k[1], "prevision": k[2],
+             "movilidad": k[3], "tramo_edad": k[4], "total": n}
+            for k, n in cubo.items()
+        ])
+    if cubo_enf:
+        db.execute(insert(PacienteEnfermedadCubo), [
+            {"enfermedad_id": k[0], "comuna_id": k[1], "dependencia": k[2],
+             "tramo_edad": k[3], "total": n}
+            for k, n in cubo_enf.items()
+        ])
+    db.commit()
+    return {"combinaciones": len(cubo), "combinaciones_enfermedad": len(cubo_enf)}
+
+# ---------- consultas ----------
+def dimensiones_validas(filas: str, columnas: str | None) -> bool:
+    dims = [d for d in (filas, columnas) if d]
+    if not dims or any(d not in DIMENSIONES for d in dims) or filas == columnas:
+        return False
+    usa_enf = "enfermedad" in dims
+    return all(DIMENSIONES[d][1 if usa_enf else 0] is not None for d in dims)
+
+def _etiquetador(db: Session, dim: str):
+    if dim == "comuna":
+        nombres = {c.id: c.nombre for c in catalogos.comunas(db)}
+        return lambda v: nombres.get(v, "Sin comuna")
+    if dim == "enfermedad":
+        nombres = {e.id: e.nombre for e in catalogos.enfermedades(db)}
+        return lambda v: nombres.get(v, f"#{v}")
+    return lambda v: v or "Sin dato"
+
+def _orden(dim: str) -> list[str] | None:
+    if dim == "dependencia":
+        return [e.value for e in DependenciaEnum] + [SIN_DATO]
+    if dim == "prevision":
+        return [e.value for e in PrevisionEnum] + [SIN_DATO]
+    if dim == "movilidad":
+        return [e.value for e in MovilidadEnum] + [SIN_DATO]
+    if dim == "tramo_edad":
+        return [t[2] for t in TRAMOS_EDAD] + [SIN_DATO]
+    return None
+
+def tabla_cruzada(db: Session, filas: str, columnas: str | None = None) -> dict:
+    """
+    Conteos de pacientes activos agrupados por `filas` (y `columnas` si se indica).
+    Con la dimensión 'enfermedad' un paciente cuenta una vez por cada enfermedad.
+    """
+    usa_enf = "enfermedad" in (filas, columnas)
+    idx = 1 if usa_enf else 0
+    Modelo = PacienteEnfermedadCubo if usa_enf else PacienteCubo
+    col_f = DIMENSIONES[filas][idx]
+    cols = [col_f]
+    if columnas:
+        cols.append(DIMENSIONES[columnas][idx])
+    rows = db.execute(select(*cols, func.sum(Modelo.total)).group_by(*cols)).all()
+
+    etiqueta_f = _etiquetador(db, filas)
+    etiqueta_c = _etiquetador(db, columnas) if columnas else None
+    celdas: dict[tuple, int] = {}
+    claves_f, claves_c = set(), set()
+    for r in rows:
+        total = int(r[-1] or 0)
+        if not total:
+            continue
+        kf = r[0]
+        kc = r[1] if columnas else None
+        celdas[(kf, kc)] = celdas.get((kf, kc), 0) + total
+        claves_f.add(kf)
+        claves_c.add(kc)
+
+    def ordenar(claves, dim, etiqueta):
+        orden = _orden(dim)
+        if orden:
+            return [k for k in orden if k in claves]
+        return sorted(claves, key=lambda k: str(etiqueta(k)).lower())
+
+    orden_f = ordenar(claves_f, filas, etiqueta_f)
+    orden_c = ordenar(claves_c, columnas, etiqueta_c) if columnas else [None]
+    matriz = [
+        {
+            "etiqueta": etiqueta_f(kf),
+            "celdas": [celdas.get((kf, kc), 0) for kc in orden_c],
+            "total": sum(celdas.get((kf, kc), 0) for kc in orden_c),
+        }
+        for kf in orden_f
+    ]
+    return {
+        "filas": filas,
+        "columnas": columnas,
+        "encabezados": [etiqueta_c(kc) for kc in orden_c] if columnas else ["Pacientes"],
+        "matriz": matriz,
+        "totales_columna": [sum(celdas.get((kf, kc), 0) for kf in orden_f) for kc in orden_c],
+        "total": sum(celdas.values()),
+    }
+
+def total_activos(db: Session) -> int:
+    return int(db.scalar(select(func.coalesce(func.sum(PacienteCubo.total), 0))) or 0)
+
+if __name__ == "__main__":
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        print(reconstruir(db))
+    finally:
+        db.close()
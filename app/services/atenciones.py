@@ -0,0 +1,150 @@
+# app/services/atenciones.py
+"""
+Ingesta de atenciones (visitas y llamadas) pensada para volumen.
+
+Un lote se inserta con un único INSERT de varias filas (executemany) y el
+resumen `pacientes_ultima_atencion` se actualiza una vez por paciente del
+lote, no una vez por atención.
+
+Las fechas se guardan sin zona, en UTC (como `creado_en` y el corte de
+`sin_visita`): las que llegan con zona se convierten con `a_utc`. Las
+plantillas las muestran en hora local con el filtro `fecha_hora_cl`.
+"""
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, case, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.atenciones import Atencion, PacienteUltimaAtencion, TIPOS_ATENCION
+from app.models.pacientes import Paciente
+
+def a_utc(fecha: datetime) -> datetime:
+    """Fecha sin zona en UTC; una fecha sin zona se toma como UTC."""
+    if fecha.tzinfo is None:
+        return fecha
+    return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _asegurar_resumen(db: Session, paciente_ids: set[int]) -> None:
+    """Crea las filas de resumen que falten (total 0) antes de sumarles el lote."""
+    existentes = set(db.scalars(
+        select(PacienteUltimaAtencion.paciente_id)
+        .where(PacienteUltimaAtencion.paciente_id.in_(paciente_ids))
+    ))
+    faltan = [{"paciente_id": pid, "total": 0} for pid in paciente_ids - existentes]
+    if not faltan:
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(PacienteUltimaAtencion), faltan)
+    except IntegrityError:
+        # otra ingesta creó alguna en paralelo: se reintenta de a una
+        for fila in faltan:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(PacienteUltimaAtencion), [fila])
+            except IntegrityError:
+                pass
+
+_ACTUALIZAR_RESUMEN = (
+    update(PacienteUltimaAtencion)
+    .where(PacienteUltimaAtencion.paciente_id == bindparam("pid"))
+    # ultimo_tipo va antes que ultima_fecha: MySQL evalúa el SET de izquierda a derecha
+    .ordered_values(
+        (PacienteUltimaAtencion.ultimo_tipo, case(
+            (or_(PacienteUltimaAtencion.ultima_fecha.is_(None),
+                 PacienteUltimaAtencion.ultima_fecha <= bindparam("fecha")), bindparam("tipo")),
+            else_=PacienteUltimaAtencion.ultimo_tipo,
+        )),
+        (PacienteUltimaAtencion.ultima_fecha, case(
+            (or_(PacienteUltimaAtencion.ultima_fecha.is_(None),
+                 PacienteUltimaAtencion.ultima_fecha <= bindparam("fecha")), bindparam("fecha")),
+            else_=PacienteUltimaAtencion.ultima_fecha,
+        )),
+        (PacienteUltimaAtencion.total, PacienteUltimaAtencion.total + bindparam("n")),
+    )
+)
+
+def registrar_lote(db: Session, atenciones: list[dict], usuario_id: int | None = None) -> dict[str, int]:
+    """
+    `atenciones`: dicts con paciente_id, fecha, tipo y nota opcional.
+    Valida que los pacientes existan, inserta y actualiza el resumen en una transacción.
+    """
+    if not atenciones:
+        return {"insertadas": 0, "pacientes": 0}
+
+    ids = {a["paciente_id"] for a in atenciones}
+    validos = set(db.scalars(select(Paciente.id).where(Paciente.id.in_(ids))))
+    desconocidos = ids - validos
+    if desconocidos:
+        raise ValueError(f"Pacientes inexistentes: {sorted(desconocidos)[:10]}")
+    malos = {a["tipo"] for a in atenciones} - set(TIPOS_ATENCION)
+    if malos:
+        raise ValueError(f"Tipo de atención inválido: {sorted(malos)}")
+
+    ahora = datetime.utcnow()
+    filas = [{
+        "paciente_id": a["paciente_id"],
+        "fecha": a_utc(a["fecha"]),
+        "tipo": a["tipo"],
+        "nota": (a.get("nota") or "").strip(),
+        "usuario_id": usuario_id,
+        "creado_en": ahora,
+    } for a in atenciones]
+    db.execute(insert(Atencion), filas)
+
+    # una fila de resumen por paciente del lote
+    resumen: dict[int, dict] = {}
+    for f in filas:
+        r = resumen.get(f["paciente_id"])
+        if r is None:
+            resumen[f["paciente_id"]] = {"pid": f["paciente_id"], "fecha": f["fecha"], "tipo": f["tipo"], "n": 1}
+        else:
+            r["n"] += 1
+            if f["fecha"] >= r["fecha"]:
+                r["fecha"], r["tipo"] = f["fecha"], f["tipo"]
+
+    _asegurar_resumen(db, set(resumen))
+    db.connection().execute(_ACTUALIZAR_RESUMEN, list(resumen.values()))
+    db.commit()
+    return {"insertadas": len(filas), "pacientes": len(resumen)}
+
+# ---------- lecturas (servidas por índices) ----------
+def ultimas(db: Session, paciente_id: int, limite: int = 20) -> list[Atencion]:
+    return list(db.scalars(
+        select(Atencion)
+        .where(Atencion.paciente_id == paciente_id)
+        .order_by(Atencion.fecha.desc())
+        .limit(limite)
+    ))
+
+def resumen(db: Session, paciente_id: int) -> PacienteUltimaAtencion | None:
+    return db.get(PacienteUltimaAtencion, paciente_id)
+
+def sin_visita(db: Session, dias: int, limite: int = 200) -> dict:
+    """
+    Pacientes activos cuya última atención es anterior a hoy - `dias`
+    (rango sobre el índice de ultima_fecha) y pacientes activos sin ninguna
+    atención registrada (anti-join por PK).
+    """
+    corte = datetime.utcnow() - timedelta(days=dias)
+    atrasados = db.execute(
+        select(Paciente.id, Paciente.nombres, Paciente.apellidos, Paciente.rut,
+               PacienteUltimaAtencion.ultima_fecha, PacienteUltimaAtencion.ultimo_tipo,
+               PacienteUltimaAtencion.total)
+        .join(Paciente, Paciente.id == PacienteUltimaAtencion.paciente_id)
+        .where(PacienteUltimaAtencion.ultima_fecha < corte, Paciente.activo == True)
+        .order_by(PacienteUltimaAtencion.ultima_fecha.asc())
+        .limit(limite)
+    ).all()
+    nunca_q = (
+        select(Paciente.id, Paciente.nombres, Paciente.apellidos, Paciente.rut)
+        .outerjoin(PacienteUltimaAtencion, PacienteUltimaAtencion.paciente_id == Paciente.id)
+        .where(Paciente.activo == True, or_(
+            PacienteUltimaAtencion.paciente_id.is_(None),
+            PacienteUltimaAtencion.ultima_fecha.is_(None),
+        ))
+    )
+    nunca = db.execute(nunca_q.order_by(Paciente.id).limit(limite)).all()
+    total_nunca = db.scalar(select(func.count()).select_from(nunca_q.subquery()))
+    return {"corte": corte, "atrasados": atrasados, "nunca": nunca, "total_nunca": total_nunca}
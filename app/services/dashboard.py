@@ -0,0 +1,126 @@
+# app/services/dashboard.py
+"""
+Datos del dashboard consolidado (Caja + Banco), compartidos por la página y
+por /api/dashboard.
+"""
+from datetime import date
+
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from app.models import Categoria
+from app.models_finanzas import BancoMovimiento, CajaMovimiento
+
+# Paleta de colores para el gráfico de distribución
+PALETA_COLORES = [
+    '#ef4444', '#f97316', '#eab308', '#22c55e', 
+    '#06b6d4', '#3b82f6', '#8b5cf6', '#d946ef'
+]
+
+def _fuentes(origen: str | None) -> list[tuple]:
+    fuentes = []
+    if not origen or origen == "Banco":
+        fuentes.append((BancoMovimiento, "Banco"))
+    if not origen or origen == "Caja":
+        fuentes.append((CajaMovimiento, "Caja"))
+    return fuentes
+
+def _filtrar(query, Model, label, desde, hasta, categoria_id, metodo):
+    if desde: query = query.where(Model.fecha >= desde)
+    if hasta: query = query.where(Model.fecha <= hasta)
+    if categoria_id: query = query.where(Model.categoria_id == categoria_id)
+    if label == "Banco" and metodo:
+        query = query.where(Model.metodo_pago == metodo)
+    return query
+
+def _periodo(Model, agrupar: str) -> tuple:
+    """Columnas de agrupación del gráfico de flujo según `agrupar`."""
+    if agrupar == "año":
+        return (extract("year", Model.fecha),)
+    if agrupar == "mes":
+        return (extract("year", Model.fecha), extract("month", Model.fecha))
+    return (Model.fecha,)
+
+def _etiqueta(periodo: tuple, agrupar: str) -> str:
+    if agrupar == "año":
+        return f"{int(periodo[0]):04d}"
+    if agrupar == "mes":
+        return f"{int(periodo[0]):04d}-{int(periodo[1]):02d}"
+    fecha = periodo[0]
+    return fecha.isoformat() if isinstance(fecha, date) else str(fecha)
+
+def datos_dashboard(
+    db: Session,
+    desde: date | None = None,
+    hasta: date | None = None,
+    categoria_id: int | None = None,
+    metodo: str | None = None,
+    origen: str | None = None,
+    agrupar: str = "dia",
+    con_items: bool = True,
+) -> dict:
+    """
+    KPIs, serie para el gráfico de flujo y top 8 de categorías por tipo.
+    Con `con_items` incluye además los movimientos (fecha descendente) para la tabla.
+
+    Los totales salen de consultas agrupadas (por período y por categoría), no
+    de recorrer los movimientos: /api/dashboard los pide sin items y su costo
+    no crece con el número de filas del período.
+    """
+    filtros = (desde, hasta, categoria_id, metodo)
+    datos_agrupados: dict[str, dict] = {}
+    datos_cat: dict[str, dict[str, float]] = {"entrada": {}, "salida": {}}
+    movimientos_mezclados = []
+
+    for Model, label in _fuentes(origen):
+        # Serie del gráfico de línea: suma por período y tipo
+        periodo = _periodo(Model, agrupar)
+        q = select(*periodo, Model.tipo, func.sum(Model.monto)).group_by(*periodo, Model.tipo)
+        for *p, tipo, total in db.execute(_filtrar(q, Model, label, *filtros)).all():
+            d = datos_agrupados.setdefault(_etiqueta(tuple(p), agrupar), {"entradas": 0, "salidas": 0})
+            d["entradas" if tipo == "entrada" else "salidas"] += float(total or 0)
+
+        # Distribución por categoría y tipo
+        q = (
+            select(Categoria.nombre, Model.tipo, func.sum(Model.monto))
+            .select_from(Model)
+            .outerjoin(Categoria, Model.categoria_id == Categoria.id)
+            .group_by(Categoria.nombre, Model.tipo)
+        )
+        for cat_nombre, tipo, total in db.execute(_filtrar(q, Model, label, *filtros)).all():
+            por_cat = datos_cat["entrada" if tipo == "entrada" else "salida"]
+            cat_name = cat_nombre or "Sin categoría"
+            por_cat[cat_name] = por_cat.get(cat_name, 0) + float(total or 0)
+
+        if con_items:
+            q = (
+                select(Model.fecha, Model.tipo, Model.monto, Categoria.nombre, Model.concepto)
+                .outerjoin(Categoria, Model.categoria_id == Categoria.id)
+                .order_by(Model.id)
+            )
+            movimientos_mezclados.extend({
+                "fecha": fecha,
+                "tipo": tipo,
+                "monto": float(monto),
+                "categoria": cat_nombre or "Sin categoría",
+                "origen": label,
+                "concepto": concepto
+            } for fecha, tipo, monto, cat_nombre, concepto in db.execute(_filtrar(q, Model, label, *filtros)))
+
+    # Ordenar por fecha descendente
+    movimientos_mezclados.sort(key=lambda x: x["fecha"], reverse=True)
+
+    # Preparar series
+    serie_grafico = [{"label": k, "entradas": v["entradas"], "salidas": v["salidas"]} for k, v in sorted(datos_agrupados.items())]
+    cat_ent_list = [{"categoria": k, "total": v} for k, v in sorted(datos_cat["entrada"].items(), key=lambda x: x[1], reverse=True)]
+    cat_sal_list = [{"categoria": k, "total": v} for k, v in sorted(datos_cat["salida"].items(), key=lambda x: x[1], reverse=True)]
+
+    entradas = sum(d["total"] for d in cat_ent_list)
+    salidas = sum(d["total"] for d in cat_sal_list)
+    return {
+        "items": movimientos_mezclados,
+        "kpi": {"entradas": entradas, "salidas": salidas, "neto": entradas - salidas},
+        "serie": serie_grafico,
+        "cat_entradas": cat_ent_list[:8],
+        "cat_salidas": cat_sal_list[:8],
+    }
@@ -0,0 +1,92 @@
+# app/services/informes.py
+"""
+Datos del informe ejecutivo (vista web, impresión y /api/informes).
+
+La serie mensual y la distribución por categoría salen de una consulta
+agrupada por tabla, no de una consulta por mes y por categoría.
+"""
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import case, extract, func, select
+from sqlalchemy.orm import Session
+
+from app.core import catalogos
+from app.models_finanzas import BancoMovimiento, CajaMovimiento
+
+def _modelos(origen: Optional[str]):
+    if origen == "banco":
+        return [BancoMovimiento]
+    if origen == "caja":
+        return [CajaMovimiento]
+    return [BancoMovimiento, CajaMovimiento]
+
+def _meses(desde: date, hasta: date) -> list[date]:
+    meses, curr = [], desde.replace(day=1)
+    while curr <= hasta:
+        meses.append(curr)
+        curr = (curr + timedelta(days=32)).replace(day=1)
+    return meses
+
+def serie_mensual(db: Session, desde: date, hasta: date, origen: Optional[str]) -> list[dict]:
+    """Ingresos y gastos por mes, con meses completos desde el de `desde` hasta el de `hasta`."""
+    meses = _meses(desde, hasta)
+    if not meses:
+        return []
+    fin = (meses[-1] + timedelta(days=32)).replace(day=1)
+    totales: dict[tuple[int, int], list[float]] = {(m.year, m.month): [0.0, 0.0] for m in meses}
+    for M in _modelos(origen):
+        anio, mes = extract("year", M.fecha), extract("month", M.fecha)
+        filas = db.execute(
+            select(
+                anio, mes,
+                func.sum(case((M.tipo == "entrada", M.monto), else_=0)),
+                func.sum(case((M.tipo == "salida", M.monto), else_=0)),
+            )
+            .where(M.fecha >= meses[0], M.fecha < fin)
+            .group_by(anio, mes)
+        ).all()
+        for a, m, ing, gas in filas:
+            t = totales[(int(a), int(m))]
+            t[0] += float(ing or 0)
+            t[1] += float(gas or 0)
+    return [
+        {"label": m.strftime("%b %Y"), "ingresos": totales[(m.year, m.month)][0], "gastos": totales[(m.year, m.month)][1]}
+        for m in meses
+    ]
+
+def distribucion_gastos(db: Session, desde: date, hasta: date, origen: Optional[str]) -> dict:
+    """Gastos por categoría en el período, en el orden del catálogo y solo las con monto."""
+    por_categoria: dict[int, float] = {}
+    for M in _modelos(origen):
+        filas = db.execute(
+            select(M.categoria_id, func.sum(M.monto))
+            .where(M.tipo == "salida", M.fecha.between(desde, hasta), M.categoria_id.is_not(None))
+            .group_by(M.categoria_id)
+        ).all()
+        for cat_id, total in filas:
+            por_categoria[cat_id] = por_categoria.get(cat_id, 0.0) + float(total or 0)
+
+    labels, data = [], []
+    for cat in catalogos.categorias(db):
+        if por_categoria.get(cat.id, 0) > 0:
+            labels.append(cat.nombre)
+            data.append(por_categoria[cat.id])
+    return {"labels": labels, "data": data}
+
+def kpi_de(serie: list[dict]) -> dict:
+    ingresos = sum(d["ingresos"] for d in serie)
+    gastos = sum(d["gastos"] for d in serie)
+    return {"ingresos": ingresos, "gastos": gastos, "neto": ingresos - gastos}
+
+def obtener_datos_informe(db: Session, desde: date, hasta: date, origen: Optional[str]) -> dict:
+    """
+    Función centralizada para procesar la lógica de negocio
+    compartida entre la vista web, la de impresión y la API.
+    """
+    serie = serie_mensual(db, desde, hasta, origen)
+    return {
+        "serie": serie,
+        "pie": distribucion_gastos(db, desde, hasta, origen),
+        "kpi": kpi_de(serie),
+    }
@@ -0,0 +1,338 @@
+# app/services/inventario.py
+"""
+Movimientos de inventario (entradas, salidas y ajustes) con saldo mantenido.
+
+Cada movimiento se anexa a `inv_movimientos` y, en la misma transacción, se
+actualiza la fila de `inv_stock` del ítem; el stock actual nunca se obtiene
+sumando el historial. Los lotes bloquean una vez las filas de saldo de los
+ítems involucrados, calculan los saldos en memoria y escriben con executemany.
+
+Valorización: cada ítem tiene en `inv_valorizacion` el valor de su stock a
+promedio ponderado y a FIFO, y en `inv_capas` las capas FIFO con saldo. Ambos
+se ajustan en el mismo paso que el saldo, así que el informe de valorización
+lee una fila por ítem sin recorrer el historial. Las entradas sin costo
+informado entran al costo promedio vigente.
+
+Los ítems creados antes de existir `inv_stock` reciben su fila (con
+`stock_inicial`, a costo 0) la primera vez que se mueven, o todos de una vez con:
+
+    python -m app.services.inventario
+"""
+from collections import deque
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import bindparam, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.models.inv_basic import InvCategoria, InventarioItem, UnidadMedida
+from app.models.inv_movimientos import (
+    InvCapa, InvMovimiento, InvStock, InvValorizacion, TIPOS_MOVIMIENTO,
+)
+
+CERO = Decimal("0")
+_Q_VALOR = Decimal("0.0001")
+
+# ---------- saldos ----------
+def asegurar_saldos(db: Session, item_ids: set[int] | None = None) -> None:
+    """Crea con INSERT ... SELECT las filas de saldo que falten, partiendo de stock_inicial."""
+    origen = (
+        select(InventarioItem.id, InventarioItem.stock_inicial, literal(0),
+               InventarioItem.stock_inicial < 0, literal(datetime.utcnow()))
+        .outerjoin(InvStock, InvStock.item_id == InventarioItem.id)
+        .where(InvStock.item_id.is_(None))
+    )
+    if item_ids is not None:
+        origen = origen.where(InventarioItem.id.in_(item_ids))
+    db.execute(insert(InvStock).from_select(
+        ["item_id", "cantidad", "stock_minimo", "bajo_minimo", "actualizado_en"], origen))
+    _asegurar_valorizacion(db, item_ids)
+
+def _asegurar_valorizacion(db: Session, item_ids: set[int] | None) -> None:
+    """Stock sin valorizar (previo a los costos): una capa a costo 0 y valor 0."""
+    sin_valor = (
+        select(InvStock.item_id, InvStock.cantidad)
+        .outerjoin(InvValorizacion, InvValorizacion.item_id == InvStock.item_id)
+        .where(InvValorizacion.item_id.is_(None))
+    )
+    if item_ids is not None:
+        sin_valor = sin_valor.where(InvStock.item_id.in_(item_ids))
+    ahora = datetime.utcnow()
+    sub = sin_valor.subquery()
+    db.execute(insert(InvCapa).from_select(
+        ["item_id", "fecha", "cantidad", "restante", "costo_unitario", "abierta"],
+        select(sub.c.item_id, literal(ahora), sub.c.cantidad, sub.c.cantidad, literal(0), literal(True))
+        .where(sub.c.cantidad > 0)))
+    db.execute(insert(InvValorizacion).from_select(
+        ["item_id", "valor_promedio", "valor_fifo", "actualizado_en"],
+        select(sub.c.item_id, literal(0), literal(0), literal(ahora))))
+
+def crear_saldo(db: Session, item: InventarioItem, costo_unitario: Decimal = CERO) -> None:
+    """Alta del saldo y la valorización de un ítem nuevo, dentro de la transacción del llamador."""
+    db.flush()
+    ahora = datetime.utcnow()
+    valor = (item.stock_inicial * costo_unitario).quantize(_Q_VALOR)
+    db.add(InvStock(item_id=item.id, cantidad=item.stock_inicial, stock_minimo=CERO,
+                    bajo_minimo=item.stock_inicial < 0))
+    db.add(InvValorizacion(item_id=item.id, valor_promedio=valor, valor_fifo=valor, actualizado_en=ahora))
+    if item.stock_inicial > 0:
+        db.add(InvCapa(item_id=item.id, fecha=ahora, cantidad=item.stock_inicial,
+                       restante=item.stock_inicial, costo_unitario=costo_unitario, abierta=True))
+
+class _Estado:
+    """Saldo, valores y capas abiertas de un ítem mientras se aplica un lote."""
+    __slots__ = ("cantidad", "minimo", "valor_promedio", "valor_fifo", "capas", "tocadas", "nuevas")
+
+    def __init__(self, cantidad, minimo, valor_promedio, valor_fifo):
+        self.cantidad = cantidad
+        self.minimo = minimo
+        self.valor_promedio = valor_promedio
+        self.valor_fifo = valor_fifo
+        self.capas: deque[dict] = deque()   # abiertas, de la más antigua a la más nueva
+        self.tocadas: dict[int, dict] = {}  # capas existentes modificadas, por id
+        self.nuevas: list[dict] = []
+
+    def costo_promedio(self) -> Decimal:
+        return self.valor_promedio / self.cantidad if self.cantidad > 0 else CERO
+
+    def entrar(self, cantidad: Decimal, costo: Decimal, fecha: datetime) -> Decimal:
+        valor = (cantidad * costo).quantize(_Q_VALOR)
+        self.valor_promedio += valor
+        self.valor_fifo += valor
+        capa = {"id": None, "fecha": fecha, "cantidad": cantidad, "restante": cantidad,
+                "costo_unitario": costo, "abierta": True}
+        self.capas.append(capa)
+        self.nuevas.append(capa)
+        return valor
+
+    def salir(self, cantidad: Decimal) -> tuple[Decimal, Decimal, Decimal]:
+        """Devuelve (costo promedio, valor a promedio, valor FIFO) de lo que sale."""
+        costo = self.costo_promedio()
+        if cantidad >= self.cantidad:
+            valor_prom = self.valor_promedio   # sale todo: no dejar residuos de redondeo
+        else:
+            valor_prom = (cantidad * costo).quantize(_Q_VALOR)
+        self.valor_promedio -= valor_prom
+
+        valor_fifo = CERO
+        pendiente = cantidad
+        while pendiente > 0 and self.capas:
+            capa = self.capas[0]
+            usa = min(pendiente, capa["restante"])
+            valor_fifo += usa * capa["costo_unitario"]
+            capa["restante"] -= usa
+            pendiente -= usa
+            if capa["restante"] <= 0:
+                capa["abierta"] = False
+                self.capas.popleft()
+            if capa["id"] is not None:
+                self.tocadas[capa["id"]] = capa
+        valor_fifo = valor_fifo.quantize(_Q_VALOR)
+        if cantidad >= self.cantidad:
+            valor_fifo = self.valor_fifo
+        self.valor_fifo -= valor_fifo
+        return costo, valor_prom, valor_fifo
+
+def _bloquear_saldos(db: Session, item_ids: set[int]) -> dict[int, _Estado]:
+    asegurar_saldos(db, item_ids)
+    filas = db.execute(
+        select(InvStock.item_id, InvStock.cantidad, InvStock.stock_minimo,
+               InvValorizacion.valor_promedio, InvValorizacion.valor_fifo)
+        .join(InvValorizacion, InvValorizacion.item_id == InvStock.item_id)
+        .where(InvStock.item_id.in_(item_ids))
+        .with_for_update()
+    ).all()
+    estados = {r.item_id: _Estado(Decimal(r.cantidad), Decimal(r.stock_minimo),
+                                  Decimal(r.valor_promedio), Decimal(r.valor_fifo)) for r in filas}
+    capas = db.execute(
+        select(InvCapa.id, InvCapa.item_id, InvCapa.restante, InvCapa.costo_unitario)
+        .where(InvCapa.item_id.in_(item_ids), InvCapa.abierta == True)
+        .order_by(InvCapa.item_id, InvCapa.id)
+        .with_for_update()
+    )
+    for c in capas:
+        estados[c.item_id].capas.append({"id": c.id, "restante": Decimal(c.restante),
+                                         "costo_unitario": Decimal(c.costo_unitario), "abierta": True})
+    return estados
+
+_ACTUALIZAR_SALDO = (
+    update(InvStock)
+    .where(InvStock.item_id == bindparam("iid"))
+    .values(cantidad=bindparam("cantidad"), bajo_minimo=bindparam("bajo"),
+            actualizado_en=bindparam("ahora"))
+)
+
+_ACTUALIZAR_VALOR = (
+    update(InvValorizacion)
+    .where(InvValorizacion.item_id == bindparam("iid"))
+    .values(valor_promedio=bindparam("vp"), valor_fifo=bindparam("vf"),
+            actualizado_en=bindparam("ahora"))
+)
+
+_ACTUALIZAR_CAPA = (
+    update(InvCapa)
+    .where(InvCapa.id == bindparam("cid"))
+    .values(restante=bindparam("restante"), abierta=bindparam("abierta_"))
+)
+
+# ---------- movimientos ----------
+def _delta(tipo: str, cantidad: Decimal) -> Decimal:
+    if tipo == "entrada":
+        return cantidad
+    if tipo == "salida":
+        return -cantidad
+    return cantidad   # ajuste: la cantidad ya trae su signo
+
+def registrar_movimientos(db: Session, movimientos: list[dict], usuario_id: int | None = None) -> dict[str, int]:
+    """
+    `movimientos`: dicts con item_id, tipo, cantidad y opcionalmente fecha, nota y
+    costo_unitario. Entradas y salidas llevan cantidad positiva; los ajustes, la
+    diferencia con signo. El costo solo se usa en lo que entra (sin costo, entra al
+    promedio vigente); lo que sale se valoriza a promedio y consumiendo capas FIFO.
+    Se aplican en el orden recibido. Lanza ValueError si algún dato es inválido o
+    si un saldo quedaría negativo; en ese caso no se escribe nada.
+    """
+    if not movimientos:
+        return {"registrados": 0, "items": 0}
+
+    malos = {m["tipo"] for m in movimientos} - set(TIPOS_MOVIMIENTO)
+    if malos:
+        raise ValueError(f"Tipo de movimiento inválido: {sorted(malos)}")
+    for m in movimientos:
+        if m["tipo"] != "ajuste" and Decimal(m["cantidad"]) <= 0:
+            raise ValueError("Las entradas y salidas requieren cantidad mayor a cero")
+        if m.get("costo_unitario") is not None and Decimal(m["costo_unitario"]) < 0:
+            raise ValueError("El costo unitario no puede ser negativo")
+
+    ids = {m["item_id"] for m in movimientos}
+    estados = _bloquear_saldos(db, ids)
+    desconocidos = ids - set(estados)
+    if desconocidos:
+        raise ValueError(f"Ítems inexistentes: {sorted(desconocidos)[:10]}")
+
+    ahora = datetime.utcnow()
+    filas = []
+    for m in movimientos:
+        e = estados[m["item_id"]]
+        delta = _delta(m["tipo"], Decimal(m["cantidad"]))
+        if e.cantidad + delta < 0:
+            raise ValueError(f"Stock insuficiente para el ítem {m['item_id']} (disponible {e.cantidad})")
+        fecha = m.get("fecha") or ahora
+        if delta > 0:
+            costo = m.get("costo_unitario")
+            costo = Decimal(costo) if costo is not None else e.costo_promedio().quantize(_Q_VALOR)
+            valor_prom = valor_fifo = e.entrar(delta, costo, fecha)
+        else:
+            costo, valor_prom, valor_fifo = e.salir(-delta)
+            costo = costo.quantize(_Q_VALOR)
+            valor_prom, valor_fifo = -valor_prom, -valor_fifo
+        e.cantidad += delta
+        filas.append({
+            "item_id": m["item_id"],
+            "fecha": fecha,
+            "tipo": m["tipo"],
+            "delta": delta,
+            "saldo": e.cantidad,
+            "costo_unitario": costo,
+            "valor_promedio": valor_prom,
+            "valor_fifo": valor_fifo,
+            "nota": (m.get("nota") or "").strip()[:255],
+            "usuario_id": usuario_id,
+            "creado_en": ahora,
+        })
+
+    conn = db.connection()
+    db.execute(insert(InvMovimiento), filas)
+    conn.execute(_ACTUALIZAR_SALDO, [
+        {"iid": iid, "cantidad": e.cantidad, "bajo": e.cantidad < e.minimo, "ahora": ahora}
+        for iid, e in estados.items()
+    ])
+    conn.execute(_ACTUALIZAR_VALOR, [
+        {"iid": iid, "vp": e.valor_promedio, "vf": e.valor_fifo, "ahora": ahora}
+        for iid, e in estados.items()
+    ])
+    tocadas = [{"cid": cid, "restante": c["restante"], "abierta_": c["abierta"]}
+               for e in estados.values() for cid, c in e.tocadas.items()]
+    if tocadas:
+        conn.execute(_ACTUALIZAR_CAPA, tocadas)
+    nuevas = [{"item_id": iid, **{k: v for k, v in c.items() if k != "id"}}
+              for iid, e in estados.items() for c in e.nuevas]
+    if nuevas:
+        db.execute(insert(InvCapa), nuevas)
+    db.commit()
+    return {"registrados": len(filas), "items": len(ids)}
+
+def fijar_minimo(db: Session, item_id: int, minimo: Decimal) -> None:
+    asegurar_saldos(db, {item_id})
+    db.execute(
+        update(InvStock)
+        .where(InvStock.item_id == item_id)
+        .values(stock_minimo=minimo, bajo_minimo=InvStock.cantidad < minimo)
+    )
+    db.commit()
+
+# ---------- lecturas ----------
+def saldo(db: Session, item_id: int) -> InvStock | None:
+    return db.get(InvStock, item_id)
+
+def historial(db: Session, item_id: int, limite: int = 50) -> list[InvMovimiento]:
+    return list(db.scalars(
+        select(InvMovimiento)
+        .where(InvMovimiento.item_id == item_id)
+        .order_by(InvMovimiento.id.desc())
+        .limit(limite)
+    ))
+
+def valorizacion(db: Session, item_id: int) -> InvValorizacion | None:
+    return db.get(InvValorizacion, item_id)
+
+def informe_valorizacion(db: Session, metodo: str = "promedio") -> dict:
+    """
+    Valor del inventario completo leyendo las instantáneas de `inv_valorizacion`
+    (una fila por ítem), con subtotales por categoría.
+    """
+    valor = InvValorizacion.valor_fifo if metodo == "fifo" else InvValorizacion.valor_promedio
+    filas = db.execute(
+        select(InventarioItem.id, InventarioItem.nombre, InvCategoria.nombre.label("categoria"),
+               UnidadMedida.codigo.label("unidad"), InvStock.cantidad, valor.label("valor"))
+        .join(InvStock, InvStock.item_id == InventarioItem.id)
+        .join(InvValorizacion, InvValorizacion.item_id == InventarioItem.id)
+        .outerjoin(InvCategoria, InvCategoria.id == InventarioItem.categoria_id)
+        .outerjoin(UnidadMedida, UnidadMedida.id == InventarioItem.unidad_id)
+        .order_by(InvCategoria.nombre, InventarioItem.nombre)
+    ).all()
+    por_categoria: dict[str, Decimal] = {}
+    for f in filas:
+        por_categoria[f.categoria or "Sin categoría"] = por_categoria.get(f.categoria or "Sin categoría", CERO) + f.valor
+    sin_valorizar = db.scalar(
+        select(func.count()).select_from(InventarioItem)
+        .outerjoin(InvValorizacion, InvValorizacion.item_id == InventarioItem.id)
+        .where(InvValorizacion.item_id.is_(None))
+    ) or 0
+    return {
+        "metodo": metodo,
+        "filas": filas,
+        "por_categoria": por_categoria,
+        "total": sum(por_categoria.values(), CERO),
+        "sin_valorizar": sin_valorizar,
+    }
+
+def bajo_minimo(db: Session) -> list:
+    """Ítems bajo su stock mínimo (filtro sobre el índice de `bajo_minimo`)."""
+    return db.execute(
+        select(InventarioItem.id, InventarioItem.nombre, UnidadMedida.codigo.label("unidad"),
+               InvStock.cantidad, InvStock.stock_minimo)
+        .join(InvStock, InvStock.item_id == InventarioItem.id)
+        .outerjoin(UnidadMedida, UnidadMedida.id == InventarioItem.unidad_id)
+        .where(InvStock.bajo_minimo == True)
+        .order_by(InventarioItem.nombre)
+    ).all()
+
+if __name__ == "__main__":
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        asegurar_saldos(db)
+        db.commit()
+    finally:
+        db.close()
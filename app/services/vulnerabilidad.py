@@ -0,0 +1,232 @@
+# app/services/vulnerabilidad.py
+"""
+Motor de puntaje de vulnerabilidad (0-100) para `Paciente.puntaje_vulnerabilidad`.
+
+Factores: vive solo, dependencia, movilidad, edad, cantidad de enfermedades y
+ausencia de red de apoyo. Los pesos por defecto están en PESOS_DEFECTO y se
+pueden sobrescribir en la tabla `vulnerabilidad_reglas`, dentro de RANGOS: al
+guardar se rechazan los valores fuera de rango y al cargar se ignoran (queda el
+valor por defecto).
+
+El cálculo es por lotes: una sola consulta trae los insumos de todos los
+pacientes junto con la firma guardada del último cálculo, y solo se escriben
+los pacientes cuya firma cambió (datos, edad o reglas). Uso manual:
+
+    python -m app.services.vulnerabilidad
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db import SessionLocal
+from app.models.pacientes import Paciente, PacienteEnfermedad
+from app.models.vulnerabilidad import PacientePuntaje, ReglaVulnerabilidad
+
+log = logging.getLogger(__name__)
+
+PESOS_DEFECTO: dict[str, int] = {
+    "vive_solo": 20,
+    "dependencia_leve": 5,
+    "dependencia_moderada": 15,
+    "dependencia_severa": 25,
+    "movilidad_asistido": 10,
+    "movilidad_postrado": 20,
+    "edad_60": 5,            # se aplica solo el tramo más alto alcanzado
+    "edad_70": 10,
+    "edad_80": 15,
+    "por_enfermedad": 4,
+    "max_enfermedades": 5,   # tope de enfermedades que suman puntaje
+    "sin_red_apoyo": 10,
+}
+
+ETIQUETAS = {
+    "vive_solo": "Vive solo",
+    "dependencia_leve": "Dependencia leve",
+    "dependencia_moderada": "Dependencia moderada",
+    "dependencia_severa": "Dependencia severa",
+    "movilidad_asistido": "Movilidad asistida",
+    "movilidad_postrado": "Postrado",
+    "edad_60": "Edad 60-69",
+    "edad_70": "Edad 70-79",
+    "edad_80": "Edad 80 o más",
+    "por_enfermedad": "Por cada enfermedad",
+    "max_enfermedades": "Tope de enfermedades consideradas",
+    "sin_red_apoyo": "Sin red de apoyo",
+}
+
+PUNTAJE_MAX = 100
+LOTE = 1000
+
+# valores permitidos por clave (mínimo, máximo)
+RANGOS: dict[str, tuple[int, int]] = {clave: (0, PUNTAJE_MAX) for clave in PESOS_DEFECTO}
+RANGOS["max_enfermedades"] = (1, 50)
+
+_lock = threading.Lock()
+
+# ---------- reglas ----------
+def fuera_de_rango(pesos: dict[str, int]) -> list[str]:
+    """Claves de `pesos` cuyo valor no está dentro de RANGOS."""
+    return [k for k, v in pesos.items()
+            if k in RANGOS and not (isinstance(v, int) and RANGOS[k][0] <= v <= RANGOS[k][1])]
+
+def cargar_pesos(db: Session) -> dict[str, int]:
+    pesos = dict(PESOS_DEFECTO)
+    guardados = {r.clave: r.peso for r in db.execute(select(ReglaVulnerabilidad)).scalars()
+                 if r.clave in PESOS_DEFECTO}
+    for clave in fuera_de_rango(guardados):
+        log.warning("Regla de vulnerabilidad %s=%r fuera de rango %s: se usa %d",
+                    clave, guardados.pop(clave), RANGOS[clave], PESOS_DEFECTO[clave])
+    pesos.update(guardados)
+    return pesos
+
+def guardar_pesos(db: Session, pesos: dict[str, int]) -> bool:
+    """
+    Guarda los pesos que difieren del valor actual. Devuelve True si hubo cambios.
+    ValueError si alguno está fuera de RANGOS (no se guarda ninguno).
+    """
+    malos = fuera_de_rango(pesos)
+    if malos:
+        raise ValueError("Valores fuera de rango: " + ", ".join(
+            f"{ETIQUETAS[k]} ({RANGOS[k][0]} a {RANGOS[k][1]})" for k in malos))
+    actuales = cargar_pesos(db)
+    cambios = {k: v for k, v in pesos.items() if k in PESOS_DEFECTO and actuales.get(k) != v}
+    for clave, peso in cambios.items():
+        regla = db.get(ReglaVulnerabilidad, clave)
+        if regla:
+            regla.peso = peso
+        else:
+            db.add(ReglaVulnerabilidad(clave=clave, peso=peso))
+    db.commit()
+    return bool(cambios)
+
+def _huella_reglas(pesos: dict[str, int]) -> str:
+    return hashlib.sha1(json.dumps(pesos, sort_keys=True).encode()).hexdigest()[:8]
+
+# ---------- cálculo ----------
+def _edad(nacimiento: date | None, hoy: date) -> int | None:
+    if not nacimiento:
+        return None
+    return hoy.year - nacimiento.year - ((hoy.month, hoy.day) < (nacimiento.month, nacimiento.day))
+
+def puntuar(pesos: dict[str, int], vive_solo: bool, dependencia, movilidad,
+            edad: int | None, n_enfermedades: int, tiene_red: bool) -> int:
+    p = 0
+    if vive_solo:
+        p += pesos["vive_solo"]
+    dep = getattr(dependencia, "value", dependencia)
+    if dep:
+        p += pesos.get(f"dependencia_{dep.lower()}", 0)
+    mov = getattr(movilidad, "value", movilidad)
+    if mov == "Asistido":
+        p += pesos["movilidad_asistido"]
+    elif mov == "Postrado":
+        p += pesos["movilidad_postrado"]
+    if edad is not None:
+        if edad >= 80:
+            p += pesos["edad_80"]
+        elif edad >= 70:
+            p += pesos["edad_70"]
+        elif edad >= 60:
+            p += pesos["edad_60"]
+    p += pesos["por_enfermedad"] * min(n_enfermedades, pesos["max_enfermedades"])
+    if not tiene_red:
+        p += pesos["sin_red_apoyo"]
+    return max(0, min(PUNTAJE_MAX, p))
+
+def _consulta_insumos(paciente_ids: list[int] | None):
+    n_enf = (
+        select(PacienteEnfermedad.paciente_id, func.count().label("n"))
+        .group_by(PacienteEnfermedad.paciente_id)
+        .subquery()
+    )
+    tiene_red = func.length(func.trim(func.coalesce(Paciente.red_apoyo, ""))) > 0
+    stmt = (
+        select(
+            Paciente.id, Paciente.vive_solo, Paciente.dependencia, Paciente.movilidad,
+            Paciente.fecha_nacimiento, tiene_red.label("tiene_red"),
+            func.coalesce(n_enf.c.n, 0).label("n_enf"), PacientePuntaje.firma,
+        )
+        .outerjoin(n_enf, n_enf.c.paciente_id == Paciente.id)
+        .outerjoin(PacientePuntaje, PacientePuntaje.paciente_id == Paciente.id)
+    )
+    if paciente_ids is not None:
+        stmt = stmt.where(Paciente.id.in_(paciente_ids))
+    return stmt
+
+def _escribir(db: Session, cambios: list[dict]) -> None:
+    for i in range(0, len(cambios), LOTE):
+        lote = cambios[i:i + LOTE]
+        ids = [c["paciente_id"] for c in lote]
+        db.execute(delete(PacientePuntaje).where(PacientePuntaje.paciente_id.in_(ids)))
+        db.execute(insert(PacientePuntaje), lote)
+        # copia en bloque al campo que muestran las vistas
+        db.execute(
+            update(Paciente)
+            .where(Paciente.id.in_(ids))
+            .values(puntaje_vulnerabilidad=(
+                select(PacientePuntaje.puntaje)
+                .where(PacientePuntaje.paciente_id == Paciente.id)
+                .scalar_subquery()
+            ))
+            .execution_options(synchronize_session=False)
+        )
+
+def recalcular(db: Session, paciente_ids: list[int] | None = None) -> dict[str, int]:
+    """
+    Recalcula los pacientes indicados (o todos) y escribe solo los que cambiaron.
+    Hace commit al terminar.
+    """
+    hoy = date.today()
+    ahora = datetime.utcnow()
+    pesos = cargar_pesos(db)
+    huella = _huella_reglas(pesos)
+
+    revisados = 0
+    cambios: list[dict] = []
+    for pid, vive_solo, dep, mov, nacimiento, tiene_red, n_enf, firma_ant in \
+            db.execute(_consulta_insumos(paciente_ids)).yield_per(5000):
+        revisados += 1
+        edad = _edad(nacimiento, hoy)
+        insumos = (bool(vive_solo), getattr(dep, "value", dep), getattr(mov, "value", mov),
+                   edad, int(n_enf), bool(tiene_red))
+        firma = hashlib.sha1(f"{huella}{insumos!r}".encode()).hexdigest()
+        if firma == firma_ant:
+            continue
+        cambios.append({
+            "paciente_id": pid,
+            "puntaje": puntuar(pesos, *insumos),
+            "firma": firma,
+            "calculado_en": ahora,
+        })
+
+    _escribir(db, cambios)
+    db.commit()
+    return {"revisados": revisados, "actualizados": len(cambios)}
+
+def recalcular_en_segundo_plano(paciente_ids: list[int] | None = None) -> None:
+    """Para BackgroundTasks: sesión propia y un solo recálculo a la vez por proceso."""
+    with _lock:
+        db = SessionLocal()
+        try:
+            res = recalcular(db, paciente_ids)
+            log.info("vulnerabilidad: %s", res)
+        except Exception:
+            db.rollback()
+            log.exception("vulnerabilidad: falló el recálculo")
+        finally:
+            db.close()
+
+if __name__ == "__main__":
+    import time
+    db = SessionLocal()
+    try:
+        t0 = time.perf_counter()
+        res = recalcular(db)
+        print(res, f"{time.perf_counter() - t0:.2f}s")
+    finally:
+        db.close()
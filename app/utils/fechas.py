@@ -0,0 +1,31 @@
+# app/utils/fechas.py
+"""
+Formato de fechas para las plantillas y conversión de la hora local.
+
+Las fechas con hora se guardan sin zona, en UTC (ver app.services.atenciones);
+lo que escribe el usuario y lo que se le muestra está en la zona de la
+fundación, APP_ZONA (America/Santiago).
+"""
+import os
+from datetime import date, datetime, timezone
+from zoneinfo import ZoneInfo
+
+ZONA = ZoneInfo(os.getenv("APP_ZONA", "America/Santiago"))
+
+def fecha_cl(value: date | None) -> str:
+    """31/12/2025; deja tal cual lo que no sea fecha (None, textos)."""
+    try:
+        return value.strftime("%d/%m/%Y")
+    except AttributeError:
+        return value
+
+def desde_local(fecha: datetime) -> datetime:
+    """Fecha escrita por el usuario (sin zona = hora local de ZONA) con su zona."""
+    return fecha.replace(tzinfo=ZONA) if fecha.tzinfo is None else fecha
+
+def fecha_hora_cl(value: datetime | None, formato: str = "%d/%m/%Y %H:%M") -> str:
+    """Fecha guardada en UTC sin zona, en hora local: 31/12/2025 21:30."""
+    try:
+        return value.replace(tzinfo=timezone.utc).astimezone(ZONA).strftime(formato)
+    except AttributeError:
+        return value
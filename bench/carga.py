@@ -0,0 +1,121 @@
+"""
+Benchmark: throughput y latencias (p50/p95/p99) de las rutas de lectura con
+mucha concurrencia.
+
+Sirve para comparar dos instancias, por ejemplo el camino asíncrono actual
+contra el síncrono anterior levantado desde otra copia del repo:
+
+    git worktree add /tmp/sync <commit-anterior>
+    (cd /tmp/sync && uvicorn app.main:app --port 8001) &
+    uvicorn app.main:app --port 8000 &
+    python bench/carga.py --url http://127.0.0.1:8000 --url http://127.0.0.1:8001 --concurrencia 64
+
+Cada instancia se mide por separado (una después de la otra) con `--concurrencia`
+hilos pidiendo las `--ruta` en ronda durante `--segundos`. Las diferencias se
+notan cuando el pool de hilos de Starlette (40 por defecto) es menor que la
+concurrencia y la BD tarda en responder. Solo usa la biblioteca estándar.
+"""
+import argparse
+import http.cookiejar
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+RUTAS = [
+    "/dashboard/",
+    "/informes/anual",
+    "/transacciones",
+    "/finanzas/banco/movimientos",
+    "/api/dashboard",
+    "/api/informes",
+]
+
+class _SinRedireccion(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *a, **k):
+        return None
+
+def _sesion(url, usuario, clave) -> urllib.request.OpenerDirector:
+    jar = http.cookiejar.CookieJar()
+    login = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _SinRedireccion())
+    datos = urllib.parse.urlencode({"username": usuario, "password": clave, "next": "/"}).encode()
+    try:
+        login.open(f"{url}/login", datos, timeout=30)
+    except urllib.error.HTTPError as e:
+        if e.code != 303:
+            raise
+    if not any(c.name == "cf_session" for c in jar):
+        raise SystemExit(f"{url}: no se pudo iniciar sesión")
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+def medir(url, opener, rutas, concurrencia, segundos) -> dict:
+    latencias: dict[str, list[float]] = {r: [] for r in rutas}
+    errores = [0]
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def trabajador(n):
+        i = n
+        while time.perf_counter() < fin:
+            ruta = rutas[i % len(rutas)]
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                with opener.open(url + ruta, timeout=60) as r:
+                    r.read()
+                ms = (time.perf_counter() - t0) * 1000
+                with lock:
+                    latencias[ruta].append(ms)
+            except (urllib.error.URLError, OSError):
+                with lock:
+                    errores[0] += 1
+
+    hilos = [threading.Thread(target=trabajador, args=(n,)) for n in range(concurrencia)]
+    t0 = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    duracion = time.perf_counter() - t0
+    todas = [ms for v in latencias.values() for ms in v]
+    return {"latencias": latencias, "todas": todas, "errores": errores[0], "duracion": duracion}
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", action="append", help="instancia a medir (se puede repetir)")
+    ap.add_argument("--usuario", default="admin")
+    ap.add_argument("--clave", default="admin123")
+    ap.add_argument("--ruta", action="append", help=f"ruta a pedir (por defecto: {', '.join(RUTAS)})")
+    ap.add_argument("--segundos", type=float, default=15)
+    ap.add_argument("--concurrencia", type=int, default=64, help="hilos pidiendo en paralelo")
+    args = ap.parse_args()
+    urls = args.url or ["http://127.0.0.1:8000"]
+    rutas = args.ruta or RUTAS
+
+    resultados = []
+    for url in urls:
+        opener = _sesion(url, args.usuario, args.clave)
+        for ruta in rutas:   # calentamiento: plantillas, catálogos y pool
+            opener.open(url + ruta, timeout=60).read()
+        r = medir(url, opener, rutas, args.concurrencia, args.segundos)
+        resultados.append((url, r))
+
+        print(f"\n{url}  ({args.concurrencia} en paralelo, {r['duracion']:.1f}s, errores: {r['errores']})")
+        print(f"  {'ruta':32} {'req':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+        for ruta, v in r["latencias"].items():
+            print(f"  {ruta:32} {len(v):6} {_percentil(v, .5):6.0f}ms {_percentil(v, .95):6.0f}ms {_percentil(v, .99):6.0f}ms")
+
+    print(f"\n{'instancia':32} {'req/s':>8} {'p50':>8} {'p99':>8}")
+    for url, r in resultados:
+        t = r["todas"]
+        print(f"{url:32} {len(t) / r['duracion']:8.1f} {_percentil(t, .5):6.0f}ms {_percentil(t, .99):6.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: tiempo de render que ahorra el caché de fragmentos por página.
+
+Corre en el mismo proceso (no necesita el servidor), desde la raíz del repo:
+
+    python bench/fragmentos.py --n 2000
+
+Renderiza el layout (`layouts/base.html`, que incluye sidebar y topbar) con
+distintas rutas y roles, con el caché apagado y encendido, y reporta µs por
+página en cada caso. Como todas las páginas extienden el layout, la diferencia
+es lo que se ahorra en cada request, independiente del contenido de la página.
+Con `--pagina` se mide además una plantilla completa con su contexto vacío.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request  # noqa: E402
+
+from app.core import fragmentos  # noqa: E402
+from app.core.templates import env  # noqa: E402
+from app.core.usuarios import UsuarioSesion  # noqa: E402
+
+RUTAS = ["/dashboard", "/finanzas/banco/movimientos", "/transacciones", "/pacientes/17", "/inventario/items"]
+ROLES = ["Admin", "User"]
+
+def _requests():
+    for i, ruta in enumerate(RUTAS):
+        for rol in ROLES:
+            user = UsuarioSesion(i + 1, f"usuario{i}", rol, True)
+            yield Request({"type": "http", "method": "GET", "path": ruta, "query_string": b"",
+                           "headers": [], "state": {"user": user}})
+
+def _medir(plantilla, n: int, activo: bool) -> float:
+    fragmentos.ACTIVO = activo
+    fragmentos.invalidar()
+    reqs = list(_requests())
+    for r in reqs:   # calentamiento
+        plantilla.render(request=r)
+    t0 = time.perf_counter()
+    for i in range(n):
+        plantilla.render(request=reqs[i % len(reqs)])
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--n", type=int, default=2000, help="renders por medición")
+    ap.add_argument("--pagina", action="append", default=[], help="plantilla adicional (ej. dashboard/index.html)")
+    args = ap.parse_args()
+
+    plantillas = [("layout", env.from_string("{% extends 'layouts/base.html' %}"))]
+    plantillas += [(p, env.get_template(p)) for p in args.pagina]
+    print(f"{'plantilla':32} {'sin caché':>10} {'con caché':>10} {'ahorro':>10}")
+    for nombre, plantilla in plantillas:
+        sin = _medir(plantilla, args.n, False)
+        con = _medir(plantilla, args.n, True)
+        print(f"{nombre:32} {sin:8.0f}µs {con:8.0f}µs {sin - con:8.0f}µs  ({(sin - con) / sin:.0%})")
+    print(f"caché: {fragmentos.estadisticas()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: throughput de login mientras corre tráfico de páginas.
+
+Levanta la app en otra terminal, por ejemplo:
+
+    uvicorn app.main:app --workers 1 --port 8000
+
+y ejecuta:
+
+    python bench/login.py --url http://127.0.0.1:8000 --usuario admin --clave admin123
+
+Lanza en paralelo `--paginas` hilos pidiendo `--ruta` con una sesión ya iniciada y
+`--logins` hilos haciendo POST /login con credenciales correctas (los logins
+correctos no cuentan para el limitador). Con `--fallidos` se agregan hilos con
+clave incorrecta para ver que el limitador los rechaza sin calcular bcrypt.
+
+Reporta logins/s, páginas/s y latencias p50/p95 de las páginas. Solo usa la
+biblioteca estándar.
+"""
+import argparse
+import http.cookiejar
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+class _SinRedireccion(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *a, **k):
+        return None
+
+def _cliente(jar=None, seguir=False):
+    jar = jar if jar is not None else http.cookiejar.CookieJar()
+    extra = () if seguir else (_SinRedireccion(),)
+    return urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), *extra)
+
+def _post_login(opener, url, usuario, clave) -> str:
+    datos = urllib.parse.urlencode({"username": usuario, "password": clave, "next": "/"}).encode()
+    try:
+        opener.open(f"{url}/login", datos, timeout=30)
+    except urllib.error.HTTPError as e:
+        return e.headers.get("location", "")
+    return ""
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--usuario", default="admin")
+    ap.add_argument("--clave", default="admin123")
+    ap.add_argument("--ruta", default="/pacientes")
+    ap.add_argument("--segundos", type=float, default=15)
+    ap.add_argument("--paginas", type=int, default=8, help="hilos de tráfico de páginas")
+    ap.add_argument("--logins", type=int, default=8, help="hilos de login correcto")
+    ap.add_argument("--fallidos", type=int, default=0, help="hilos de login con clave incorrecta")
+    args = ap.parse_args()
+
+    url = args.url.rstrip("/")
+    jar = http.cookiejar.CookieJar()
+    if "error" in _post_login(_cliente(jar), url, args.usuario, args.clave):
+        raise SystemExit("no se pudo iniciar sesión para el tráfico de páginas")
+    sesion = _cliente(jar, seguir=True)
+
+    fin = time.monotonic() + args.segundos
+    lock = threading.Lock()
+    lat_paginas: list[float] = []
+    res = {"logins_ok": 0, "logins_error": 0, "fallidos_bloqueados": 0, "fallidos_otros": 0, "paginas_error": 0}
+
+    def paginas():
+        while time.monotonic() < fin:
+            t0 = time.perf_counter()
+            try:
+                sesion.open(f"{url}{args.ruta}", timeout=30).read()
+                with lock:
+                    lat_paginas.append(time.perf_counter() - t0)
+            except Exception:
+                with lock:
+                    res["paginas_error"] += 1
+
+    def logins():
+        while time.monotonic() < fin:
+            destino = _post_login(_cliente(), url, args.usuario, args.clave)
+            with lock:
+                res["logins_error" if "error" in destino or not destino else "logins_ok"] += 1
+
+    def fallidos():
+        while time.monotonic() < fin:
+            destino = _post_login(_cliente(), url, args.usuario + "-x", "incorrecta")
+            with lock:
+                res["fallidos_bloqueados" if "Demasiados" in destino else "fallidos_otros"] += 1
+
+    hilos = ([threading.Thread(target=paginas) for _ in range(args.paginas)]
+             + [threading.Thread(target=logins) for _ in range(args.logins)]
+             + [threading.Thread(target=fallidos) for _ in range(args.fallidos)])
+    t0 = time.monotonic()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    dur = time.monotonic() - t0
+
+    print(f"duración          {dur:.1f}s")
+    print(f"logins/s          {res['logins_ok'] / dur:.1f}  (errores {res['logins_error']})")
+    if args.fallidos:
+        print(f"fallidos          bloqueados {res['fallidos_bloqueados']}, evaluados {res['fallidos_otros']}")
+    print(f"páginas/s         {len(lat_paginas) / dur:.1f}  (errores {res['paginas_error']})")
+    if lat_paginas:
+        print(f"página p50        {statistics.median(lat_paginas) * 1000:.0f} ms")
+        print(f"página p95        {_percentil(lat_paginas, 0.95) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Presupuestos de consultas SQL y de memoria por ruta.
+
+Las mejoras de rendimiento retroceden sin ruido: un N+1 que vuelve al detalle
+de un paciente, un informe que vuelve a consultar mes por mes, un listado que
+deja de hacer streaming y arma todas las filas en memoria. Este script pide
+cada página GET de app/routers y falla si alguna pasa su presupuesto:
+
+    python bench/presupuestos.py                    # todas; sale con código 1 si alguna se pasa
+    python bench/presupuestos.py --ruta /pacientes/ -v
+    python bench/presupuestos.py --filas 20000      # la memoria no debería crecer con las filas
+    python bench/presupuestos.py --sugerir          # imprime PRESUPUESTOS con lo medido ahora
+
+Corre en el mismo proceso, sobre SQLite en memoria (DATABASE_URL=sqlite://)
+con datos de app.seed_sintetico, y llama a la app ASGI directamente (sin
+servidor ni cliente HTTP). Cada ruta se pide una vez para calentar cachés y
+plantillas y la segunda se mide: consultas con app.core.consultas, pico de
+memoria con tracemalloc (incluye los hilos del threadpool).
+
+Los helpers sirven también fuera de este script:
+
+    with a_lo_mas(3) as m:        # PresupuestoExcedido si hubo más de 3 consultas
+        ...
+    with memoria_maxima(20):      # PresupuestoExcedido si el pico pasó 20 MB
+        ...
+
+Al cambiar a propósito lo que hace una ruta, se actualiza su presupuesto en
+PRESUPUESTOS en el mismo commit.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from typing import Iterator
+from urllib.parse import urlencode
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+os.chdir(RAIZ)   # plantillas y estáticos con rutas relativas
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("SQL_N_MAS_1", "1000000")   # el reporte propio ya muestra las repetidas
+os.environ.setdefault("SQL_LENTA_MS", "1000000")
+
+from sqlalchemy import select  # noqa: E402
+
+from app.core import consultas  # noqa: E402
+
+class PresupuestoExcedido(AssertionError):
+    pass
+
+@contextmanager
+def a_lo_mas(maximo: int, nombre: str = "") -> Iterator[consultas.Medicion]:
+    """Falla si el bloque ejecuta más de `maximo` sentencias SQL."""
+    with consultas.medir(nombre) as m:
+        yield m
+    if m.n > maximo:
+        repetidas = sorted(m.sentencias.items(), key=lambda kv: kv[1][0], reverse=True)[:3]
+        detalle = "".join(f"\n    {veces}× {consultas._corto(sql, 160)}" for sql, (veces, _, _) in repetidas)
+        raise PresupuestoExcedido(f"{nombre or 'bloque'}: {m.n} consultas (máximo {maximo}){detalle}")
+
+class Memoria:
+    pico_mb = 0.0
+
+@contextmanager
+def memoria_maxima(mb: float, nombre: str = "") -> Iterator[Memoria]:
+    """Falla si el pico de memoria asignada por Python durante el bloque pasa `mb`."""
+    propio = not tracemalloc.is_tracing()
+    if propio:
+        tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    r = Memoria()
+    try:
+        yield r
+    finally:
+        r.pico_mb = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+        if propio:
+            tracemalloc.stop()
+    if r.pico_mb > mb:
+        raise PresupuestoExcedido(f"{nombre or 'bloque'}: pico de {r.pico_mb:.1f} MB (máximo {mb} MB)")
+
+# ruta -> (consultas, MB de pico) con los datos por defecto (--filas 2000).
+# {entrada}, {paciente}, etc. se reemplazan por ids existentes. La memoria de los
+# listados en streaming no debería crecer con --filas; la página del dashboard sí
+# (carga los movimientos). En los de finanzas las consultas crecen en una por
+# cada lote de 500 filas (FilasDiferidas).
+PRESUPUESTOS: dict[str, tuple[int, float]] = {
+    "/": (4, 2),
+    "/transacciones": (4, 2),
+    "/entradas": (3, 2),
+    "/entradas/nueva": (0, 2),
+    "/entradas/{entrada}": (3, 2),
+    "/entradas/{entrada}/editar": (2, 2),
+    "/salidas": (3, 2),
+    "/salidas/nueva": (0, 2),
+    "/salidas/{salida}": (3, 2),
+    "/salidas/{salida}/editar": (2, 2),
+    "/categorias": (2, 2),
+    "/categorias/nueva": (0, 2),
+    "/categorias/{categoria}/editar": (2, 2),
+    "/dashboard/": (7, 4),
+    "/informes/anual": (3, 2),
+    "/informes/imprimir?desde=2024-01-01&hasta=2024-12-31": (5, 2),
+    "/finanzas/banco/entradas": (6, 2),
+    "/finanzas/banco/salidas": (8, 2),
+    "/finanzas/caja/entradas": (4, 2),
+    "/finanzas/caja/salidas": (6, 2),
+    "/finanzas/banco/entrada/nuevo": (0, 2),
+    "/finanzas/banco/entrada/{banco}/editar": (2, 2),
+    "/finanzas/caja/salida/{caja}/editar": (2, 2),
+    "/finanzas/banco/movimientos": (12, 2),
+    "/finanzas/caja/movimientos": (8, 2),
+    "/pacientes/": (3, 2),
+    "/pacientes/crear": (0, 2),
+    "/pacientes/{paciente}": (7, 2),
+    "/pacientes/analitica": (3, 2),
+    "/pacientes/vulnerabilidad": (2, 2),
+    "/atenciones/sin-visita": (4, 2),
+    "/inventario/categorias": (2, 2),
+    "/inventario/categorias/nueva": (0, 2),
+    "/inventario/categorias/{inv_categoria}/editar": (2, 2),
+    "/inventario/items": (3, 2),
+    "/inventario/items/nuevo": (0, 2),
+    "/inventario/items/{item}/editar": (2, 2),
+    "/inventario/items/{item}/movimientos": (6, 2),
+    "/inventario/alertas": (2, 2),
+    "/inventario/valorizacion": (3, 2),
+    "/api/dashboard": (6, 2),
+    "/api/informes": (6, 2),
+    "/api/banco/movimientos": (3, 2),
+    "/api/caja/movimientos": (3, 2),
+    "/usuarios": (2, 2),
+    "/usuarios/nuevo": (0, 2),
+    "/usuarios/1/editar": (2, 2),
+    "/usuarios/1/password": (2, 2),
+    "/healthz": (2, 2),
+    "/metrics": (0, 2),
+    "/admin/metricas": (0, 2),
+    "/admin/perfiles": (0, 2),
+}
+
+# ---------- cliente ASGI ----------
+class Cliente:
+    """Requests directos a la app ASGI, con la cookie de sesión."""
+
+    def __init__(self, app):
+        self.app = app
+        self.cookies: dict[str, str] = {}
+
+    async def pedir(self, metodo: str, ruta: str, datos: dict | None = None) -> tuple[int, dict, int]:
+        """(estado, encabezados, bytes del cuerpo). El cuerpo no se guarda: contaría en el pico de memoria."""
+        ruta, _, query = ruta.partition("?")
+        cuerpo = urlencode(datos).encode() if datos else b""
+        headers = [(b"host", b"presupuestos")]
+        if datos:
+            headers.append((b"content-type", b"application/x-www-form-urlencoded"))
+        if self.cookies:
+            headers.append((b"cookie", "; ".join(f"{k}={v}" for k, v in self.cookies.items()).encode()))
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": metodo, "scheme": "http", "path": ruta, "raw_path": ruta.encode(),
+            "query_string": query.encode(), "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 50000), "server": ("presupuestos", 80),
+        }
+        enviado = False
+        estado, respuesta, largo = 500, {}, 0
+
+        async def receive():
+            nonlocal enviado
+            if enviado:
+                await asyncio.Event().wait()   # la app espera un disconnect que no llega
+            enviado = True
+            return {"type": "http.request", "body": cuerpo, "more_body": False}
+
+        async def send(message):
+            nonlocal estado, largo
+            if message["type"] == "http.response.start":
+                estado = message["status"]
+                for k, v in message.get("headers", []):
+                    k, v = k.decode("latin-1").lower(), v.decode("latin-1")
+                    respuesta[k] = v
+                    if k == "set-cookie":
+                        for c in SimpleCookie(v).values():
+                            self.cookies[c.key] = c.value
+            elif message["type"] == "http.response.body":
+                largo += len(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return estado, respuesta, largo
+
+# ---------- datos ----------
+def _preparar(filas: int) -> dict[str, int]:
+    """Carga datos sintéticos y devuelve un id existente para cada marcador de ruta."""
+    from app import seed_sintetico
+    from app.db import SessionLocal
+    from app.models import Categoria, Transaccion
+    from app.models.inv_basic import InvCategoria, InventarioItem
+    from app.models.pacientes import Paciente
+    from app.models_finanzas import BancoMovimiento, CajaMovimiento
+
+    db = SessionLocal()
+    try:
+        seed_sintetico.generar(
+            db, semilla=42, transacciones=filas, banco=filas, caja=filas // 2,
+            pacientes=max(filas // 4, 50), items=max(filas // 20, 20), informar=lambda _: None,
+        )
+        primero = lambda q: db.scalar(q.limit(1))   # noqa: E731
+        return {
+            "entrada": primero(select(Transaccion.id).where(Transaccion.tipo == "entrada")),
+            "salida": primero(select(Transaccion.id).where(Transaccion.tipo == "salida")),
+            "categoria": primero(select(Categoria.id)),
+            "banco": primero(select(BancoMovimiento.id).where(BancoMovimiento.tipo == "entrada")),
+            "caja": primero(select(CajaMovimiento.id).where(CajaMovimiento.tipo == "salida")),
+            "paciente": primero(select(Paciente.id)),
+            "inv_categoria": primero(select(InvCategoria.id)),
+            "item": primero(select(InventarioItem.id)),
+        }
+    finally:
+        db.close()
+
+# ---------- ejecución ----------
+async def _medir_ruta(cliente: Cliente, ruta: str, maximo: int, mb: float):
+    """(medición, memoria, error o None) de un GET, después de uno de calentamiento."""
+    m, mem = consultas.Medicion(ruta), Memoria()
+    try:
+        await cliente.pedir("GET", ruta)
+        with memoria_maxima(mb, ruta) as mem, a_lo_mas(maximo, ruta) as m:
+            estado, _, _ = await cliente.pedir("GET", ruta)
+    except PresupuestoExcedido as e:
+        return m, mem, str(e)
+    except Exception as e:   # la ruta falla: se reporta y se sigue con las demás
+        return m, mem, f"{ruta}: {type(e).__name__}: {e}"
+    return m, mem, None if estado == 200 else f"{ruta}: estado {estado}"
+
+async def _correr(args) -> int:
+    from app.db_async import engine_async
+    from app.main import app
+
+    await app.router.startup()
+    try:
+        ids = await asyncio.to_thread(_preparar, args.filas)
+        cliente = Cliente(app)
+        estado, _, _ = await cliente.pedir("POST", "/login", {"username": "admin", "password": "admin123", "next": "/"})
+        if estado != 303:
+            print(f"no se pudo iniciar sesión ({estado})")
+            return 2
+
+        rutas = args.ruta or list(PRESUPUESTOS)
+        fallas: list[str] = []
+        medidas: dict[str, tuple[int, float]] = {}
+        print(f"{'ruta':45} {'consultas':>9} {'pico MB':>8}  (filas: {args.filas:,})")
+        for plantilla in rutas:
+            ruta = plantilla.format(**ids)
+            maximo, mb = PRESUPUESTOS.get(plantilla, (10**9, float("inf")))
+            m, mem, error = await _medir_ruta(cliente, ruta, maximo, mb)
+            medidas[plantilla] = (m.n, mem.pico_mb)
+            print(f"{ruta:45} {m.n:>5}/{maximo if maximo < 10**9 else '-':<3} {mem.pico_mb:>5.1f}/{mb:<4g}"
+                  + ("" if error is None else "  <-- falla"))
+            if error is not None:
+                fallas.append(error)
+            if args.v and (error is not None or args.ruta):
+                for sql, (veces, total, _) in sorted(m.sentencias.items(), key=lambda kv: -kv[1][0]):
+                    print(f"      {veces:>3}× {total * 1000:6.1f} ms  {consultas._corto(sql, 140)}")
+    finally:
+        await app.router.shutdown()
+        # la conexión de aiosqlite es un hilo que no termina mientras el pool la tenga abierta
+        await engine_async.dispose()
+
+    if args.sugerir:
+        print("\nPRESUPUESTOS: dict[str, tuple[int, float]] = {")
+        for plantilla, (n, pico) in medidas.items():
+            # memoria con margen: varía algo entre versiones de Python y librerías
+            print(f'    "{plantilla}": ({n}, {max(2, -(-pico * 1.5 // 1)):g}),')
+        print("}")
+    if fallas:
+        print(f"\n{len(fallas)} ruta(s) fuera de presupuesto:")
+        for f in fallas:
+            print(f"  - {f}")
+        return 1
+    print("\ntodas las rutas dentro de presupuesto")
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--ruta", action="append", help="solo esta ruta (de PRESUPUESTOS u otra); se puede repetir")
+    ap.add_argument("--filas", type=int, default=2000, help="transacciones y movimientos de banco generados")
+    ap.add_argument("--sugerir", action="store_true", help="imprime PRESUPUESTOS con los valores medidos")
+    ap.add_argument("-v", action="store_true", help="lista las sentencias de las rutas que fallan")
+    args = ap.parse_args()
+    sys.exit(asyncio.run(_correr(args)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Benchmark por ruta: req/s, latencias p50/p95/p99 y consultas SQL de cada
+página principal, con comparación contra una línea base guardada.
+
+Tres formas de levantar la app:
+
+    # contra una instancia ya levantada
+    python bench/rutas.py --url http://127.0.0.1:8000
+
+    # levanta uvicorn en un subproceso sobre una BD SQLite (generándola si no existe)
+    python bench/rutas.py --uvicorn --bd sqlite:///bench.db --generar "--banco 200000 --pacientes 20000"
+
+    # uvicorn en un hilo de este proceso (para perfilar servidor y cliente juntos;
+    # comparten el GIL, así que los req/s absolutos salen más bajos)
+    python bench/rutas.py --en-proceso --bd sqlite:///bench.db
+
+Cada ruta se mide por separado durante `--segundos` con `--concurrencia`
+hilos. Las consultas por request salen de /metrics (ver app.core.metricas):
+el contador app_db_consultas_total se registra al terminar de enviar la
+respuesta, así que incluye las que hacen los listados en streaming mientras se
+renderizan. Server-Timing, en cambio, va con el primer fragmento del cuerpo y
+solo ve las anteriores; se guarda aparte como `consultas_cabecera`. /metrics
+pide admin (el usuario del benchmark) y sus contadores son de cada proceso: con
+`--workers` > 1 o con otro tráfico en la instancia el promedio no es fiable.
+
+Los resultados se escriben en JSON (`--salida`); con
+`--base` se comparan contra un JSON anterior y el proceso termina con código 1
+si alguna ruta empeoró más que `--tolerancia` en p95 o req/s, o hace más
+consultas. `--guardar-base` deja los resultados como nueva línea base.
+
+El cliente solo usa la biblioteca estándar; --en-proceso importa la app.
+"""
+import argparse
+import gzip
+import http.cookiejar
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUTAS = [
+    "/",
+    "/transacciones",
+    "/entradas",
+    "/salidas",
+    "/dashboard/",
+    "/informes/anual",
+    "/finanzas/banco/movimientos",
+    "/finanzas/caja/movimientos",
+    "/pacientes/",
+    "/inventario/items",
+]
+
+_CONSULTAS = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas"')
+_METRICA = re.compile(r'^(app_db_consultas_total|app_http_requests_total)\{metodo="GET",ruta="((?:[^"\\]|\\.)*)"')
+
+class _SinRedireccion(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *a, **k):
+        return None
+
+def _sesion(url, usuario, clave) -> urllib.request.OpenerDirector:
+    jar = http.cookiejar.CookieJar()
+    login = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _SinRedireccion())
+    datos = urllib.parse.urlencode({"username": usuario, "password": clave, "next": "/"}).encode()
+    try:
+        login.open(f"{url}/login", datos, timeout=30)
+    except urllib.error.HTTPError as e:
+        if e.code != 303:
+            raise
+    if not any(c.name == "cf_session" for c in jar):
+        raise SystemExit(f"{url}: no se pudo iniciar sesión")
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar), _SinRedireccion())
+    opener.addheaders = [("Accept-Encoding", "gzip")]   # como un navegador: incluye el costo de comprimir
+    return opener
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(len(valores) * p))]
+
+def contadores(url, opener) -> dict[str, list[float]] | None:
+    """{ruta: [requests, consultas]} de los GET en /metrics; None si no se pudo leer."""
+    try:
+        with opener.open(f"{url}/metrics", timeout=30) as r:
+            datos = r.read()
+            if r.headers.get("content-encoding") == "gzip":
+                datos = gzip.decompress(datos)
+        texto = datos.decode()
+    except (urllib.error.URLError, OSError):
+        return None
+    series: dict[str, list[float]] = {}
+    for linea in texto.splitlines():
+        m = _METRICA.match(linea)
+        if m:
+            par = series.setdefault(m.group(2), [0.0, 0.0])
+            # app_http_requests_total trae una serie por estado: se suman
+            par[m.group(1) == "app_db_consultas_total"] += float(linea.rsplit(" ", 1)[1])
+    return series
+
+def consultas_por_request(antes: dict | None, despues: dict | None) -> float | None:
+    """
+    Consultas promedio por request entre dos lecturas de /metrics. La ruta
+    medida es la serie con más requests nuevos (la etiqueta es la plantilla,
+    ej. /finanzas/{scope}/movimientos, no la URL); /metrics se excluye.
+    """
+    if antes is None or despues is None:
+        return None
+    deltas = [
+        (req - antes.get(ruta, [0, 0])[0], n - antes.get(ruta, [0, 0])[1])
+        for ruta, (req, n) in despues.items() if ruta != "/metrics"
+    ]
+    req, n = max(deltas, default=(0, 0))
+    return round(n / req, 1) if req > 0 else None
+
+def medir_ruta(url, opener, ruta, concurrencia, segundos) -> dict:
+    latencias: list[float] = []
+    consultas: list[int] = []
+    db_ms: list[float] = []
+    errores = [0]
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def trabajador():
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            try:
+                with opener.open(url + ruta, timeout=60) as r:
+                    r.read()
+                    timing = r.headers.get("server-timing", "")
+                ms = (time.perf_counter() - t0) * 1000
+                m = _CONSULTAS.search(timing)
+                with lock:
+                    latencias.append(ms)
+                    if m:
+                        db_ms.append(float(m.group(1)))
+                        consultas.append(int(m.group(2)))
+            except (urllib.error.URLError, OSError):
+                with lock:
+                    errores[0] += 1
+
+    hilos = [threading.Thread(target=trabajador) for _ in range(concurrencia)]
+    antes = contadores(url, opener)
+    t0 = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    duracion = time.perf_counter() - t0
+    despues = contadores(url, opener)
+    return {
+        "req": len(latencias),
+        "req_s": round(len(latencias) / duracion, 2),
+        "p50_ms": round(_percentil(latencias, .5), 1),
+        "p95_ms": round(_percentil(latencias, .95), 1),
+        "p99_ms": round(_percentil(latencias, .99), 1),
+        "errores": errores[0],
+        # promedio: las rutas con caché hacen menos consultas en algunos requests
+        "consultas": consultas_por_request(antes, despues),
+        # Server-Timing: solo hasta el primer fragmento del cuerpo
+        "consultas_cabecera": _percentil(consultas, .5) if consultas else None,
+        "db_p50_ms": round(_percentil(db_ms, .5), 1) if db_ms else None,
+    }
+
+# ---------- comparación ----------
+def comparar(actual: dict, base: dict, tolerancia: float) -> list[str]:
+    """Mensajes de regresión (vacío si no hay)."""
+    regresiones = []
+    for ruta, r in actual["rutas"].items():
+        b = base.get("rutas", {}).get(ruta)
+        if not b:
+            continue
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * (1 + tolerancia):
+            regresiones.append(f"{ruta}: p95 {b['p95_ms']:.0f} -> {r['p95_ms']:.0f} ms")
+        if b["req_s"] and r["req_s"] < b["req_s"] * (1 - tolerancia):
+            regresiones.append(f"{ruta}: req/s {b['req_s']:.1f} -> {r['req_s']:.1f}")
+        # más de media consulta extra por request en promedio
+        if b.get("consultas") is not None and r["consultas"] is not None and r["consultas"] > b["consultas"] + 0.5:
+            regresiones.append(f"{ruta}: consultas {b['consultas']} -> {r['consultas']}")
+        if r["errores"] > b.get("errores", 0):
+            regresiones.append(f"{ruta}: errores {b.get('errores', 0)} -> {r['errores']}")
+    return regresiones
+
+def _delta(actual, base):
+    if not base:
+        return ""
+    return f"{(actual - base) / base * 100:+.0f}%"
+
+# ---------- servidor ----------
+def _esperar(url, proc=None, segundos=60):
+    fin = time.time() + segundos
+    while time.time() < fin:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"uvicorn terminó con código {proc.returncode}")
+        try:
+            with urllib.request.urlopen(f"{url}/healthz", timeout=2) as r:
+                if r.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"{url}: la app no respondió /healthz")
+
+def _generar(bd, argumentos):
+    ruta = bd.split("sqlite:///", 1)[1] if bd.startswith("sqlite:///") else None
+    if ruta is not None and os.path.exists(os.path.join(RAIZ, ruta)):
+        return   # ya generada: se reusa para que las corridas sean comparables
+    print(f"generando datos en {bd} ...", flush=True)
+    subprocess.run([sys.executable, "-m", "app.seed_sintetico", *argumentos.split()],
+                   cwd=RAIZ, env={**os.environ, "DATABASE_URL": bd}, check=True)
+
+def _uvicorn(bd, puerto, workers):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(puerto),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=RAIZ, env={**os.environ, "DATABASE_URL": bd},
+    )
+
+def _en_proceso(bd, puerto):
+    os.environ["DATABASE_URL"] = bd
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config("app.main:app", port=puerto, log_level="warning"))
+    threading.Thread(target=server.run, name="uvicorn", daemon=True).start()
+    return server
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    modo = ap.add_mutually_exclusive_group()
+    modo.add_argument("--url", help="instancia ya levantada")
+    modo.add_argument("--uvicorn", action="store_true", help="levanta uvicorn en un subproceso")
+    modo.add_argument("--en-proceso", action="store_true", help="levanta uvicorn en un hilo de este proceso")
+    ap.add_argument("--bd", default="sqlite:///bench.db", help="DATABASE_URL con --uvicorn / --en-proceso")
+    ap.add_argument("--generar", metavar="ARGS", help='genera la BD si no existe, ej. "--banco 200000"')
+    ap.add_argument("--puerto", type=int, default=8799)
+    ap.add_argument("--workers", type=int, default=1, help="workers de uvicorn (solo --uvicorn)")
+    ap.add_argument("--usuario", default="admin")
+    ap.add_argument("--clave", default="admin123")
+    ap.add_argument("--ruta", action="append", help="ruta a medir (se puede repetir; por defecto todas)")
+    ap.add_argument("--segundos", type=float, default=5, help="por ruta")
+    ap.add_argument("--concurrencia", type=int, default=16)
+    ap.add_argument("--salida", default="bench-rutas.json", help="resultados en JSON")
+    ap.add_argument("--base", help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--guardar-base", action="store_true", help="además, escribe los resultados en --base")
+    ap.add_argument("--tolerancia", type=float, default=0.2, help="empeoramiento aceptado (0.2 = 20%%)")
+    args = ap.parse_args()
+
+    proc = server = None
+    url = (args.url or f"http://127.0.0.1:{args.puerto}").rstrip("/")
+    if (args.uvicorn or args.en_proceso) and args.generar is not None:
+        _generar(args.bd, args.generar)
+
+    try:
+        if args.uvicorn:
+            proc = _uvicorn(args.bd, args.puerto, args.workers)
+            _esperar(url, proc)
+        elif args.en_proceso:
+            server = _en_proceso(args.bd, args.puerto)
+            _esperar(url)
+        opener = _sesion(url, args.usuario, args.clave)
+        rutas = args.ruta or RUTAS
+        resultado = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "url": url,
+            "modo": "uvicorn" if args.uvicorn else "en_proceso" if args.en_proceso else "externo",
+            "concurrencia": args.concurrencia,
+            "segundos": args.segundos,
+            "rutas": {},
+        }
+        base = None
+        if args.base and os.path.exists(args.base) and not args.guardar_base:
+            with open(args.base, encoding="utf-8") as f:
+                base = json.load(f)
+
+        print(f"{url}  ({args.concurrencia} en paralelo, {args.segundos:g}s por ruta)")
+        if args.uvicorn and args.workers > 1:
+            print("  aviso: con varios workers /metrics es de un solo proceso; las consultas no son fiables")
+        print(f"  {'ruta':30} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'consultas':>9} {'err':>4}"
+              + ("  Δp95   Δreq/s" if base else ""))
+        for ruta in rutas:
+            for _ in range(3):   # calentamiento: plantillas, catálogos y pool
+                opener.open(url + ruta, timeout=60).read()
+            r = medir_ruta(url, opener, ruta, args.concurrencia, args.segundos)
+            resultado["rutas"][ruta] = r
+            linea = (f"  {ruta:30} {r['req_s']:8.1f} {r['p50_ms']:6.0f}ms {r['p95_ms']:6.0f}ms "
+                     f"{r['p99_ms']:6.0f}ms {r['consultas'] if r['consultas'] is not None else '-':>9} {r['errores']:4}")
+            b = (base or {}).get("rutas", {}).get(ruta)
+            if b:
+                linea += f"  {_delta(r['p95_ms'], b['p95_ms']):>5}  {_delta(r['req_s'], b['req_s']):>6}"
+            print(linea, flush=True)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=30)
+        if server is not None:
+            server.should_exit = True
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nresultados en {args.salida}")
+    if args.guardar_base and args.base:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"línea base actualizada: {args.base}")
+
+    if base:
+        regresiones = comparar(resultado, base, args.tolerancia)
+        if regresiones:
+            print(f"\nREGRESIONES respecto de {args.base} (tolerancia {args.tolerancia:.0%}):")
+            for r in regresiones:
+                print(f"  - {r}")
+            sys.exit(1)
+        print(f"\nsin regresiones respecto de {args.base}")
+
+if __name__ == "__main__":
+    main()
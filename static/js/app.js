@@ -0,0 +1,91 @@
+// Drawer del sidebar en móvil y limpieza de formularios GET (antes inline en layouts/base.html)
+const btn = document.getElementById('btnSidebar');
+const side = document.getElementById('sidebar');
+const back = document.getElementById('backdrop');
+
+function toggleDrawer(show) {
+  const isMobile = window.innerWidth < 768;
+  if (!isMobile) return;
+
+  const open = show ?? side.classList.contains('-translate-x-full');
+  if (open) {
+    side.classList.remove('-translate-x-full');
+    back.classList.remove('hidden');
+    document.body.classList.add('overflow-hidden');
+  } else {
+    side.classList.add('-translate-x-full');
+    back.classList.add('hidden');
+    document.body.classList.remove('overflow-hidden');
+  }
+}
+
+btn?.addEventListener('click', () => toggleDrawer(true));
+back?.addEventListener('click', () => toggleDrawer(false));
+
+// Filtros con data-parcial="<id>": se pide solo el bloque de resultados
+// (header HX-Request) y se reemplaza el contenido de #<id>, sin recargar la página.
+// Los elementos de la respuesta con data-oob reemplazan al elemento con su mismo id.
+async function cargarParcial(url, destino) {
+  destino.setAttribute('aria-busy', 'true');
+  try {
+    const resp = await fetch(url, { headers: { 'HX-Request': 'true' } });
+    if (!resp.ok || resp.redirected) {   // sesión vencida o error: navegación normal
+      window.location.href = url;
+      return;
+    }
+    const tmp = document.createElement('div');
+    tmp.innerHTML = await resp.text();
+    tmp.querySelectorAll('[data-oob]').forEach((el) => {
+      el.removeAttribute('data-oob');
+      document.getElementById(el.id)?.replaceWith(el);
+    });
+    destino.replaceChildren(...tmp.childNodes);
+    history.replaceState(null, '', url);
+    sincronizarFiltros(destino.id, url);
+    destino.dispatchEvent(new CustomEvent('parcial:cargado', { bubbles: true }));
+  } catch (err) {
+    window.location.href = url;
+  } finally {
+    destino.removeAttribute('aria-busy');
+  }
+}
+
+// los campos ocultos del formulario (orden, etc.) siguen a la URL actual
+function sincronizarFiltros(id, url) {
+  const params = new URL(url, window.location.href).searchParams;
+  document.querySelectorAll(`form[data-parcial="${id}"] input[type="hidden"]`).forEach((el) => {
+    if (el.name && params.has(el.name)) el.value = params.get(el.name);
+  });
+}
+
+document.addEventListener("submit", (e) => {
+  const form = e.target;
+  if (form.tagName !== 'FORM' || form.method.toLowerCase() !== "get") return;
+
+  const destino = form.dataset.parcial && document.getElementById(form.dataset.parcial);
+  if (destino) {
+    e.preventDefault();
+    const params = new URLSearchParams();
+    for (const [k, v] of new FormData(form)) {
+      if (v !== "") params.append(k, v);
+    }
+    const accion = form.getAttribute('action') || window.location.pathname;
+    cargarParcial(params.toString() ? `${accion}?${params}` : accion, destino);
+    return;
+  }
+
+  [...form.elements].forEach((el) => {
+    if (el.name && (el.value === "" || el.value === null)) {
+      el.disabled = true;
+    }
+  });
+});
+
+document.addEventListener("click", (e) => {
+  const link = e.target.closest('a[data-parcial]');
+  if (!link || e.button !== 0 || e.metaKey || e.ctrlKey || e.shiftKey || e.altKey) return;
+  const destino = document.getElementById(link.dataset.parcial);
+  if (!destino) return;
+  e.preventDefault();
+  cargarParcial(link.href, destino);
+});